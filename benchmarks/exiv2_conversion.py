@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Measures the conversion of exiv2 values to MADAM metadata and back for
+images with many tags, e.g. press photos with lots of IPTC keywords.
+
+Usage: python benchmarks/exiv2_conversion.py [keyword_count [repetitions]]
+"""
+import datetime
+import sys
+import timeit
+from fractions import Fraction
+
+from madam.exiv2 import Exiv2MetadataProcessor
+
+
+def exiv2_values(keyword_count):
+    """
+    Returns exiv2 values by metadata format with GPS sequences, IPTC
+    keywords, and tags without a MADAM equivalent.
+    """
+    return {
+        'exif': {
+            'Exif.Image.Artist': 'Artist',
+            'Exif.Image.Make': 'Manufacturer',
+            'Exif.Image.Model': 'Camera',
+            'Exif.Image.TargetPrinter': 'Printer',
+            'Exif.Photo.ExposureTime': Fraction(1, 250),
+            'Exif.Photo.FNumber': Fraction(28, 10),
+            'Exif.GPSInfo.GPSLatitude': [Fraction(48), Fraction(8), Fraction(6)],
+            'Exif.GPSInfo.GPSLatitudeRef': 'N',
+            'Exif.GPSInfo.GPSLongitude': [Fraction(11), Fraction(34), Fraction(55)],
+            'Exif.GPSInfo.GPSLongitudeRef': 'E',
+            'Exif.GPSInfo.GPSTimeStamp': [Fraction(23), Fraction(59), Fraction(42)],
+        },
+        'iptc': {
+            'Iptc.Application2.Caption': ['Caption'],
+            'Iptc.Application2.Byline': ['Photographer'],
+            'Iptc.Application2.DateCreated': [datetime.date(2000, 1, 1)],
+            'Iptc.Application2.Keywords': ['keyword %d' % index for index in range(keyword_count)],
+            'Iptc.Application2.Subject': ['subject %d' % index for index in range(keyword_count // 10)],
+            'Iptc.Envelope.CharacterSet': ['\x1b%G'],
+        },
+    }
+
+
+def main(keyword_count=200, repetitions=10000):
+    values_by_format = exiv2_values(keyword_count)
+    metadata_by_format = {metadata_format: Exiv2MetadataProcessor.to_madam(metadata_format, values)
+                          for metadata_format, values in values_by_format.items()}
+
+    def to_madam():
+        for metadata_format, values in values_by_format.items():
+            Exiv2MetadataProcessor.to_madam(metadata_format, values)
+
+    def to_exiv2():
+        for metadata_format, metadata in metadata_by_format.items():
+            Exiv2MetadataProcessor.to_exiv2(metadata_format, metadata)
+
+    print('Convert %d tags with %d IPTC keywords' % (sum(map(len, values_by_format.values())), keyword_count))
+    for name, function in [('to_madam', to_madam), ('to_exiv2', to_exiv2)]:
+        time = min(timeit.repeat(function, number=repetitions, repeat=3)) / repetitions
+        print('  %-8s %8.2f µs' % (name, time * 1e6))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Compares downscaling large JPEG images with and without DCT scaling
+(`PIL.Image.Image.draft`) in :func:`madam.image.PillowProcessor.resize`.
+
+Usage: python benchmarks/jpeg_draft.py [width height [target_width [repetitions]]]
+"""
+import io
+import sys
+import timeit
+import unittest.mock
+
+import PIL.Image
+import PIL.ImageChops
+import PIL.ImageStat
+
+from madam.image import PillowProcessor, ResizeMode
+
+
+def camera_jpeg(width, height):
+    """
+    Returns JPEG data with a noisy gradient resembling a camera image.
+    """
+    gradient = PIL.Image.linear_gradient('L').resize((width, height))
+    noise = PIL.Image.effect_noise((width, height), 32)
+    image = PIL.Image.merge('RGB', (gradient, noise, gradient.transpose(PIL.Image.FLIP_LEFT_RIGHT)))
+    data = io.BytesIO()
+    image.save(data, 'JPEG', quality=90)
+    data.seek(0)
+    return data
+
+
+def main(width=6000, height=4000, target_width=300, repetitions=5):
+    processor = PillowProcessor()
+    asset = processor.read(camera_jpeg(width, height))
+    resize = processor.resize(width=target_width, height=target_width, mode=ResizeMode.FIT)
+
+    draft_time = min(timeit.repeat(lambda: resize(asset), number=1, repeat=repetitions))
+    draft_image = PIL.Image.open(resize(asset).essence).convert('RGB')
+    with unittest.mock.patch.object(PillowProcessor, '_draft'):
+        full_time = min(timeit.repeat(lambda: resize(asset), number=1, repeat=repetitions))
+        full_image = PIL.Image.open(resize(asset).essence).convert('RGB')
+
+    difference = PIL.ImageStat.Stat(PIL.ImageChops.difference(draft_image, full_image)).mean
+    print('Resize %dx%d JPEG to %dx%d' % (width, height, draft_image.width, draft_image.height))
+    print('  full decoding: %8.1f ms' % (full_time * 1000))
+    print('  DCT scaling:   %8.1f ms (%.1fx faster)' % (draft_time * 1000, full_time / draft_time))
+    print('  mean absolute difference per channel: %s' % ', '.join('%.2f' % value for value in difference))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
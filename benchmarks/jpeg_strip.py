@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+Measures the throughput of stripping metadata from JPEG data with
+:func:`madam.container.jpeg_strip`.
+
+Usage: python benchmarks/jpeg_strip.py [width height [repetitions]]
+"""
+import io
+import sys
+import timeit
+
+import PIL.Image
+
+from madam.container import jpeg_strip
+
+
+def jpeg_with_exif(width, height):
+    """
+    Returns JPEG data of a noisy image with Exif metadata.
+    """
+    image = PIL.Image.effect_noise((width, height), 64).convert('RGB')
+    exif = PIL.Image.Exif()
+    exif[0x013B] = 'Artist'
+    exif[0x010E] = 'Description' * 100
+    data = io.BytesIO()
+    image.save(data, 'JPEG', quality=90, exif=exif.tobytes())
+    return data.getvalue()
+
+
+def main(width=6000, height=4000, repetitions=20):
+    data = jpeg_with_exif(width, height)
+    strip_time = min(timeit.repeat(lambda: jpeg_strip(data), number=1, repeat=repetitions))
+    print('Strip metadata from %dx%d JPEG (%.1f MB)' % (width, height, len(data) / 1e6))
+    print('  %8.2f ms (%.0f MB/s)' % (strip_time * 1000, len(data) / strip_time / 1e6))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
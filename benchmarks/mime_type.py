@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Measures the common operations of :class:`madam.mime.MimeType`, and compares
+wildcard matching with :class:`madam.mime.MimeTypeIndex` to comparing each
+MIME type of a list.
+
+Usage: python benchmarks/mime_type.py [mime_type_count [repetitions]]
+"""
+import sys
+import timeit
+
+from madam.mime import MimeType, MimeTypeIndex
+
+
+def matches(mime_type, other):
+    """
+    Returns whether two MIME types match by comparing their media types and
+    subtypes.
+    """
+    return ((mime_type.type is None or other.type is None or mime_type.type == other.type) and
+            (mime_type.subtype is None or other.subtype is None or mime_type.subtype == other.subtype))
+
+
+def measure(statement, number, repetitions):
+    """
+    Returns the best time of a statement in nanoseconds per call.
+    """
+    return min(timeit.repeat(statement, number=number, repeat=repetitions)) / number * 1e9
+
+
+def main(mime_type_count=1000, repetitions=5):
+    media_types = ['application', 'audio', 'image', 'text', 'video']
+    mime_types = [MimeType(media_types[i % len(media_types)], 'x-format-%d' % i) for i in range(mime_type_count)]
+    string_table = {str(mime_type): mime_type.subtype for mime_type in mime_types}
+    mime_type_table = {mime_type: mime_type.subtype for mime_type in mime_types}
+    index = MimeTypeIndex((mime_type, mime_type.subtype) for mime_type in mime_types)
+    jpeg = MimeType('image/jpeg')
+    pattern = MimeType('image/*')
+    number = 100000
+
+    print('MimeType operations (%d repetitions)' % repetitions)
+    print('  construction from string:      %8.1f ns' % measure(lambda: MimeType('image/jpeg'), number, repetitions))
+    print('  construction from MimeType:    %8.1f ns' % measure(lambda: MimeType(jpeg), number, repetitions))
+    print('  hash:                          %8.1f ns' % measure(lambda: hash(jpeg), number, repetitions))
+    print('  equality with canonical str:   %8.1f ns' % measure(lambda: jpeg == 'image/jpeg', number, repetitions))
+    print('  equality with other str:       %8.1f ns' % measure(lambda: jpeg == 'image/png', number, repetitions))
+    print('  str dict lookup by MimeType:   %8.1f ns' %
+          measure(lambda: string_table.get(mime_types[-1]), number, repetitions))
+    print('  MimeType dict lookup by str:   %8.1f ns' %
+          measure(lambda: mime_type_table.get('image/x-format-2'), number, repetitions))
+
+    number = 100
+    index_time = measure(lambda: index.match(pattern), number, repetitions)
+    scan_time = measure(lambda: sorted(m for m in mime_types if matches(m, pattern)), number, repetitions)
+    print('Match %s against %d MIME types' % (pattern, mime_type_count))
+    print('  comparing each MIME type:      %8.1f us' % (scan_time / 1000))
+    print('  MimeTypeIndex:                 %8.1f us (%.1fx faster)' % (index_time / 1000, scan_time / index_time))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,532 @@
+"""
+Functions that read and rewrite the structure of image files without
+decoding the image data.
+"""
+import struct
+import zlib
+from collections import namedtuple
+
+
+#: Marker segment of a JPEG file. `start` is the offset of the marker and
+#: `end` the offset after the segment.
+JPEGSegment = namedtuple('JPEGSegment', ['marker', 'start', 'end'])
+
+#: Chunk of a PNG file. `start` is the offset of the length field and `end`
+#: the offset after the CRC of the chunk.
+PNGChunk = namedtuple('PNGChunk', ['type', 'start', 'end'])
+
+#: Chunk of a RIFF container like WebP. `start` is the offset of the chunk
+#: identifier and `end` the offset after the padding of the chunk.
+RIFFChunk = namedtuple('RIFFChunk', ['fourcc', 'start', 'end'])
+
+JPEG_SOI = 0xD8
+JPEG_EOI = 0xD9
+JPEG_SOS = 0xDA
+JPEG_APP1 = 0xE1
+JPEG_APP2 = 0xE2
+JPEG_APP13 = 0xED
+JPEG_COM = 0xFE
+
+_JPEG_STANDALONE_MARKERS = frozenset([0x01, JPEG_SOI, JPEG_EOI] + list(range(0xD0, 0xD8)))
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_EXIF_HEADER = b'Exif\x00\x00'
+_MPF_HEADER = b'MPF\x00'
+_XMP_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
+_PHOTOSHOP_HEADER = b'Photoshop 3.0\x00'
+_PHOTOSHOP_IPTC_RESOURCE_ID = 0x0404
+_TIFF_BYTE_ORDERS = {b'II': '<', b'MM': '>'}
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_TEXT_CHUNK_TYPES = frozenset([b'tEXt', b'zTXt', b'iTXt'])
+# Text keywords used by exiv2, ImageMagick and Adobe software
+_PNG_KEYWORD_FORMATS = {
+    b'Raw profile type exif': 'exif',
+    b'Raw profile type APP1': 'exif',
+    b'Raw profile type iptc': 'iptc',
+    b'Raw profile type 8bim': 'iptc',
+    b'Raw profile type xmp': 'xmp',
+    b'XML:com.adobe.xmp': 'xmp',
+    b'Comment': 'comment',
+}
+_WEBP_CHUNK_FORMATS = {b'EXIF': 'exif', b'XMP ': 'xmp'}
+_WEBP_FORMAT_FLAGS = {'exif': 0x08, 'xmp': 0x04}
+
+
+def jpeg_segments(data):
+    """
+    Yields the marker segments of the specified JPEG data. Scanning stops at
+    the first start-of-scan segment, which is returned with the entropy-coded
+    data and all following segments up to the end of the data.
+
+    :param data: JPEG data
+    :type data: bytes or memoryview
+    :return: Generator of segments
+    :rtype: Iterator[JPEGSegment]
+    :raises ValueError: if the data is not a valid JPEG file
+    """
+    data = memoryview(data)
+    if data[:2] != b'\xff\xd8':
+        raise ValueError('Not a JPEG file')
+    yield JPEGSegment(JPEG_SOI, 0, 2)
+    position = 2
+    while True:
+        start = position
+        if data[position:position + 1] != b'\xff':
+            raise ValueError('Expected JPEG marker at offset %d' % position)
+        # Markers may be preceded by any number of fill bytes
+        while data[position + 1:position + 2] == b'\xff':
+            position += 1
+        if position + 2 > len(data):
+            raise ValueError('Unexpected end of JPEG data')
+        marker = data[position + 1]
+        position += 2
+        if marker in _JPEG_STANDALONE_MARKERS:
+            yield JPEGSegment(marker, start, position)
+            if marker == JPEG_EOI:
+                return
+            continue
+        if position + 2 > len(data):
+            raise ValueError('Unexpected end of JPEG data')
+        length, = struct.unpack_from('>H', data, position)
+        end = position + length
+        if length < 2 or end > len(data):
+            raise ValueError('Invalid length of JPEG segment at offset %d' % start)
+        if marker == JPEG_SOS:
+            yield JPEGSegment(marker, start, len(data))
+            return
+        yield JPEGSegment(marker, start, end)
+        position = end
+
+
+def jpeg_payload(data, segment):
+    """
+    Returns the payload of a JPEG segment, i.e. the data after its marker and
+    length field.
+
+    :param data: JPEG data
+    :type data: bytes or memoryview
+    :param segment: Segment of the data
+    :type segment: JPEGSegment
+    :return: Payload of the segment
+    :rtype: memoryview
+    """
+    if segment.marker in _JPEG_STANDALONE_MARKERS:
+        return memoryview(data)[segment.end:segment.end]
+    return memoryview(data)[segment.start + 4:segment.end]
+
+
+def jpeg_size(data):
+    """
+    Returns the dimensions of a JPEG image from its start-of-frame segment.
+
+    :param data: JPEG data
+    :type data: bytes or memoryview
+    :return: Width and height of the image
+    :rtype: (int, int)
+    :raises ValueError: if the data does not contain a start-of-frame segment
+    """
+    for segment in jpeg_segments(data):
+        if segment.marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack_from('>HH', jpeg_payload(data, segment), 1)
+            return width, height
+    raise ValueError('JPEG data does not contain a frame header')
+
+
+def jpeg_segment_format(data, segment):
+    """
+    Returns the metadata format that is stored in a JPEG segment.
+
+    :param data: JPEG data
+    :type data: bytes or memoryview
+    :param segment: Segment of the data
+    :type segment: JPEGSegment
+    :return: One of `'exif'`, `'iptc'`, `'xmp'`, and `'comment'`, or `None`
+        if the segment does not contain metadata
+    :rtype: str or None
+    """
+    if segment.marker == JPEG_APP1:
+        payload = jpeg_payload(data, segment)
+        if payload[:len(_EXIF_HEADER)] == _EXIF_HEADER:
+            return 'exif'
+        if payload[:len(_XMP_HEADER)] == _XMP_HEADER:
+            return 'xmp'
+    elif segment.marker == JPEG_APP13:
+        if jpeg_payload(data, segment)[:len(_PHOTOSHOP_HEADER)] == _PHOTOSHOP_HEADER:
+            return 'iptc'
+    elif segment.marker == JPEG_COM:
+        return 'comment'
+    return None
+
+
+def _photoshop_resources(payload):
+    """
+    Yields the resource ID and the data of all image resource blocks of a
+    Photoshop segment payload, including the padding of the blocks.
+    """
+    position = len(_PHOTOSHOP_HEADER)
+    while position + 12 <= len(payload) and payload[position:position + 4] == b'8BIM':
+        start = position
+        resource_id, name_length = struct.unpack_from('>HB', payload, position + 4)
+        # The Pascal string of the name is padded to an even length
+        position += 6 + name_length + 1 + (name_length + 1) % 2
+        size, = struct.unpack_from('>I', payload, position)
+        position += 4 + size + size % 2
+        yield resource_id, payload[start:position]
+
+
+def jpeg_strip(data, formats=('exif', 'iptc', 'xmp', 'comment')):
+    """
+    Removes the metadata of the specified formats from JPEG data. All other
+    segments and the image data are copied unchanged. Image resources of
+    Photoshop segments other than IPTC data are retained.
+
+    :param data: JPEG data
+    :type data: bytes or memoryview
+    :param formats: Metadata formats to be removed
+    :type formats: Iterable[str]
+    :return: JPEG data without the metadata
+    :rtype: bytes
+    :raises ValueError: if the data is not a valid JPEG file
+    """
+    data = memoryview(data)
+    formats = frozenset(formats)
+    parts = []
+    for segment in jpeg_segments(data):
+        segment_format = jpeg_segment_format(data, segment)
+        if segment_format not in formats:
+            parts.append(data[segment.start:segment.end])
+        elif segment_format == 'iptc':
+            try:
+                resources = [resource for resource_id, resource in _photoshop_resources(jpeg_payload(data, segment))
+                             if resource_id != _PHOTOSHOP_IPTC_RESOURCE_ID]
+            except struct.error:
+                raise ValueError('Invalid Photoshop segment at offset %d' % segment.start)
+            if resources:
+                length = 2 + len(_PHOTOSHOP_HEADER) + sum(len(resource) for resource in resources)
+                parts.append(struct.pack('>BBH', 0xFF, JPEG_APP13, length) + _PHOTOSHOP_HEADER)
+                parts.extend(resources)
+    return b''.join(parts)
+
+
+def jpeg_metadata(data, formats):
+    """
+    Returns JPEG data that only consists of the segments of the specified
+    metadata formats. Metadata libraries can read it much faster than the
+    complete data, as it does not contain any image data.
+
+    :param data: JPEG data
+    :type data: bytes or memoryview
+    :param formats: Metadata formats to be retained
+    :type formats: Iterable[str]
+    :return: JPEG data with the metadata segments
+    :rtype: bytes
+    :raises ValueError: if the data is not a valid JPEG file
+    """
+    data = memoryview(data)
+    formats = frozenset(formats)
+    segments = [data[segment.start:segment.end] for segment in jpeg_segments(data)
+                if jpeg_segment_format(data, segment) in formats]
+    return b''.join([b'\xff\xd8'] + segments + [b'\xff\xd9'])
+
+
+def png_chunks(data):
+    """
+    Yields the chunks of the specified PNG data up to the `IEND` chunk.
+
+    :param data: PNG data
+    :type data: bytes or memoryview
+    :return: Generator of chunks
+    :rtype: Iterator[PNGChunk]
+    :raises ValueError: if the data is not a valid PNG file
+    """
+    data = memoryview(data)
+    if data[:len(_PNG_SIGNATURE)] != _PNG_SIGNATURE:
+        raise ValueError('Not a PNG file')
+    position = len(_PNG_SIGNATURE)
+    while True:
+        if position + 12 > len(data):
+            raise ValueError('Unexpected end of PNG data')
+        length, = struct.unpack_from('>I', data, position)
+        chunk_type = bytes(data[position + 4:position + 8])
+        end = position + 12 + length
+        if end > len(data):
+            raise ValueError('Invalid length of PNG chunk at offset %d' % position)
+        yield PNGChunk(chunk_type, position, end)
+        if chunk_type == b'IEND':
+            return
+        position = end
+
+
+def png_size(data):
+    """
+    Returns the dimensions of a PNG image from its `IHDR` chunk. Only the
+    first 33 bytes of the PNG data are required.
+
+    :param data: PNG data
+    :type data: bytes or memoryview
+    :return: Width and height of the image
+    :rtype: (int, int)
+    :raises ValueError: if the data does not start with an `IHDR` chunk
+    """
+    chunk = next(png_chunks(data))
+    if chunk.type != b'IHDR' or chunk.end - chunk.start < 12 + 8:
+        raise ValueError('PNG data does not start with an image header')
+    return struct.unpack_from('>II', data, chunk.start + 8)
+
+
+def png_chunk_format(data, chunk):
+    """
+    Returns the metadata format that is stored in a PNG chunk.
+
+    :param data: PNG data
+    :type data: bytes or memoryview
+    :param chunk: Chunk of the data
+    :type chunk: PNGChunk
+    :return: One of `'exif'`, `'iptc'`, `'xmp'`, and `'comment'`, or `None`
+        if the chunk does not contain metadata
+    :rtype: str or None
+    """
+    if chunk.type == b'eXIf':
+        return 'exif'
+    if chunk.type in _PNG_TEXT_CHUNK_TYPES:
+        # Text chunks start with a keyword that is terminated by a null byte
+        keyword = bytes(memoryview(data)[chunk.start + 8:min(chunk.end - 4, chunk.start + 8 + 80)]).split(b'\x00', 1)[0]
+        return _PNG_KEYWORD_FORMATS.get(keyword)
+    return None
+
+
+def png_strip(data, formats=('exif', 'iptc', 'xmp', 'comment')):
+    """
+    Removes the metadata of the specified formats from PNG data. All other
+    chunks are copied unchanged.
+
+    :param data: PNG data
+    :type data: bytes or memoryview
+    :param formats: Metadata formats to be removed
+    :type formats: Iterable[str]
+    :return: PNG data without the metadata
+    :rtype: bytes
+    :raises ValueError: if the data is not a valid PNG file
+    """
+    data = memoryview(data)
+    formats = frozenset(formats)
+    parts = [data[:len(_PNG_SIGNATURE)]]
+    parts.extend(data[chunk.start:chunk.end] for chunk in png_chunks(data)
+                 if png_chunk_format(data, chunk) not in formats)
+    return b''.join(parts)
+
+
+def png_chunk(chunk_type, chunk_data):
+    """
+    Returns the encoded PNG chunk with the specified type and data.
+
+    :param chunk_type: Four-letter chunk type
+    :type chunk_type: bytes
+    :param chunk_data: Data of the chunk
+    :type chunk_data: bytes
+    :return: Chunk with length and CRC
+    :rtype: bytes
+    """
+    return b''.join([
+        struct.pack('>I', len(chunk_data)), chunk_type, chunk_data,
+        struct.pack('>I', zlib.crc32(chunk_type + chunk_data) & 0xFFFFFFFF),
+    ])
+
+
+def webp_chunks(data):
+    """
+    Yields the chunks of the specified WebP data.
+
+    :param data: WebP data
+    :type data: bytes or memoryview
+    :return: Generator of chunks
+    :rtype: Iterator[RIFFChunk]
+    :raises ValueError: if the data is not a valid WebP file
+    """
+    data = memoryview(data)
+    if data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        raise ValueError('Not a WebP file')
+    riff_size, = struct.unpack_from('<I', data, 4)
+    riff_end = min(len(data), 8 + riff_size)
+    position = 12
+    while position < riff_end:
+        if position + 8 > riff_end:
+            raise ValueError('Unexpected end of WebP data')
+        size, = struct.unpack_from('<I', data, position + 4)
+        end = position + 8 + size + size % 2
+        if position + 8 + size > riff_end:
+            raise ValueError('Invalid size of WebP chunk at offset %d' % position)
+        yield RIFFChunk(bytes(data[position:position + 4]), position, min(end, riff_end))
+        position = end
+
+
+def webp_strip(data, formats=('exif', 'xmp')):
+    """
+    Removes the metadata of the specified formats from WebP data and updates
+    the feature flags of the extended file format accordingly. All other
+    chunks are copied unchanged.
+
+    :param data: WebP data
+    :type data: bytes or memoryview
+    :param formats: Metadata formats to be removed
+    :type formats: Iterable[str]
+    :return: WebP data without the metadata
+    :rtype: bytes
+    :raises ValueError: if the data is not a valid WebP file
+    """
+    data = memoryview(data)
+    formats = frozenset(formats)
+    removed_flags = 0
+    parts = []
+    for chunk in webp_chunks(data):
+        chunk_format = _WEBP_CHUNK_FORMATS.get(chunk.fourcc)
+        if chunk_format in formats:
+            removed_flags |= _WEBP_FORMAT_FLAGS[chunk_format]
+        else:
+            parts.append(data[chunk.start:chunk.end])
+    if not removed_flags:
+        return bytes(data)
+    for index, part in enumerate(parts):
+        if part[:4] == b'VP8X':
+            vp8x = bytearray(part)
+            vp8x[8] &= ~removed_flags & 0xFF
+            parts[index] = vp8x
+    riff_size = 4 + sum(len(part) for part in parts)
+    return b''.join([b'RIFF', struct.pack('<I', riff_size), b'WEBP'] + parts)
+
+
+def metadata_formats(data):
+    """
+    Returns the metadata formats that are contained in JPEG, PNG, or WebP
+    data.
+
+    :param data: Image data
+    :type data: bytes or memoryview
+    :return: Metadata formats of the data
+    :rtype: set[str]
+    :raises ValueError: if the data has another or an invalid format
+    """
+    data = memoryview(data)
+    if data[:2] == b'\xff\xd8':
+        segment_formats = (jpeg_segment_format(data, segment) for segment in jpeg_segments(data))
+    elif data[:len(_PNG_SIGNATURE)] == _PNG_SIGNATURE:
+        segment_formats = (png_chunk_format(data, chunk) for chunk in png_chunks(data))
+    elif data[:4] == b'RIFF':
+        segment_formats = (_WEBP_CHUNK_FORMATS.get(chunk.fourcc) for chunk in webp_chunks(data))
+    else:
+        raise ValueError('Unsupported container format')
+    return set(segment_formats) - {None}
+
+
+def strip(data, formats=('exif', 'iptc', 'xmp', 'comment')):
+    """
+    Removes the metadata of the specified formats from JPEG, PNG, or WebP
+    data without decoding the image data.
+
+    :param data: Image data
+    :type data: bytes or memoryview
+    :param formats: Metadata formats to be removed
+    :type formats: Iterable[str]
+    :return: Image data without the metadata
+    :rtype: bytes
+    :raises ValueError: if the data has another or an invalid format
+    """
+    data = memoryview(data)
+    if data[:2] == b'\xff\xd8':
+        return jpeg_strip(data, formats)
+    if data[:len(_PNG_SIGNATURE)] == _PNG_SIGNATURE:
+        return png_strip(data, formats)
+    if data[:4] == b'RIFF':
+        return webp_strip(data, formats)
+    raise ValueError('Unsupported container format')
+
+
+def _tiff_ifd(tiff, offset):
+    """
+    Returns the entries of an image file directory (IFD) of TIFF data as
+    dictionary of tags and four-byte value fields, and the offset of the next
+    IFD.
+    """
+    byte_order = _TIFF_BYTE_ORDERS[bytes(tiff[:2])]
+    entry_count, = struct.unpack_from(byte_order + 'H', tiff, offset)
+    entries = {}
+    for entry_offset in range(offset + 2, offset + 2 + 12 * entry_count, 12):
+        tag, value_type, count = struct.unpack_from(byte_order + 'HHI', tiff, entry_offset)
+        entries[tag] = value_type, count, tiff[entry_offset + 8:entry_offset + 12]
+    next_offset, = struct.unpack_from(byte_order + 'I', tiff, offset + 2 + 12 * entry_count)
+    return entries, next_offset
+
+
+def _tiff_long(tiff, entry):
+    byte_order = _TIFF_BYTE_ORDERS[bytes(tiff[:2])]
+    value_type, _, value = entry
+    if value_type == 3:
+        return struct.unpack_from(byte_order + 'H', value)[0]
+    return struct.unpack_from(byte_order + 'I', value)[0]
+
+
+def _exif_thumbnail(tiff):
+    """
+    Returns the JPEG thumbnail stored in the second IFD of Exif data.
+    """
+    byte_order = _TIFF_BYTE_ORDERS[bytes(tiff[:2])]
+    first_ifd_offset, = struct.unpack_from(byte_order + 'I', tiff, 4)
+    _, thumbnail_ifd_offset = _tiff_ifd(tiff, first_ifd_offset)
+    if not thumbnail_ifd_offset:
+        return None
+    entries, _ = _tiff_ifd(tiff, thumbnail_ifd_offset)
+    if 0x0201 not in entries or 0x0202 not in entries:
+        return None
+    offset = _tiff_long(tiff, entries[0x0201])
+    length = _tiff_long(tiff, entries[0x0202])
+    return tiff[offset:offset + length]
+
+
+def _mpf_images(tiff):
+    """
+    Returns all images except for the first one that are listed in the
+    MP index IFD of a Multi-Picture Format segment.
+    """
+    byte_order = _TIFF_BYTE_ORDERS[bytes(tiff[:2])]
+    index_ifd_offset, = struct.unpack_from(byte_order + 'I', tiff, 4)
+    entries, _ = _tiff_ifd(tiff, index_ifd_offset)
+    if 0xB002 not in entries:
+        return []
+    _, entry_data_size, value = entries[0xB002]
+    entry_data_offset, = struct.unpack_from(byte_order + 'I', value)
+    images = []
+    for entry_offset in range(entry_data_offset + 16, entry_data_offset + entry_data_size, 16):
+        _, size, offset = struct.unpack_from(byte_order + 'III', tiff, entry_offset)
+        images.append((offset, size))
+    return images
+
+
+def jpeg_previews(data):
+    """
+    Returns the preview images that are embedded in JPEG data, i.e. the Exif
+    thumbnail and the additional images of the Multi-Picture Format (MPF).
+    Invalid or truncated previews are skipped.
+
+    :param data: JPEG data
+    :type data: bytes or memoryview
+    :return: JPEG data of the previews, which share memory with `data`
+    :rtype: list[memoryview]
+    :raises ValueError: if the data is not a valid JPEG file
+    """
+    data = memoryview(data)
+    previews = []
+    for segment in jpeg_segments(data):
+        payload = jpeg_payload(data, segment)
+        try:
+            if segment.marker == JPEG_APP1 and payload[:len(_EXIF_HEADER)] == _EXIF_HEADER:
+                thumbnail = _exif_thumbnail(payload[len(_EXIF_HEADER):])
+                if thumbnail is not None:
+                    previews.append(thumbnail)
+            elif segment.marker == JPEG_APP2 and payload[:len(_MPF_HEADER)] == _MPF_HEADER:
+                # Offsets are relative to the MP header that follows the
+                # identifier of the segment
+                mp_header_offset = segment.start + 4 + len(_MPF_HEADER)
+                for offset, size in _mpf_images(payload[len(_MPF_HEADER):]):
+                    previews.append(data[mp_header_offset + offset:mp_header_offset + offset + size])
+        except (KeyError, struct.error):
+            continue
+    return [preview for preview in previews if preview[:2] == b'\xff\xd8' and preview[-2:] == b'\xff\xd9']
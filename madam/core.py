@@ -1,14 +1,35 @@
 import abc
+import asyncio
+import concurrent.futures
+import enum
 import functools
+import hashlib
 import io
 import importlib
+import inspect
+import itertools
+import math
 import os
+import pickle
 import shelve
 import shutil
-from collections.abc import MutableMapping
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Mapping, MutableMapping
 
 from frozendict import frozendict
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from madam.future import StopAsyncIteration, coroutine
+from madam.mime import MimeType
+
 
 class Madam:
     """
@@ -138,6 +159,32 @@ class Madam:
 
         return asset
 
+    def read_directory(self, path, recursive=True):
+        """
+        Reads the supported files in the specified directory and returns
+        their contents as :class:`~madam.core.Asset` objects.
+
+        The files are read lazily, one at a time, when the next asset is
+        requested. Files whose format is not supported are skipped.
+
+        :param path: Path of the directory to be read
+        :type path: str
+        :param recursive: Whether files in subdirectories are read as well
+        :type recursive: bool
+        :return: Generator with one asset per supported file
+        """
+        for directory_path, directory_names, file_names in os.walk(path):
+            directory_names.sort()
+            if not recursive:
+                directory_names.clear()
+            for file_name in sorted(file_names):
+                with open(os.path.join(directory_path, file_name), 'rb') as file:
+                    try:
+                        asset = self.read(file)
+                    except UnsupportedFormatError:
+                        continue
+                yield asset
+
     def write(self, asset, file):
         r"""
         Write the :class:`~madam.core.Asset` object to the specified file.
@@ -236,6 +283,24 @@ class AssetStorage(MutableMapping):
         return set(asset_key for asset_key, (asset, asset_tags) in self.items()
                    if search_tags <= asset_tags)
 
+    def update_metadata(self, asset_key, **metadata):
+        """
+        Changes the metadata of the asset with the specified key, without
+        changing its essence or its tags.
+
+        Values of metadata formats like `exif` or `iptc` are merged with the
+        existing values of the format, all other values are replaced.
+
+        Storage implementations can override this method to avoid writing
+        the essence again.
+
+        :param asset_key: Key of the asset to be updated
+        :param \\**metadata: Metadata to be changed
+        :raise KeyError: if the key does not exist in this storage
+        """
+        asset, tags = self[asset_key]
+        self[asset_key] = Asset(asset.essence, **_updated_metadata(asset.metadata, metadata)), tags
+
 
 class InMemoryStorage(AssetStorage):
     """
@@ -333,7 +398,10 @@ class ShelveStorage(AssetStorage):
     Represents a persistent storage backend for :class:`~madam.core.Asset`
     objects. Asset keys must be strings.
 
-    ShelveStorage uses a file on the file system to serialize Assets.
+    ShelveStorage uses a file on the file system to serialize the metadata
+    and the tags of Assets, and a second file with the suffix `.essence` for
+    their essences. Thus, metadata can be changed without writing the
+    essence again.
     """
     def __init__(self, path):
         """
@@ -346,6 +414,7 @@ class ShelveStorage(AssetStorage):
         if os.path.exists(path) and not os.path.isfile(path):
             raise ValueError('The storage path %r is not a file.' % path)
         self.path = path
+        self._essence_path = '%s.essence' % path
 
     def __setitem__(self, asset_key, asset_and_tags):
         """
@@ -364,8 +433,10 @@ class ShelveStorage(AssetStorage):
         asset, tags = asset_and_tags
         if not tags:
             tags = frozenset()
+        with shelve.open(self._essence_path) as essences:
+            essences[asset_key] = asset.essence.read()
         with shelve.open(self.path) as store:
-            store[asset_key] = (asset, tags)
+            store[asset_key] = (asset.metadata, tags)
 
     def __getitem__(self, asset_key):
         """
@@ -383,7 +454,13 @@ class ShelveStorage(AssetStorage):
         with shelve.open(self.path) as store:
             if asset_key not in store:
                 raise KeyError('Asset with key %r cannot be found in storage' % asset_key)
-            return store[asset_key]
+            metadata, tags = store[asset_key]
+        # Storages of previous versions contain the complete asset
+        if isinstance(metadata, Asset):
+            return metadata, tags
+        with shelve.open(self._essence_path) as essences:
+            essence_data = essences[asset_key]
+        return Asset(io.BytesIO(essence_data), **metadata), tags
 
     def __delitem__(self, asset_key):
         """
@@ -398,6 +475,32 @@ class ShelveStorage(AssetStorage):
             if asset_key not in store:
                 raise KeyError('Asset with key %r cannot be found in storage' % asset_key)
             del store[asset_key]
+        with shelve.open(self._essence_path) as essences:
+            if asset_key in essences:
+                del essences[asset_key]
+
+    def update_metadata(self, asset_key, **metadata):
+        """
+        Changes the metadata of the asset with the specified key, without
+        changing its essence or its tags.
+
+        Values of metadata formats like `exif` or `iptc` are merged with the
+        existing values of the format, all other values are replaced. Only
+        the metadata is written, the essence of the asset remains untouched.
+
+        :param asset_key: Key of the asset to be updated
+        :type asset_key: str
+        :param \\**metadata: Metadata to be changed
+        :raise KeyError: if the key does not exist in this storage
+        """
+        with shelve.open(self.path) as store:
+            if asset_key not in store:
+                raise KeyError('Asset with key %r cannot be found in storage' % asset_key)
+            asset_metadata, tags = store[asset_key]
+            if not isinstance(asset_metadata, Asset):
+                store[asset_key] = (_immutable(_updated_metadata(asset_metadata, metadata)), tags)
+                return
+        super().update_metadata(asset_key, **metadata)
 
     def __contains__(self, asset_key):
         """
@@ -430,6 +533,29 @@ class ShelveStorage(AssetStorage):
             return len(store)
 
 
+def _updated_metadata(metadata, changes):
+    """
+    Returns a copy of the specified metadata with the specified changes.
+    Dictionaries of metadata formats are merged with the existing values.
+
+    :param metadata: Metadata to be changed
+    :type metadata: Mapping
+    :param changes: Changed metadata values
+    :type changes: Mapping
+    :return: Changed metadata
+    :rtype: dict
+    """
+    updated_metadata = dict(metadata)
+    for key, value in changes.items():
+        # frozendict is not a subclass of dict in all versions
+        if isinstance(value, Mapping) and isinstance(updated_metadata.get(key), Mapping):
+            format_metadata = dict(updated_metadata[key])
+            format_metadata.update(value)
+            value = format_metadata
+        updated_metadata[key] = value
+    return updated_metadata
+
+
 def _immutable(value):
     """
     Creates a read-only version from the specified value.
@@ -546,6 +672,454 @@ class UnsupportedFormatError(Exception):
         super().__init__(*args, **kwargs)
 
 
+class RenditionCache(MutableMapping):
+    """
+    Represents a content-addressed cache for the results of operators.
+
+    Results are identified by a key that is derived from the input asset
+    (essence and metadata) and the applied operators (see
+    :func:`~madam.core.RenditionCache.key`).
+
+    Cached assets are held in memory. Optionally, a directory can be
+    specified as a second, persistent tier. Both tiers are limited in size
+    and evict the least recently used assets first.
+    """
+    def __init__(self, max_size=128 * 1024**2, path=None, max_disk_size=1024**3):
+        """
+        Initializes a new, empty `RenditionCache`.
+
+        :param max_size: Maximum total essence size in bytes of the assets held in memory
+        :type max_size: int
+        :param path: Directory for the on-disk tier, or `None` to cache in memory only
+        :type path: pathlib.Path or str or None
+        :param max_disk_size: Maximum total size in bytes of the on-disk tier
+        :type max_disk_size: int
+        """
+        self.max_size = max_size
+        self.path = None if path is None else str(path)
+        self.max_disk_size = max_disk_size
+        self._entries = OrderedDict()
+        self._size = 0
+        self._disk_size = 0
+        self._lock = threading.RLock()
+        if self.path is not None:
+            if os.path.exists(self.path) and not os.path.isdir(self.path):
+                raise ValueError('The cache path %r is not a directory.' % self.path)
+            os.makedirs(self.path, exist_ok=True)
+            self._disk_size = sum(os.path.getsize(entry_path) for entry_path in self._disk_entry_paths())
+
+    @staticmethod
+    def key(asset, operators):
+        """
+        Returns the cache key for the result of the specified operators
+        applied one after another to the specified asset.
+
+        :param asset: Input asset
+        :type asset: Asset
+        :param operators: Configured operators
+        :type operators: list[OperatorSpec]
+        :return: Hexadecimal digest
+        :rtype: str
+        """
+        key = hashlib.sha256()
+        key.update(_digest(asset).encode('ascii'))
+        for operator in operators:
+            key.update(operator.digest.encode('ascii'))
+        return key.hexdigest()
+
+    def __getitem__(self, key):
+        """
+        Returns the cached asset with the specified key.
+
+        An entry of the on-disk tier that cannot be loaded, e.g. because it is
+        truncated, is treated as missing and removed.
+
+        :param key: Cache key
+        :type key: str
+        :return: Cached asset
+        :rtype: Asset
+        :raise KeyError: if no asset is cached for the key
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            if self.path is not None:
+                entry_path = self._disk_entry_path(key)
+                try:
+                    with open(entry_path, 'rb') as entry_file:
+                        asset = pickle.load(entry_file)
+                    os.utime(entry_path)
+                except FileNotFoundError:
+                    pass
+                except Exception:
+                    # Unpickling can fail with almost any exception
+                    self._remove_from_disk(entry_path)
+                else:
+                    self._store_in_memory(key, asset)
+                    return asset
+        raise KeyError('No asset with key %r in cache' % key)
+
+    def __setitem__(self, key, asset):
+        """
+        Stores the specified asset using the specified key.
+
+        :param key: Cache key
+        :type key: str
+        :param asset: Asset to be cached
+        :type asset: Asset
+        """
+        with self._lock:
+            self._store_in_memory(key, asset)
+            if self.path is not None:
+                self._store_on_disk(key, asset)
+
+    def __delitem__(self, key):
+        """
+        Removes the asset with the specified key from all tiers of the cache.
+
+        :param key: Cache key
+        :type key: str
+        :raise KeyError: if no asset is cached for the key
+        """
+        with self._lock:
+            found = False
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key)._essence_data)
+                found = True
+            if self.path is not None:
+                entry_path = self._disk_entry_path(key)
+                if os.path.exists(entry_path):
+                    self._disk_size -= os.path.getsize(entry_path)
+                    os.remove(entry_path)
+                    found = True
+            if not found:
+                raise KeyError('No asset with key %r in cache' % key)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+            return self.path is not None and os.path.exists(self._disk_entry_path(key))
+
+    def __iter__(self):
+        with self._lock:
+            keys = list(self._entries.keys())
+            if self.path is not None:
+                keys.extend(os.path.basename(entry_path)[:-len('.pickle')]
+                            for entry_path in self._disk_entry_paths())
+        return iter(list(OrderedDict.fromkeys(keys)))
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def _store_in_memory(self, key, asset):
+        size = len(asset._essence_data)
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key)._essence_data)
+        if size > self.max_size:
+            return
+        self._entries[key] = asset
+        self._size += size
+        while self._size > self.max_size:
+            _, evicted_asset = self._entries.popitem(last=False)
+            self._size -= len(evicted_asset._essence_data)
+
+    def _store_on_disk(self, key, asset):
+        entry_path = self._disk_entry_path(key)
+        # The entry is renamed into place only after it was written completely,
+        # so that readers never see a partially written entry
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                pickle.dump(asset, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+            if os.path.exists(entry_path):
+                self._disk_size -= os.path.getsize(entry_path)
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._disk_size += os.path.getsize(entry_path)
+        if self._disk_size > self.max_disk_size:
+            entry_paths = sorted(self._disk_entry_paths(), key=os.path.getmtime)
+            for evicted_path in entry_paths:
+                if self._disk_size <= self.max_disk_size:
+                    break
+                self._disk_size -= os.path.getsize(evicted_path)
+                os.remove(evicted_path)
+
+    def _remove_from_disk(self, entry_path):
+        try:
+            size = os.path.getsize(entry_path)
+            os.remove(entry_path)
+        except OSError:
+            return
+        self._disk_size -= size
+
+    def _disk_entry_path(self, key):
+        return os.path.join(self.path, '%s.pickle' % key)
+
+    def _disk_entry_paths(self):
+        return [os.path.join(self.path, file_name) for file_name in os.listdir(self.path)
+                if file_name.endswith('.pickle')]
+
+
+def _canonical(value):
+    """
+    Returns a string representation of the specified value that does not
+    depend on the iteration order of mappings and sets, or on the current
+    process.
+
+    :param value: Value to be represented
+    :return: Canonical representation
+    :rtype: str
+    """
+    if isinstance(value, (dict, frozendict)):
+        items = sorted((_canonical(k), _canonical(v)) for k, v in value.items())
+        return '{%s}' % ','.join('%s:%s' % item for item in items)
+    elif isinstance(value, (set, frozenset)):
+        return 'set(%s)' % ','.join(sorted(_canonical(v) for v in value))
+    elif isinstance(value, (list, tuple)):
+        return '(%s)' % ','.join(_canonical(v) for v in value)
+    elif isinstance(value, enum.Enum):
+        return '%s.%s' % (type(value).__qualname__, value.name)
+    elif isinstance(value, (str, MimeType)):
+        return repr(str(value))
+    return repr(value)
+
+
+def _digest(asset):
+    """
+    Returns a digest of the essence and the metadata of the specified asset.
+
+    :param asset: Asset to be digested
+    :type asset: Asset
+    :return: Hexadecimal digest
+    :rtype: str
+    """
+    digest = hashlib.sha256(asset._essence_data)
+    digest.update(_canonical(asset.metadata).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class StageRecord:
+    """
+    Represents the measurements of a single invocation of a pipeline stage.
+
+    CPU times are measured for the whole process and subprocess times for all
+    terminated child processes. They are only exact if no other threads
+    process assets at the same time.
+    """
+    __slots__ = 'name', 'wall_time', 'cpu_time', 'subprocess_time', 'input_size', 'output_size'
+
+    def __init__(self, name, wall_time, cpu_time, subprocess_time, input_size, output_size):
+        """
+        Initializes a new `StageRecord`.
+
+        :param name: Name of the stage, i.e. the names of its operators
+        :type name: str
+        :param wall_time: Elapsed real time in seconds
+        :type wall_time: float
+        :param cpu_time: Processor time of the Python process in seconds
+        :type cpu_time: float
+        :param subprocess_time: Processor time of subprocesses in seconds or
+            `None` if it cannot be measured on this platform
+        :type subprocess_time: float or None
+        :param input_size: Size of the input essence in bytes
+        :type input_size: int or None
+        :param output_size: Size of the output essence in bytes
+        :type output_size: int or None
+        """
+        self.name = name
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.subprocess_time = subprocess_time
+        self.input_size = input_size
+        self.output_size = output_size
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+            '%s=%r' % (attribute, getattr(self, attribute)) for attribute in self.__slots__))
+
+
+class StageStatistics:
+    """
+    Observer that aggregates the records of pipeline stages by stage name.
+
+    Only the most recent records of each stage are kept, so that the
+    statistics can be collected in long-running processes.
+    """
+    #: Record attributes that are aggregated
+    fields = 'wall_time', 'cpu_time', 'subprocess_time', 'input_size', 'output_size'
+
+    def __init__(self, max_samples=10000):
+        """
+        Initializes new, empty `StageStatistics`.
+
+        :param max_samples: Maximum number of records that are kept per stage
+        :type max_samples: int
+        """
+        self.max_samples = max_samples
+        self._records = OrderedDict()
+        self._counts = {}
+        # Reentrant, so that a summary can be created from a consistent state
+        self._lock = threading.RLock()
+
+    def __call__(self, record):
+        """
+        Adds the specified record to the statistics.
+
+        :param record: Measurements of a stage invocation
+        :type record: StageRecord
+        """
+        with self._lock:
+            records = self._records.get(record.name)
+            if records is None:
+                records = self._records[record.name] = deque(maxlen=self.max_samples)
+                self._counts[record.name] = 0
+            records.append(record)
+            self._counts[record.name] += 1
+
+    @property
+    def stages(self):
+        """
+        Names of all stages that have been recorded, in order of appearance.
+        """
+        with self._lock:
+            return list(self._records)
+
+    def count(self, stage):
+        """
+        Returns the total number of recorded invocations of the specified stage.
+
+        :param stage: Name of the stage
+        :type stage: str
+        :return: Number of invocations
+        :rtype: int
+        """
+        with self._lock:
+            return self._counts.get(stage, 0)
+
+    def percentiles(self, stage, field='wall_time', percentiles=(50, 90, 99)):
+        """
+        Returns the specified percentiles of a measurement of a stage using
+        the nearest-rank method.
+
+        :param stage: Name of the stage
+        :type stage: str
+        :param field: Name of the measurement
+        :type field: str
+        :param percentiles: Percentiles between 0 and 100
+        :type percentiles: iterable
+        :return: Value for each percentile or `None` if there are no values
+        :rtype: OrderedDict
+        """
+        with self._lock:
+            values = sorted(value for value in (getattr(record, field) for record in self._records.get(stage, ()))
+                            if value is not None)
+        result = OrderedDict()
+        for percentile in percentiles:
+            if values:
+                rank = max(int(math.ceil(percentile / 100 * len(values))) - 1, 0)
+                result[percentile] = values[rank]
+            else:
+                result[percentile] = None
+        return result
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """
+        Returns a human-readable report of the percentiles of all
+        measurements of all stages.
+
+        :param percentiles: Percentiles between 0 and 100
+        :type percentiles: iterable
+        :return: Report with one section per stage
+        :rtype: str
+        """
+        lines = []
+        with self._lock:
+            for stage in self.stages:
+                lines.append('%s (n=%d)' % (stage, self.count(stage)))
+                for field in self.fields:
+                    values = self.percentiles(stage, field=field, percentiles=percentiles)
+                    if all(value is None for value in values.values()):
+                        continue
+                    lines.append('    %-16s %s' % (field, '  '.join(
+                        'p%s=%s' % (percentile, '-' if value is None else
+                                    ('%d' % value if field.endswith('_size') else '%.6f' % value))
+                        for percentile, value in values.items())))
+        return '\n'.join(lines)
+
+    def print_summary(self, file=None, percentiles=(50, 90, 99)):
+        """
+        Writes the report returned by :func:`~madam.core.StageStatistics.summary`.
+
+        :param file: Text stream to write to. Defaults to `sys.stdout`.
+        :type file: file-like object or None
+        :param percentiles: Percentiles between 0 and 100
+        :type percentiles: iterable
+        """
+        print(self.summary(percentiles=percentiles), file=file if file is not None else sys.stdout)
+
+    def clear(self):
+        """
+        Removes all records.
+        """
+        with self._lock:
+            self._records.clear()
+            self._counts.clear()
+
+
+def _subprocess_time():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _essence_size(result):
+    if isinstance(result, (list, tuple)):
+        sizes = [_essence_size(asset) for asset in result]
+        return None if None in sizes else sum(sizes)
+    essence_data = getattr(result, '_essence_data', None)
+    return None if essence_data is None else len(essence_data)
+
+
+def _stage_name(operators):
+    names = []
+    for operator in operators:
+        if isinstance(operator, OperatorSpec):
+            names.append('%s.%s' % (operator.processor_class.__name__, operator.name))
+        else:
+            names.append(getattr(operator, '__qualname__', type(operator).__name__))
+    return ' + '.join(names)
+
+
+def _traced(compiled_operator, name, observers):
+    """
+    Returns an operator that measures every application of the specified
+    compiled operator and reports it to the specified observers.
+    """
+    if not observers:
+        return compiled_operator
+
+    def traced_operator(asset):
+        subprocess_time = _subprocess_time()
+        cpu_time = time.process_time()
+        wall_time = time.perf_counter()
+        processed_asset = compiled_operator(asset)
+        wall_time = time.perf_counter() - wall_time
+        cpu_time = time.process_time() - cpu_time
+        if subprocess_time is not None:
+            subprocess_time = _subprocess_time() - subprocess_time
+        record = StageRecord(name, wall_time=wall_time, cpu_time=cpu_time, subprocess_time=subprocess_time,
+                             input_size=_essence_size(asset), output_size=_essence_size(processed_asset))
+        for observer in observers:
+            observer(record)
+        return processed_asset
+    return traced_operator
+
+
 class Pipeline:
     """
     Represents a processing pipeline for :class:`~madam.core.Asset` objects.
@@ -553,26 +1127,233 @@ class Pipeline:
     The pipeline can be configured to hold a list of asset processing
     operators, all of which are applied to one or more assets when calling the
     :func:`~madam.core.Pipeline.process` method.
+
+    Observers are called with a :class:`~madam.core.StageRecord` after each
+    stage, i.e. after each operator or group of fused operators, was applied.
+    Pipelines without observers do not measure anything.
+
+    Optimizing pipelines plan the operators for every asset before applying
+    them (see :func:`~madam.core.Pipeline.plan`).
     """
-    def __init__(self):
+    def __init__(self, cache=None, observers=None, optimize=False):
         """
         Initializes a new pipeline without operators.
+
+        :param cache: Optional cache for the results of the operators
+        :type cache: RenditionCache or None
+        :param observers: Callables that receive the measurements of each stage
+        :type observers: iterable or None
+        :param optimize: Whether redundant operators are removed or rewritten
+            according to the metadata of each asset before processing it
+        :type optimize: bool
         """
         self.operators = []
+        self.cache = cache
+        self.observers = list(observers) if observers else []
+        self.optimize = optimize
 
     def process(self, *assets):
         """
         Applies the operators in this pipeline on the specified assets.
 
+        Consecutive operators of the same processor are fused into a single
+        operator if the processor supports it (see
+        :func:`~madam.core.Processor.fuse`).
+
         :param \\*assets: Asset objects to be processed
         :type \\*assets: Asset
         :return: Generator with processed assets
         """
+        apply = self._applier()
         for asset in assets:
-            processed_asset = asset
-            for operator in self.operators:
-                processed_asset = operator(processed_asset)
-            yield processed_asset
+            yield apply(asset)
+
+    def stream(self, assets, max_in_flight=1):
+        """
+        Applies the operators in this pipeline on the assets of the specified
+        iterable.
+
+        Assets are taken from the iterable only when they are about to be
+        processed and at most `max_in_flight` assets are processed at the same
+        time in separate threads. Hence, a lazy iterable, such as the one
+        returned by :func:`~madam.core.Madam.read_directory`, can be
+        processed with constant memory regardless of its length.
+
+        :param assets: Asset objects to be processed
+        :type assets: iterable
+        :param max_in_flight: Maximum number of assets that are processed concurrently
+        :type max_in_flight: int
+        :return: Generator with processed assets in the order of the input assets
+        """
+        return _stream(self._applier(), assets, max_in_flight)
+
+    def astream(self, assets, max_in_flight=1):
+        """
+        Applies the operators in this pipeline on the assets of the specified
+        asynchronous or regular iterable.
+
+        Like :func:`~madam.core.Pipeline.stream`, assets are taken from the
+        iterable only when they are about to be processed, and at most
+        `max_in_flight` assets are processed at the same time in separate
+        threads. The event loop is not blocked while assets are processed.
+
+        :param assets: Asset objects to be processed
+        :type assets: async iterable or iterable
+        :param max_in_flight: Maximum number of assets that are processed concurrently
+        :type max_in_flight: int
+        :return: Asynchronous iterator with processed assets in the order of the input assets
+        """
+        return _AsyncStream(self._applier(), assets, max_in_flight)
+
+    def plan(self, asset):
+        """
+        Returns the operators that an optimizing pipeline applies to the
+        specified asset.
+
+        Every run of consecutive operators of the same processor is passed to
+        :func:`~madam.core.Processor.optimize` together with the metadata of
+        the asset it will be applied to, which allows the processor to drop
+        operators without effect and to merge or reorder operators.
+
+        :param asset: Asset to be processed
+        :type asset: Asset
+        :return: Operators to be applied in order
+        :rtype: list
+        """
+        return self._plan(asset.metadata)
+
+    def _plan(self, metadata):
+        planned_operators = []
+        for processor, operators in itertools.groupby(self.operators, key=_bound_processor):
+            operators = list(operators)
+            if processor is not None:
+                operators = list(processor.optimize(operators, metadata))
+            if metadata is not None:
+                metadata = _dry_run(operators, metadata)
+            planned_operators.extend(operators)
+        return planned_operators
+
+    def dry_run(self, asset):
+        """
+        Returns the metadata of the asset that results from processing the
+        specified asset with this pipeline without processing the essence
+        (see :func:`~madam.core.Processor.dry_run`).
+
+        :param asset: Asset to be processed, or its metadata
+        :type asset: Asset or dict
+        :return: Metadata of the resulting asset, or `None` if it cannot be
+            determined without processing the essence
+        :rtype: dict or None
+        """
+        metadata = getattr(asset, 'metadata', asset)
+        operators = self._plan(metadata) if self.optimize else self.operators
+        return _dry_run(operators, metadata)
+
+    def explain(self, asset):
+        """
+        Returns a human-readable description of how the specified asset
+        would be processed by this pipeline.
+
+        The description lists the configured operators and the stages that
+        are applied after planning (if the pipeline optimizes) and fusing.
+
+        :param asset: Asset to be processed
+        :type asset: Asset
+        :return: Description of the processing plan
+        :rtype: str
+        """
+        lines = ['Asset: %s' % ', '.join('%s=%s' % (key, asset.metadata[key])
+                                          for key in ('mime_type', 'width', 'height', 'duration')
+                                          if key in asset.metadata)]
+        lines.append('Operators:')
+        lines.extend('    %r' % operator for operator in self.operators)
+        lines.append('Plan:')
+        operators = self.plan(asset) if self.optimize else self.operators
+        if not operators:
+            lines.append('    (asset is not changed)')
+        stage_index = 0
+        for processor, operators in itertools.groupby(operators, key=_bound_processor):
+            operators = list(operators)
+            fused = processor is not None and len(operators) > 1 and processor.fuse(operators) is not None
+            stages = [operators] if fused else [[operator] for operator in operators]
+            for stage in stages:
+                stage_index += 1
+                lines.append('    %d. %s%s' % (stage_index, ' -> '.join(repr(operator) for operator in stage),
+                                             ' (fused)' if fused else ''))
+        return '\n'.join(lines)
+
+    def _applier(self):
+        """
+        Returns a function that applies the operators of this pipeline to an
+        asset.
+
+        :return: Function that returns the processed asset
+        :rtype: callable
+        """
+        if not self.optimize:
+            return functools.partial(_apply_operators, self._compile())
+        compile_plan = functools.lru_cache(maxsize=128)(self._compile)
+
+        def apply_plan(asset):
+            return _apply_operators(compile_plan(tuple(self.plan(asset))), asset)
+        return apply_plan
+
+    def _compile(self, operators=None):
+        """
+        Returns the operators of this pipeline where runs of consecutive
+        operators bound to the same processor are replaced by the fused
+        operator of the respective processor.
+
+        :param operators: Operators to be compiled instead of the operators of this pipeline
+        :type operators: iterable or None
+        :return: Operators to be applied in order
+        :rtype: list
+        """
+        if operators is None:
+            operators = self.operators
+        observers = list(self.observers)
+        compiled_operators = []
+        for processor, operators in itertools.groupby(operators, key=_bound_processor):
+            operators = list(operators)
+            if processor is not None and len(operators) > 1:
+                fused_operator = processor.fuse(operators)
+                if fused_operator is not None:
+                    fused_operator = self._cached(fused_operator, operators)
+                    compiled_operators.append(_traced(fused_operator, _stage_name(operators), observers))
+                    continue
+            for operator in operators:
+                compiled_operator = operator
+                if processor is not None:
+                    compiled_operator = self._cached(operator, [operator])
+                compiled_operators.append(_traced(compiled_operator, _stage_name([operator]), observers))
+        return compiled_operators
+
+    def _cached(self, compiled_operator, operators):
+        """
+        Returns an operator that looks up the result of the specified
+        compiled operator in the cache of this pipeline before applying it.
+
+        :param compiled_operator: Operator to be applied on cache misses
+        :type compiled_operator: callable
+        :param operators: Configured processor operators the compiled operator consists of
+        :type operators: list
+        :return: Caching operator
+        :rtype: callable
+        """
+        if self.cache is None:
+            return compiled_operator
+
+        def cached_operator(asset):
+            key = RenditionCache.key(asset, operators)
+            try:
+                return self.cache[key]
+            except KeyError:
+                pass
+            processed_asset = compiled_operator(asset)
+            if processed_asset is not asset:
+                self.cache[key] = processed_asset
+            return processed_asset
+        return cached_operator
 
     def add(self, operator):
         """
@@ -583,6 +1364,278 @@ class Pipeline:
         self.operators.append(operator)
 
 
+class FanOut:
+    """
+    Represents a processing stage that feeds each asset into several
+    pipelines (branches) and produces one processed asset per branch.
+
+    Branches that start with operators of the same processor are processed
+    together if the processor supports it (see
+    :func:`~madam.core.Processor.fan_out`), e.g. to share the decoded
+    essence between all renditions of an asset.
+
+    Observers of the fan-out are notified about these shared stages, whereas
+    the remaining stages are reported to the observers of the branches.
+    """
+    def __init__(self, *branches, observers=None):
+        """
+        Initializes a new `FanOut` with the specified branches.
+
+        :param \\*branches: Pipelines that are applied to every asset
+        :type \\*branches: Pipeline
+        :param observers: Callables that receive the measurements of each shared stage
+        :type observers: iterable or None
+        """
+        self.branches = list(branches)
+        self.observers = list(observers) if observers else []
+
+    def process(self, *assets):
+        """
+        Applies all branches to the specified assets.
+
+        :param \\*assets: Asset objects to be processed
+        :type \\*assets: Asset
+        :return: Generator with a tuple of the processed assets of all branches for each asset
+        """
+        stages = self._compile()
+        for asset in assets:
+            yield self._apply_stages(stages, asset)
+
+    def stream(self, assets, max_in_flight=1):
+        """
+        Applies all branches to the assets of the specified iterable.
+
+        Like :func:`~madam.core.Pipeline.stream`, at most `max_in_flight`
+        assets are processed at the same time.
+
+        :param assets: Asset objects to be processed
+        :type assets: iterable
+        :param max_in_flight: Maximum number of assets that are processed concurrently
+        :type max_in_flight: int
+        :return: Generator with a tuple of the processed assets of all branches for each asset
+        """
+        stages = self._compile()
+        return _stream(functools.partial(self._apply_stages, stages), assets, max_in_flight)
+
+    def astream(self, assets, max_in_flight=1):
+        """
+        Applies all branches to the assets of the specified asynchronous or
+        regular iterable.
+
+        Like :func:`~madam.core.Pipeline.astream`, at most `max_in_flight`
+        assets are processed at the same time without blocking the event loop.
+
+        :param assets: Asset objects to be processed
+        :type assets: async iterable or iterable
+        :param max_in_flight: Maximum number of assets that are processed concurrently
+        :type max_in_flight: int
+        :return: Asynchronous iterator with a tuple of the processed assets of all branches for each asset
+        """
+        stages = self._compile()
+        return _AsyncStream(functools.partial(self._apply_stages, stages), assets, max_in_flight)
+
+    def _apply_stages(self, stages, asset):
+        processed_assets = [None] * len(self.branches)
+        for branch_indices, stage in stages:
+            for branch_index, processed_asset in zip(branch_indices, stage(asset)):
+                processed_assets[branch_index] = processed_asset
+        return tuple(processed_assets)
+
+    def add(self, branch):
+        """
+        Appends the specified pipeline as a branch.
+
+        :param branch: Pipeline to be added
+        :type branch: Pipeline
+        """
+        self.branches.append(branch)
+
+    def _compile(self):
+        """
+        Returns the stages that are needed to process all branches.
+
+        Each stage is a tuple of the indices of the branches it produces and
+        an operator that returns the processed assets for these branches.
+
+        :return: Stages of this fan-out
+        :rtype: list
+        """
+        heads_by_processor = OrderedDict()
+        stages = []
+        for branch_index, branch in enumerate(self.branches):
+            operators = list(branch.operators)
+            processor = _bound_processor(operators[0]) if operators else None
+            if processor is None:
+                stages.append(([branch_index], _branch_stage(branch)))
+                continue
+            head_length = 1
+            while head_length < len(operators) and _bound_processor(operators[head_length]) is processor:
+                head_length += 1
+            heads_by_processor.setdefault(processor, []).append((branch_index, operators[:head_length],
+                                                                 operators[head_length:]))
+
+        for processor, heads in heads_by_processor.items():
+            fanned_operator = None
+            if len(heads) > 1:
+                fanned_operator = processor.fan_out([head for _, head, _ in heads])
+            if fanned_operator is None:
+                for branch_index, _, _ in heads:
+                    stages.append(([branch_index], _branch_stage(self.branches[branch_index])))
+                continue
+            tails = []
+            for branch_index, _, tail in heads:
+                branch = self.branches[branch_index]
+                tail_pipeline = Pipeline(cache=branch.cache, observers=branch.observers)
+                tail_pipeline.operators.extend(tail)
+                tails.append(tail_pipeline._compile())
+            fanned_operator = _traced(fanned_operator, ' | '.join(_stage_name(head) for _, head, _ in heads),
+                                      self.observers)
+            stages.append(([branch_index for branch_index, _, _ in heads],
+                           _fanned_stage(fanned_operator, tails)))
+        return stages
+
+
+def _dry_run(operators, metadata):
+    for operator in operators:
+        if not isinstance(operator, OperatorSpec):
+            return None
+        metadata = operator.dry_run(metadata)
+        if metadata is None:
+            return None
+    return metadata
+
+
+def _apply_operators(operators, asset):
+    processed_asset = asset
+    for operator in operators:
+        processed_asset = operator(processed_asset)
+    return processed_asset
+
+
+def _stream(apply, assets, max_in_flight):
+    """
+    Returns a generator that applies the specified function to the specified
+    assets with a bounded number of concurrent applications and yields the
+    results in input order.
+    """
+    if max_in_flight < 1:
+        raise ValueError('Maximum number of assets in flight must be positive, not %r' % max_in_flight)
+    if max_in_flight == 1:
+        return (apply(asset) for asset in assets)
+    return _stream_concurrently(apply, assets, max_in_flight)
+
+
+def _stream_concurrently(apply, assets, max_in_flight):
+    in_flight = deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        try:
+            for asset in assets:
+                in_flight.append(executor.submit(apply, asset))
+                if len(in_flight) >= max_in_flight:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+class _AsyncStream:
+    """
+    Asynchronous iterator that applies a function to the assets of an
+    asynchronous or regular iterable in a thread pool, with a bounded number
+    of concurrent applications, and returns the results in input order.
+
+    It is implemented with generator-based coroutines, so that the module can
+    still be compiled by Python versions without `async` syntax.
+    """
+    def __init__(self, apply, assets, max_in_flight):
+        if max_in_flight < 1:
+            raise ValueError('Maximum number of assets in flight must be positive, not %r' % max_in_flight)
+        self._apply = apply
+        self._assets = assets
+        self._max_in_flight = max_in_flight
+        self._source = None
+        self._is_async = hasattr(assets, '__aiter__')
+        self._exhausted = False
+        self._in_flight = deque()
+        self._executor = None
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        return self._next()
+
+    @coroutine
+    def _next(self):
+        loop = asyncio.get_event_loop()
+        if self._source is None:
+            self._source = self._assets.__aiter__() if self._is_async else iter(self._assets)
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._max_in_flight)
+        while not self._exhausted and len(self._in_flight) < self._max_in_flight:
+            try:
+                if self._is_async:
+                    asset = yield from _awaitable(self._source.__anext__())
+                else:
+                    asset = next(self._source)
+            except (StopAsyncIteration, StopIteration):
+                self._exhausted = True
+                break
+            self._in_flight.append(loop.run_in_executor(self._executor, self._apply, asset))
+        if not self._in_flight:
+            self.close()
+            raise StopAsyncIteration
+        try:
+            result = yield from self._in_flight.popleft()
+        except BaseException:
+            self.close()
+            raise
+        return result
+
+    def close(self):
+        """
+        Cancels the processing of pending assets and releases the threads.
+        """
+        for future in self._in_flight:
+            future.cancel()
+        self._in_flight.clear()
+        self._exhausted = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    @coroutine
+    def aclose(self):
+        self.close()
+        if self._is_async and self._source is not None and hasattr(self._source, 'aclose'):
+            yield from _awaitable(self._source.aclose())
+
+
+def _awaitable(awaitable):
+    """
+    Returns an iterable that awaits the specified awaitable when it is used
+    with `yield from` in a generator-based coroutine.
+    """
+    return awaitable.__await__() if hasattr(awaitable, '__await__') else awaitable
+
+
+def _branch_stage(branch):
+    def branch_stage(asset):
+        return list(branch.process(asset))
+    return branch_stage
+
+
+def _fanned_stage(fanned_operator, tails):
+    def fanned_stage(asset):
+        processed_assets = []
+        for processed_asset, tail_operators in zip(fanned_operator(asset), tails):
+            for operator in tail_operators:
+                processed_asset = operator(processed_asset)
+            processed_assets.append(processed_asset)
+        return processed_assets
+    return fanned_stage
+
+
 class Processor(metaclass=abc.ABCMeta):
     """
     Represents an entity that can create :class:`~madam.core.Asset` objects
@@ -590,7 +1643,20 @@ class Processor(metaclass=abc.ABCMeta):
 
     Every `Processor` needs to have a no-args `__init__` method in order to
     be registered correctly.
+
+    If a :class:`~madam.core.RenditionCache` is assigned to the `cache`
+    attribute, the results of all operators of the processor will be cached.
+
+    Processors that accept optional keyword arguments for `__init__` store
+    them in the `config` attribute. The configuration is part of the identity
+    of configured operators, so that cached results of differently configured
+    processors are kept apart.
     """
+    #: Cache for the results of the operators of this processor
+    cache = None
+    #: Keyword arguments this processor was initialized with
+    config = frozendict()
+
     @abc.abstractmethod
     def __init__(self):
         """
@@ -624,6 +1690,80 @@ class Processor(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError()
 
+    def fuse(self, operators):
+        """
+        Returns a single operator that is equivalent to applying the specified
+        operators of this processor one after another, or `None` if the
+        operators cannot be fused.
+
+        Fusing allows a processor to avoid repeated decoding and encoding of
+        the essence between consecutive operations. The default
+        implementation does not fuse any operators.
+
+        :param operators: Configured operators bound to this processor
+        :type operators: list
+        :return: Fused operator or `None`
+        :rtype: callable or None
+        """
+        return None
+
+    def optimize(self, operators, metadata):
+        """
+        Returns operators of this processor that are equivalent to applying
+        the specified operators one after another to an asset with the
+        specified metadata.
+
+        Processors can use this to remove operators without effect, to merge
+        consecutive operators, or to move cheap operators ahead of expensive
+        ones. The default implementation returns the operators unchanged.
+
+        :param operators: Configured operators bound to this processor
+        :type operators: list
+        :param metadata: Metadata of the asset the operators will be applied
+            to, or `None` if it is unknown
+        :type metadata: dict or None
+        :return: Equivalent operators
+        :rtype: list
+        """
+        return operators
+
+    def dry_run(self, operator, metadata):
+        """
+        Returns the metadata of the asset that results from applying the
+        specified operator of this processor to an asset with the specified
+        metadata, without reading or processing any essence.
+
+        The default implementation cannot determine the metadata of any
+        operator and returns `None`.
+
+        :param operator: Configured operator bound to this processor
+        :type operator: OperatorSpec
+        :param metadata: Metadata of the source asset
+        :type metadata: dict
+        :return: Metadata of the resulting asset or `None` if it cannot be
+            determined without processing the essence
+        :rtype: dict or None
+        """
+        return None
+
+    def fan_out(self, branches):
+        """
+        Returns an operator that applies each of the specified sequences of
+        operators (branches) of this processor to the same asset and returns
+        a list with one processed asset per branch, or `None` if the branches
+        cannot be processed together.
+
+        Processing the branches together allows a processor to decode the
+        essence only once for all branches. The default implementation does
+        not support this.
+
+        :param branches: Sequences of configured operators bound to this processor
+        :type branches: list[list]
+        :return: Fan-out operator or `None`
+        :rtype: callable or None
+        """
+        return None
+
 
 class MetadataProcessor(metaclass=abc.ABCMeta):
     """
@@ -711,16 +1851,193 @@ def operator(function):
         convert_to_opus = processor.convert(mime_type='audio/opus')
         convert_to_opus(asset)
 
+    The configured operator is an :class:`~madam.core.OperatorSpec`. If the
+    processor has a :attr:`~madam.core.Processor.cache`, results are looked
+    up in the cache before the method is applied.
+
     :param function: Method to decorate
     :return: Configurable method
     """
     @functools.wraps(function)
     def wrapper(self, **kwargs):
-        configured_operator = functools.partial(function, self, **kwargs)
+        configured_operator = OperatorSpec(self, function.__name__, kwargs)
         return configured_operator
     return wrapper
 
 
+@functools.lru_cache(maxsize=None)
+def _operator_signature(function):
+    """
+    Returns the signature of the configurable parameters of the specified
+    operator function, i.e. without the processor and the asset.
+
+    :param function: Operator function
+    :type function: callable
+    :return: Signature of the configuration parameters
+    :rtype: inspect.Signature
+    """
+    signature = inspect.signature(function)
+    return signature.replace(parameters=list(signature.parameters.values())[2:])
+
+
+_processor_instances = {}
+
+
+def _shared_processor(processor_class, config=None):
+    """
+    Returns a processor instance of the specified class and configuration
+    that is shared by all operator specs which are not bound to a specific
+    processor instance.
+    """
+    key = (processor_class, _immutable(config or {}))
+    processor = _processor_instances.get(key)
+    if processor is None:
+        processor = _processor_instances.setdefault(key, processor_class(**(config or {})))
+    return processor
+
+
+def _restore_operator_spec(processor_class, config, name, kwargs):
+    return OperatorSpec(_shared_processor(processor_class, config), name, kwargs)
+
+
+class OperatorSpec:
+    """
+    Represents an operator of a processor together with its configuration.
+
+    Operator specs are created by calling a method that was decorated with
+    :func:`~madam.core.operator`. They are callable with an asset, and they
+    are immutable values: two specs are equal if they refer to the same
+    operator of the same processor class with the same configuration,
+    including default values.
+
+    A spec only refers to its processor by class and configuration when it
+    is pickled. After unpickling, a shared processor instance of that class
+    and configuration is used.
+    """
+    __slots__ = 'processor_class', 'name', 'kwargs', '_processor', '_digest'
+
+    def __init__(self, processor, name, kwargs=None):
+        """
+        Initializes a new `OperatorSpec`.
+
+        :param processor: Processor instance or processor class providing the operator
+        :type processor: Processor or type
+        :param name: Name of the operator method
+        :type name: str
+        :param kwargs: Configuration of the operator
+        :type kwargs: dict or None
+        :raise TypeError: if the configuration contains unknown parameters
+        """
+        if isinstance(processor, type):
+            self.processor_class = processor
+            self._processor = None
+        else:
+            self.processor_class = type(processor)
+            self._processor = processor
+        self.name = name
+        signature = _operator_signature(self.function)
+        arguments = {parameter.name: parameter.default for parameter in signature.parameters.values()
+                     if parameter.default is not parameter.empty}
+        arguments.update(signature.bind_partial(**(kwargs or {})).arguments)
+        self.kwargs = _immutable(arguments)
+        self._digest = None
+
+    @property
+    def function(self):
+        """
+        The undecorated operator method.
+        """
+        return getattr(self.processor_class, self.name).__wrapped__
+
+    @property
+    def processor(self):
+        """
+        The processor instance the operator is applied with.
+        """
+        if self._processor is None:
+            self._processor = _shared_processor(self.processor_class)
+        return self._processor
+
+    @property
+    def digest(self):
+        """
+        Hexadecimal digest of this spec that is stable across processes.
+        """
+        if self._digest is None:
+            description = '%s.%s%s.%s%s' % (self.processor_class.__module__, self.processor_class.__qualname__,
+                                            _canonical(self.processor.config), self.name, _canonical(self.kwargs))
+            self._digest = hashlib.sha256(description.encode('utf-8')).hexdigest()
+        return self._digest
+
+    def __call__(self, asset):
+        """
+        Applies the operator to the specified asset.
+
+        :param asset: Asset to be processed
+        :type asset: Asset
+        :return: Processed asset
+        :rtype: Asset
+        """
+        processor = self.processor
+        cache = processor.cache
+        if cache is None or not isinstance(asset, Asset):
+            return self.function(processor, asset, **self.kwargs)
+        key = RenditionCache.key(asset, [self])
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        processed_asset = self.function(processor, asset, **self.kwargs)
+        if processed_asset is not asset:
+            cache[key] = processed_asset
+        return processed_asset
+
+    def dry_run(self, asset):
+        """
+        Returns the metadata of the asset that results from applying the
+        operator to the specified asset without processing its essence (see
+        :func:`~madam.core.Processor.dry_run`).
+
+        :param asset: Asset to be processed, or its metadata
+        :type asset: Asset or dict
+        :return: Metadata of the resulting asset, or `None` if it cannot be
+            determined without processing the essence
+        :rtype: dict or None
+        """
+        return self.processor.dry_run(self, getattr(asset, 'metadata', asset))
+
+    def __eq__(self, other):
+        if isinstance(other, OperatorSpec):
+            return (self.processor_class is other.processor_class and self.name == other.name and
+                    self.kwargs == other.kwargs and self.processor.config == other.processor.config)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __reduce__(self):
+        return _restore_operator_spec, (self.processor_class, _mutable(self.processor.config), self.name,
+                                        _mutable(self.kwargs))
+
+    def __repr__(self):
+        return '%s.%s(%s)' % (self.processor_class.__qualname__, self.name,
+                              ', '.join('%s=%r' % item for item in sorted(self.kwargs.items())))
+
+
+def _bound_processor(operator):
+    """
+    Returns the processor instance that the specified configured operator is
+    bound to.
+
+    :param operator: Operator created by a method decorated with :func:`~madam.core.operator`
+    :return: Processor of the operator, or `None` if the operator is not bound to a processor
+    :rtype: Processor or None
+    """
+    if isinstance(operator, OperatorSpec):
+        return operator.processor
+    return None
+
+
 class OperatorError(Exception):
     """
     Represents an error that is raised whenever an error occurs in an
@@ -1,12 +1,11 @@
 import datetime
 import io
-import shutil
-import tempfile
 from fractions import Fraction
 
 import pyexiv2
 from bidict import bidict
 
+from madam import container
 from madam.core import MetadataProcessor, UnsupportedFormatError
 from madam.mime import MimeType
 
@@ -27,12 +26,31 @@ def _convert_mapping(mapping):
            lambda value: bidi.inv[value]
 
 
+def _conversion_tables(metadata_to_exiv2, converters):
+    """
+    Returns tables that map the keys of each metadata format to the
+    corresponding keys and conversion functions, both from exiv2 to MADAM
+    and from MADAM to exiv2.
+    """
+    exiv2_to_madam = {}
+    madam_to_exiv2 = {}
+    for madam_key, exiv2_key in metadata_to_exiv2.items():
+        metadata_format = exiv2_key.split('.', 1)[0].lower()
+        convert_to_madam, convert_to_exiv2 = converters[madam_key]
+        exiv2_to_madam.setdefault(metadata_format, {})[exiv2_key] = madam_key, convert_to_madam
+        madam_to_exiv2.setdefault(metadata_format, {})[madam_key] = exiv2_key, convert_to_exiv2
+    return exiv2_to_madam, madam_to_exiv2
+
+
 class Exiv2MetadataProcessor(MetadataProcessor):
     """
     Represents a metadata processor using the exiv2 library.
     """
     supported_mime_types = {
-        MimeType('image/jpeg')
+        MimeType('image/jpeg'),
+        MimeType('image/png'),
+        MimeType('image/tiff'),
+        MimeType('image/webp'),
     }
 
     metadata_to_exiv2 = bidict({
@@ -142,6 +160,8 @@ class Exiv2MetadataProcessor(MetadataProcessor):
         'subjects': _convert_sequence(__STRING),
     }
 
+    __exiv2_to_madam, __madam_to_exiv2 = _conversion_tables(metadata_to_exiv2, converters)
+
     def __init__(self):
         """
         Initializes a new `Exiv2MetadataProcessor`.
@@ -152,87 +172,131 @@ class Exiv2MetadataProcessor(MetadataProcessor):
     def formats(self):
         return 'exif', 'iptc'
 
+    @staticmethod
+    def to_madam(metadata_format, exiv2_values):
+        """
+        Converts exiv2 values of a metadata format to MADAM metadata. Keys
+        without a MADAM equivalent are ignored.
+
+        :param metadata_format: Metadata format, e.g. `'exif'`
+        :type metadata_format: str
+        :param exiv2_values: Values by exiv2 key
+        :type exiv2_values: dict
+        :return: Values by MADAM key
+        :rtype: dict
+        """
+        conversions = Exiv2MetadataProcessor.__exiv2_to_madam.get(metadata_format, {})
+        metadata = {}
+        for exiv2_key, exiv2_value in exiv2_values.items():
+            conversion = conversions.get(exiv2_key)
+            if conversion is not None:
+                madam_key, convert_to_madam = conversion
+                metadata[madam_key] = convert_to_madam(exiv2_value)
+        return metadata
+
+    @staticmethod
+    def to_exiv2(metadata_format, metadata):
+        """
+        Converts MADAM metadata of a metadata format to exiv2 values. Keys
+        without an exiv2 equivalent are ignored.
+
+        :param metadata_format: Metadata format, e.g. `'exif'`
+        :type metadata_format: str
+        :param metadata: Values by MADAM key
+        :type metadata: dict
+        :return: Values by exiv2 key
+        :rtype: dict
+        """
+        conversions = Exiv2MetadataProcessor.__madam_to_exiv2.get(metadata_format, {})
+        exiv2_values = {}
+        for madam_key, madam_value in metadata.items():
+            conversion = conversions.get(madam_key)
+            if conversion is not None:
+                exiv2_key, convert_to_exiv2 = conversion
+                exiv2_values[exiv2_key] = convert_to_exiv2(madam_value)
+        return exiv2_values
+
+    @staticmethod
+    def _read_metadata(data, error_message):
+        """
+        Reads the metadata of the specified image data from memory, without
+        writing the data to disk.
+
+        :param data: Image data
+        :type data: bytes
+        :param error_message: Message of the error that is raised if the
+            data cannot be read
+        :type error_message: str
+        :return: Metadata of the image data
+        :rtype: pyexiv2.ImageMetadata
+        :raises UnsupportedFormatError: if the file format is not supported
+        """
+        metadata = pyexiv2.ImageMetadata.from_buffer(data)
+        try:
+            metadata.read()
+        except OSError:
+            raise UnsupportedFormatError(error_message)
+        return metadata
+
     def read(self, file):
-        with tempfile.NamedTemporaryFile() as tmp:
-            tmp.write(file.read())
-            tmp.flush()
-            metadata = pyexiv2.ImageMetadata(tmp.name)
-            try:
-                metadata.read()
-            except OSError:
-                raise UnsupportedFormatError('Unknown file format.')
+        data = file.read()
+        try:
+            data_formats = container.metadata_formats(data)
+        except ValueError:
+            # Lets exiv2 decide whether the data has another supported format
+            data_formats = None
+        if data_formats is not None:
+            if not data_formats.intersection(self.formats):
+                return {}
+            if data[:2] == b'\xff\xd8':
+                # Exiv2 only needs to parse the metadata segments of JPEG data
+                data = container.jpeg_metadata(data, self.formats)
+        metadata = Exiv2MetadataProcessor._read_metadata(data, 'Unknown file format.')
         if MimeType(metadata.mime_type) not in Exiv2MetadataProcessor.supported_mime_types:
             raise UnsupportedFormatError('Unsupported format: %s' % metadata.mime_type)
         metadata_by_format = {}
         for metadata_format in self.formats:
-            format_metadata = {}
-            for exiv2_key in getattr(metadata, metadata_format + '_keys'):
-                madam_key = Exiv2MetadataProcessor.metadata_to_exiv2.inv.get(exiv2_key)
-                if madam_key is None:
-                    continue
-                exiv2_value = metadata[exiv2_key].value
-                convert_to_madam, _ = Exiv2MetadataProcessor.converters[madam_key]
-                format_metadata[madam_key] = convert_to_madam(exiv2_value)
+            conversions = Exiv2MetadataProcessor.__exiv2_to_madam[metadata_format]
+            exiv2_values = {exiv2_key: metadata[exiv2_key].value
+                            for exiv2_key in getattr(metadata, metadata_format + '_keys')
+                            if exiv2_key in conversions}
+            format_metadata = Exiv2MetadataProcessor.to_madam(metadata_format, exiv2_values)
             if format_metadata:
                 metadata_by_format[metadata_format] = format_metadata
         return metadata_by_format
 
     def strip(self, file):
-        result = io.BytesIO()
-        with tempfile.NamedTemporaryFile() as tmp:
-            tmp.write(file.read())
-            tmp.flush()
-            metadata = pyexiv2.ImageMetadata(tmp.name)
+        data = file.read()
+        try:
+            # JPEG, PNG, and WebP files are stripped by copying all chunks
+            # that do not contain metadata
+            return io.BytesIO(container.strip(data))
+        except ValueError:
+            pass
+        metadata = Exiv2MetadataProcessor._read_metadata(data, 'Unknown file format.')
 
+        if metadata:
             try:
-                metadata.read()
+                metadata.clear()
+                metadata.write()
             except OSError:
                 raise UnsupportedFormatError('Unknown file format.')
 
-            if metadata:
-                try:
-                    metadata.clear()
-                    metadata.write()
-                except OSError:
-                    raise UnsupportedFormatError('Unknown file format.')
-
-            tmp.seek(0)
-
-            shutil.copyfileobj(tmp, result)
-            result.seek(0)
-
-        return result
+        # The buffer contains the modified image data after writing
+        return io.BytesIO(metadata.buffer)
 
     def combine(self, essence, metadata_by_format):
-        result = io.BytesIO()
-        with tempfile.NamedTemporaryFile() as tmp:
-            tmp.write(essence.read())
-            tmp.flush()
-            exiv2_metadata = pyexiv2.ImageMetadata(tmp.name)
+        exiv2_metadata = Exiv2MetadataProcessor._read_metadata(essence.read(), 'Unknown essence format.')
 
-            try:
-                exiv2_metadata.read()
-            except OSError:
-                raise UnsupportedFormatError('Unknown essence format.')
-
-            for metadata_format, metadata in metadata_by_format.items():
-                if metadata_format not in self.formats:
-                    raise UnsupportedFormatError('Metadata format %r is not supported.' % metadata_format)
-                for madam_key, madam_value in metadata.items():
-                    exiv2_key = Exiv2MetadataProcessor.metadata_to_exiv2.get(madam_key)
-                    if exiv2_key is None:
-                        continue
-                    _, convert_to_exiv2 = Exiv2MetadataProcessor.converters[madam_key]
-                    exiv2_metadata[exiv2_key] = convert_to_exiv2(madam_value)
-
-            try:
-                exiv2_metadata.write()
-                tmp.flush()
-                tmp.seek(0)
-            except OSError:
-                raise UnsupportedFormatError('Could not write metadata: %r' % metadata_by_format)
+        for metadata_format, metadata in metadata_by_format.items():
+            if metadata_format not in self.formats:
+                raise UnsupportedFormatError('Metadata format %r is not supported.' % metadata_format)
+            for exiv2_key, exiv2_value in Exiv2MetadataProcessor.to_exiv2(metadata_format, metadata).items():
+                exiv2_metadata[exiv2_key] = exiv2_value
 
-            shutil.copyfileobj(tmp, result)
-            result.seek(0)
+        try:
+            exiv2_metadata.write()
+        except OSError:
+            raise UnsupportedFormatError('Could not write metadata: %r' % metadata_by_format)
 
-        return result
+        return io.BytesIO(exiv2_metadata.buffer)
@@ -71,6 +71,54 @@ class _FFmpegContext(tempfile.TemporaryDirectory):
         super().__exit__(exc_type, exc_val, exc_tb)
 
 
+class _FFmpegPlan:
+    """
+    Represents the combined FFmpeg options of several fused operators and the
+    properties of the resulting asset.
+    """
+    def __init__(self, metadata):
+        """
+        Initializes a new `_FFmpegPlan` that does not change an asset with
+        the specified metadata.
+
+        :param metadata: Metadata of the source asset
+        :type metadata: dict
+        """
+        self.source_mime_type = MimeType(metadata['mime_type'])
+        self.source_duration = metadata.get('duration')
+        self.mime_type = self.source_mime_type
+        self.width = metadata.get('width')
+        self.height = metadata.get('height')
+        self.duration = self.source_duration
+        self.seek = 0.0
+        self.filters = []
+        self.stream_options = {}
+
+    def is_trimmed(self):
+        return self.seek > 0 or self.duration != self.source_duration
+
+    def is_converted(self):
+        return self.mime_type != self.source_mime_type or any(self.stream_options.values())
+
+    def changes_essence(self):
+        return bool(self.filters) or self.is_trimmed() or self.is_converted()
+
+    def metadata(self):
+        """
+        Returns the metadata of the asset that results from this plan.
+
+        :return: Metadata of the resulting asset
+        :rtype: dict
+        """
+        metadata = dict(mime_type=str(self.mime_type))
+        if self.mime_type.type in ('image', 'video'):
+            metadata['width'] = self.width
+            metadata['height'] = self.height
+        if self.mime_type.type in ('audio', 'video'):
+            metadata['duration'] = self.duration
+        return metadata
+
+
 class FFmpegProcessor(Processor):
     """
     Represents a processor that uses FFmpeg to read audio and video data.
@@ -143,6 +191,8 @@ class FFmpegProcessor(Processor):
         }
     }
 
+    __fusable_operators = frozenset({'convert', 'crop', 'resize', 'trim'})
+
     __container_options = {
         MimeType('video/quicktime'): [
             '-movflags', '+faststart',
@@ -308,38 +358,7 @@ class FFmpegProcessor(Processor):
         with _FFmpegContext(asset.essence, result) as ctx:
             command = ['ffmpeg', '-loglevel', 'error',
                        '-i', ctx.input_path]
-            if video:
-                if 'codec' in video:
-                    if video['codec']:
-                        command.extend(['-c:v', video['codec']])
-                        codec_options = FFmpegProcessor.__codec_options.get('video', {})
-                        command.extend(codec_options.get(video['codec'], []))
-                    else:
-                        command.extend(['-vn'])
-                if video.get('bitrate'):
-                    # Set minimum at 50% of bitrate and maximum at 145% of bitrate
-                    # (see https://developers.google.com/media/vp9/settings/vod/)
-                    command.extend(['-minrate', '%dk' % round(0.5*video['bitrate']),
-                                    '-b:v', '%dk' % video['bitrate'],
-                                    '-maxrate', '%dk' % round(1.45*video['bitrate'])])
-            if audio:
-                if 'codec' in audio:
-                    if audio['codec']:
-                        command.extend(['-c:a', audio['codec']])
-                        codec_options = FFmpegProcessor.__codec_options.get('audio', {})
-                        command.extend(codec_options.get(audio['codec'], []))
-                    else:
-                        command.extend(['-an'])
-                if audio.get('bitrate'):
-                    command.extend(['-b:a', '%dk' % audio['bitrate']])
-            if subtitle:
-                if 'codec' in subtitle:
-                    if subtitle['codec']:
-                        command.extend(['-c:s', subtitle['codec']])
-                        codec_options = FFmpegProcessor.__codec_options.get('subtitles', {})
-                        command.extend(codec_options.get(subtitle['codec'], []))
-                    else:
-                        command.extend(['-sn'])
+            command.extend(FFmpegProcessor._stream_options(video=video, audio=audio, subtitle=subtitle))
 
             container_options = FFmpegProcessor.__container_options.get(mime_type, [])
             command.extend(container_options)
@@ -364,6 +383,355 @@ class FFmpegProcessor(Processor):
 
         return Asset(essence=result, **metadata)
 
+    @staticmethod
+    def _stream_options(video=None, audio=None, subtitle=None):
+        """
+        Returns the FFmpeg command line options for the specified video,
+        audio, and subtitle stream options.
+
+        :param video: Dictionary with options for video streams.
+        :type video: dict or None
+        :param audio: Dictionary with options for audio streams.
+        :type audio: dict or None
+        :param subtitle: Dictionary with the options for subtitle streams.
+        :type subtitle: dict or None
+        :return: Command line options
+        :rtype: list
+        """
+        options = []
+        if video:
+            if 'codec' in video:
+                if video['codec']:
+                    options.extend(['-c:v', video['codec']])
+                    codec_options = FFmpegProcessor.__codec_options.get('video', {})
+                    options.extend(codec_options.get(video['codec'], []))
+                else:
+                    options.extend(['-vn'])
+            if video.get('bitrate'):
+                # Set minimum at 50% of bitrate and maximum at 145% of bitrate
+                # (see https://developers.google.com/media/vp9/settings/vod/)
+                options.extend(['-minrate', '%dk' % round(0.5*video['bitrate']),
+                                '-b:v', '%dk' % video['bitrate'],
+                                '-maxrate', '%dk' % round(1.45*video['bitrate'])])
+        if audio:
+            if 'codec' in audio:
+                if audio['codec']:
+                    options.extend(['-c:a', audio['codec']])
+                    codec_options = FFmpegProcessor.__codec_options.get('audio', {})
+                    options.extend(codec_options.get(audio['codec'], []))
+                else:
+                    options.extend(['-an'])
+            if audio.get('bitrate'):
+                options.extend(['-b:a', '%dk' % audio['bitrate']])
+        if subtitle:
+            if 'codec' in subtitle:
+                if subtitle['codec']:
+                    options.extend(['-c:s', subtitle['codec']])
+                    codec_options = FFmpegProcessor.__codec_options.get('subtitles', {})
+                    options.extend(codec_options.get(subtitle['codec'], []))
+                else:
+                    options.extend(['-sn'])
+        return options
+
+    def optimize(self, operators, metadata):
+        """
+        Returns operators that are equivalent to the specified operators for
+        an asset with the specified metadata:
+
+        - Resizes to the current dimensions, crops of the whole frame, trims
+          of the whole duration, and conversions to the current MIME type
+          without stream options are removed.
+        - Consecutive resizes are merged into a single resize.
+
+        :param operators: Configured operators of this processor
+        :type operators: list
+        :param metadata: Metadata of the asset or `None` if it is unknown
+        :type metadata: dict or None
+        :return: Equivalent operators
+        :rtype: list
+        """
+        metadata = metadata or {}
+        mime_type = metadata.get('mime_type')
+        source_state = (metadata.get('width'), metadata.get('height'), metadata.get('duration'),
+                        MimeType(mime_type) if mime_type else None)
+        # Planned operators with the dimensions, duration, and MIME type before and after each operator
+        planned = []
+        for operator in operators:
+            state = planned[-1][2] if planned else source_state
+            width, height, duration, mime_type = state
+            kwargs = operator.kwargs
+
+            if operator.name == 'resize':
+                if planned and planned[-1][0].name == 'resize':
+                    state = planned.pop()[1]
+                    width, height, duration, mime_type = state
+                if (kwargs['width'], kwargs['height']) == (width, height):
+                    continue
+            if operator.name == 'crop' and (kwargs['x'], kwargs['y'], kwargs['width'], kwargs['height']) == \
+                    (0, 0, width, height):
+                continue
+            if operator.name == 'trim' and kwargs['from_seconds'] == 0 and \
+                    (kwargs['to_seconds'] == 0 or duration is not None and kwargs['to_seconds'] == duration):
+                continue
+            if operator.name == 'convert' and mime_type is not None and MimeType(kwargs['mime_type']) == mime_type \
+                    and not any((kwargs['video'], kwargs['audio'], kwargs['subtitle'])):
+                continue
+
+            planned.append((operator, state, FFmpegProcessor._estimate(operator, state)))
+        return [operator for operator, _, _ in planned]
+
+    def dry_run(self, operator, metadata):
+        """
+        Returns the metadata of the asset that results from applying the
+        specified operator to an asset with the specified metadata. The
+        metadata is calculated without running FFmpeg.
+
+        :param operator: Configured operator of this processor
+        :type operator: OperatorSpec
+        :param metadata: Metadata of the source asset
+        :type metadata: dict
+        :return: MIME type, dimensions, and duration of the resulting asset,
+            or `None` if they cannot be determined from the metadata
+        :rtype: dict or None
+        :raises OperatorError: if the operator cannot be applied to an asset
+            with the specified metadata
+        :raises UnsupportedFormatError: if the operator does not support the
+            specified MIME types
+        """
+        if not metadata.get('mime_type'):
+            return None
+        kwargs = operator.kwargs
+        if operator.name in FFmpegProcessor.__fusable_operators:
+            plan = _FFmpegPlan(metadata)
+            if operator.name == 'trim' and plan.duration is None and kwargs['to_seconds'] <= 0 or \
+                    operator.name == 'crop' and None in (plan.width, plan.height):
+                return None
+            getattr(self, '_plan_%s' % operator.name)(plan, **kwargs)
+            return plan.metadata()
+        if operator.name == 'extract_frame':
+            mime_type = MimeType(kwargs['mime_type'])
+            if MimeType(metadata['mime_type']).type != 'video' or mime_type not in self.__mime_type_to_codec:
+                raise UnsupportedFormatError('Unsupported asset type: %s' % mime_type)
+            return dict(mime_type=str(mime_type), width=metadata.get('width'), height=metadata.get('height'))
+        if operator.name == 'rotate':
+            if MimeType(metadata['mime_type']).type != 'video':
+                raise UnsupportedFormatError('Unsupported source asset type: %s' % metadata['mime_type'])
+            if kwargs['angle'] % 360.0 == 0.0:
+                return dict(metadata)
+            width, height = FFmpegProcessor._rotated_size(metadata['width'], metadata['height'],
+                                                          kwargs['angle'], kwargs['expand'])
+            return dict(mime_type=metadata['mime_type'], width=width, height=height)
+        return None
+
+    @staticmethod
+    def _estimate(operator, state):
+        """
+        Returns the dimensions, the duration, and the MIME type of an asset
+        after applying the specified operator. Values that cannot be
+        determined without reading the essence are `None`.
+        """
+        width, height, duration, mime_type = state
+        kwargs = operator.kwargs
+        if operator.name == 'resize':
+            width, height = kwargs['width'], kwargs['height']
+        elif operator.name == 'convert':
+            mime_type = MimeType(kwargs['mime_type'])
+        elif operator.name == 'trim':
+            to_seconds = kwargs['to_seconds']
+            if to_seconds <= 0:
+                to_seconds = None if duration is None else duration + to_seconds
+            if to_seconds is None:
+                duration = None
+            elif duration is None:
+                duration = float(to_seconds) - float(kwargs['from_seconds'])
+            else:
+                duration = min(float(to_seconds), duration) - float(kwargs['from_seconds'])
+        elif operator.name == 'crop':
+            if width is None or height is None:
+                return None, None, duration, mime_type
+            min_x = max(0, min(width, kwargs['x']))
+            min_y = max(0, min(height, kwargs['y']))
+            width = max(0, min(width, kwargs['width'] + kwargs['x'])) - min_x
+            height = max(0, min(height, kwargs['height'] + kwargs['y'])) - min_y
+        else:
+            width, height, duration, mime_type = None, None, None, None
+        return width, height, duration, mime_type
+
+    def fuse(self, operators):
+        """
+        Returns an operator that applies all specified operators with a
+        single FFmpeg invocation. Trimming is combined into one seek
+        and duration, and all geometric operations are combined into a single
+        video filter chain, so that the essence is only decoded and encoded
+        once.
+
+        Only the operators `convert`, `crop`, `resize`, and `trim` can be
+        fused.
+
+        :param operators: Configured operators of this processor
+        :type operators: list
+        :return: Fused operator or `None` if an operator cannot be fused
+        :rtype: callable or None
+        """
+        for operator in operators:
+            if operator.name not in FFmpegProcessor.__fusable_operators:
+                return None
+
+        def fused_operator(asset):
+            return self._apply_fanned(asset, [operators])[0]
+        return fused_operator
+
+    def fan_out(self, branches):
+        """
+        Returns an operator that applies each of the specified branches of
+        operators with a single FFmpeg invocation that writes one output per
+        branch. The essence is decoded only once for all outputs, e.g. to
+        create several renditions of a video for adaptive streaming.
+
+        Only the operators `convert`, `crop`, `resize`, and `trim` can be
+        used in the branches.
+
+        :param branches: Sequences of configured operators of this processor
+        :type branches: list[list]
+        :return: Fan-out operator or `None` if an operator cannot be fused
+        :rtype: callable or None
+        """
+        for operators in branches:
+            for operator in operators:
+                if operator.name not in FFmpegProcessor.__fusable_operators:
+                    return None
+
+        def fanned_operator(asset):
+            return self._apply_fanned(asset, branches)
+        return fanned_operator
+
+    def _apply_fanned(self, asset, branches):
+        """
+        Compiles the specified branches of operators into a single FFmpeg
+        command with one output per branch and applies it to the specified
+        asset.
+
+        :param asset: Audio or video asset to be processed
+        :type asset: Asset
+        :param branches: Sequences of configured operators of this processor
+        :type branches: list[list]
+        :return: One asset per branch. If a branch does not change the
+            essence, its result is the specified asset.
+        :rtype: list[Asset]
+        """
+        source_mime_type = MimeType(asset.mime_type)
+        if source_mime_type not in self.__mime_type_to_encoder:
+            raise UnsupportedFormatError('Unsupported asset type: %s' % source_mime_type)
+
+        plans = []
+        for operators in branches:
+            plan = _FFmpegPlan(asset.metadata)
+            for operator in operators:
+                plan_operator = getattr(self, '_plan_' + operator.name)
+                plan_operator(plan, **operator.kwargs)
+            plans.append(plan)
+
+        changing_plans = [plan for plan in plans if plan.changes_essence()]
+        if not changing_plans:
+            return [asset] * len(plans)
+
+        # Seeking on the input is faster, but only possible for a single output
+        seek_input = len(changing_plans) == 1
+
+        processed_assets = {}
+        with tempfile.TemporaryDirectory(prefix='madam') as tmpdir_path:
+            input_path = os.path.join(tmpdir_path, 'input_file')
+            with open(input_path, 'wb') as temp_in:
+                shutil.copyfileobj(asset.essence, temp_in)
+
+            command = ['ffmpeg', '-loglevel', 'error']
+            if seek_input and changing_plans[0].is_trimmed():
+                command.extend(['-ss', str(changing_plans[0].seek), '-t', str(changing_plans[0].duration)])
+            command.extend(['-i', input_path])
+
+            output_paths = []
+            for output_index, plan in enumerate(changing_plans):
+                if not seek_input and plan.is_trimmed():
+                    command.extend(['-ss', str(plan.seek), '-t', str(plan.duration)])
+                if plan.filters:
+                    command.extend(['-filter:v', ','.join(plan.filters)])
+                command.extend(FFmpegProcessor._stream_options(**plan.stream_options))
+                if not (plan.filters or plan.is_converted()):
+                    command.extend(['-codec', 'copy'])
+                command.extend(FFmpegProcessor.__container_options.get(plan.mime_type, []))
+                output_path = os.path.join(tmpdir_path, 'output_file_%d' % output_index)
+                command.extend(['-threads', str(self.__threads),
+                                '-f', self.__mime_type_to_encoder[plan.mime_type], '-y', output_path])
+                output_paths.append(output_path)
+
+            try:
+                subprocess_run(command, stderr=subprocess.PIPE, check=True)
+            except CalledProcessError as ffmpeg_error:
+                error_message = ffmpeg_error.stderr.decode('utf-8')
+                raise OperatorError('Could not process asset: %s' % error_message)
+
+            for plan, output_path in zip(changing_plans, output_paths):
+                with open(output_path, 'rb') as temp_out:
+                    processed_assets[id(plan)] = Asset(essence=temp_out, **plan.metadata())
+
+        return [processed_assets.get(id(plan), asset) for plan in plans]
+
+    def _plan_resize(self, plan, width, height):
+        if width < 1 or height < 1:
+            raise ValueError('Invalid dimensions: %dx%d' % (width, height))
+        if plan.mime_type.type not in ('image', 'video'):
+            raise OperatorError('Cannot resize asset of type %s' % plan.mime_type)
+        plan.filters.append('scale=%d:%d' % (width, height))
+        plan.width = width
+        plan.height = height
+
+    def _plan_convert(self, plan, mime_type, video=None, audio=None, subtitle=None):
+        mime_type = MimeType(mime_type)
+        if mime_type not in self.__mime_type_to_encoder:
+            raise UnsupportedFormatError('Unsupported asset type: %s' % mime_type)
+        plan.mime_type = mime_type
+        plan.stream_options = dict(video=video, audio=audio, subtitle=subtitle)
+
+    def _plan_trim(self, plan, from_seconds=0, to_seconds=0):
+        if plan.mime_type.type not in ('audio', 'video'):
+            raise UnsupportedFormatError('Unsupported source asset type: %s' % plan.mime_type)
+
+        if to_seconds <= 0:
+            to_seconds = plan.duration + to_seconds
+
+        duration = float(to_seconds) - float(from_seconds)
+
+        if duration <= 0:
+            raise ValueError('Start time must be before end time')
+
+        if plan.duration is not None:
+            # The time range cannot extend beyond the end of a previous trim
+            if from_seconds >= plan.duration:
+                raise ValueError('Start time must be before the end of the asset')
+            duration = min(duration, plan.duration - float(from_seconds))
+
+        plan.seek += float(from_seconds)
+        plan.duration = duration
+
+    def _plan_crop(self, plan, x, y, width, height):
+        if plan.mime_type.type != 'video':
+            raise UnsupportedFormatError('Unsupported source asset type: %s' % plan.mime_type)
+
+        if x == 0 and y == 0 and width == plan.width and height == plan.height:
+            return
+
+        max_x = max(0, min(plan.width, width + x))
+        max_y = max(0, min(plan.height, height + y))
+        min_x = max(0, min(plan.width, x))
+        min_y = max(0, min(plan.height, y))
+
+        if min_x == plan.width or min_y == plan.height or max_x <= min_x or max_y <= min_y:
+            raise OperatorError('Invalid cropping area: <x=%r, y=%r, width=%r, height=%r>' % (x, y, width, height))
+
+        plan.width = max_x - min_x
+        plan.height = max_y - min_y
+        plan.filters.append('crop=w=%d:h=%d:x=%d:y=%d' % (plan.width, plan.height, min_x, min_y))
+
     @operator
     def trim(self, asset, from_seconds=0, to_seconds=0):
         """
@@ -530,22 +898,7 @@ class FFmpegProcessor(Processor):
             return asset
 
         angle_rad = radians(angle)
-        width = asset.width
-        height = asset.height
-
-        if expand:
-            if angle % 180 < 90:
-                width_ = asset.width
-                height_ = asset.height
-                angle_rad_ = angle_rad % pi
-            else:
-                width_ = asset.height
-                height_ = asset.width
-                angle_rad_ = angle_rad % pi - pi/2
-            cos_a = cos(angle_rad_)
-            sin_a = sin(angle_rad_)
-            width = ceil(round(width_ * cos_a + height_ * sin_a, 7))
-            height = ceil(round(width_ * sin_a + height_ * cos_a, 7))
+        width, height = FFmpegProcessor._rotated_size(asset.width, asset.height, angle, expand)
 
         result = io.BytesIO()
         with _FFmpegContext(asset.essence, result) as ctx:
@@ -563,6 +916,27 @@ class FFmpegProcessor(Processor):
         return Asset(essence=result, mime_type=mime_type,
                      width=width, height=height)
 
+    @staticmethod
+    def _rotated_size(width, height, angle, expand):
+        """
+        Returns the dimensions of a video after rotating it by the specified
+        angle in degrees.
+        """
+        if not expand:
+            return width, height
+        angle_rad = radians(angle)
+        if angle % 180 < 90:
+            width_ = width
+            height_ = height
+            angle_rad_ = angle_rad % pi
+        else:
+            width_ = height
+            height_ = width
+            angle_rad_ = angle_rad % pi - pi/2
+        cos_a = cos(angle_rad_)
+        sin_a = sin(angle_rad_)
+        return ceil(round(width_ * cos_a + height_ * sin_a, 7)), ceil(round(width_ * sin_a + height_ * cos_a, 7))
+
 
 class FFmpegMetadataProcessor(MetadataProcessor):
     """
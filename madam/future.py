@@ -40,3 +40,14 @@ except ImportError:
                                          output=stdout, stderr=stderr)
         return _CompletedProcess(args=process.args, retcode=retcode,
                                  stdout=stdout, stderr=stderr)
+
+try:
+    from types import coroutine
+except ImportError:
+    from asyncio import coroutine
+
+try:
+    StopAsyncIteration = StopAsyncIteration
+except NameError:
+    class StopAsyncIteration(Exception):
+        pass
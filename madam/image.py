@@ -1,10 +1,17 @@
 import io
+import math
+import struct
+import zipfile
+import zlib
 from enum import Enum
+from fractions import Fraction
 
 from bidict import bidict
+from frozendict import frozendict
 import PIL.ExifTags
 import PIL.Image
 
+from madam.container import jpeg_previews, jpeg_size, png_chunk, png_size
 from madam.core import operator, OperatorError
 from madam.core import Asset, Processor
 from madam.mime import MimeType
@@ -22,6 +29,35 @@ class ResizeMode(Enum):
     FILL = 2
 
 
+class ResizeQuality(Enum):
+    """
+    Represents a trade-off between speed and quality for image resize
+    operations.
+    """
+    #: Nearest neighbor resampling, e.g. for previews
+    FAST = 0
+    #: Bilinear resampling after reducing the image by an integer factor
+    BALANCED = 1
+    #: Lanczos resampling of the full image
+    BEST = 2
+
+
+class EncodingPreset(Enum):
+    """
+    Represents a trade-off between encoding speed and file size for image
+    encoding.
+
+    :class:`~madam.image.PillowProcessor` uses `MAX_COMPRESSION` unless a
+    faster preset is chosen explicitly.
+    """
+    #: Fastest encoding with larger files
+    FAST = 0
+    #: Balanced encoding speed and file size
+    BALANCED = 1
+    #: Smallest files with the slowest encoding
+    MAX_COMPRESSION = 2
+
+
 class FlipOrientation(Enum):
     """
     Represents an axis for image flip operations.
@@ -32,6 +68,308 @@ class FlipOrientation(Enum):
     VERTICAL = 1
 
 
+class _DecodedImage:
+    """
+    Represents the decoded, intermediate result of fused
+    :class:`~madam.image.PillowProcessor` operators.
+
+    It provides the asset attributes used by the operators, so that the
+    operators can be applied in a row without encoding the image after each
+    step.
+    """
+    def __init__(self, image, metadata, encoding=None):
+        """
+        Initializes a new `_DecodedImage`.
+
+        :param image: Decoded image
+        :type image: PIL.Image.Image
+        :param metadata: Metadata of the image
+        :type metadata: dict
+        :param encoding: Encoding options for the final result
+        :type encoding: dict or None
+        """
+        self.image = image
+        self.metadata = metadata
+        self.encoding = encoding
+
+    @property
+    def mime_type(self):
+        return self.metadata.get('mime_type')
+
+    @property
+    def width(self):
+        return self.image.width
+
+    @property
+    def height(self):
+        return self.image.height
+
+
+#: Error raised by Pillow for images with too many pixels. Older versions of
+#: Pillow only issue a warning.
+_DecompressionBombError = getattr(PIL.Image, 'DecompressionBombError', ())
+
+
+class _PNGStripReader:
+    """
+    Decodes a PNG image in horizontal strips, so that only a strip of the
+    image needs to be held in memory at a time.
+
+    Only non-interlaced images with 8 bits per sample are supported. Each
+    strip is decoded by Pillow from a small PNG image that consists of the
+    filtered rows of the strip, preceded by the unfiltered last row of the
+    previous strip, which the row filters may refer to.
+    """
+    signature = b'\x89PNG\r\n\x1a\n'
+    _color_type_to_mode = {0: 'L', 2: 'RGB', 3: 'P', 4: 'LA', 6: 'RGBA'}
+    _copied_chunk_types = frozenset({b'PLTE', b'tRNS'})
+
+    def __init__(self, file):
+        """
+        Initializes a new `_PNGStripReader` and reads the header of the
+        specified PNG file.
+
+        :param file: PNG file positioned at the beginning
+        :type file: file-like object
+        :raises ValueError: if the file is not a supported PNG image
+        """
+        if file.read(len(self.signature)) != self.signature:
+            raise ValueError('Not a PNG file')
+        self._file = file
+        self._header_chunks = []
+        self._pending_data = b''
+        for chunk_type, chunk_data in self._chunks():
+            if chunk_type == b'IHDR':
+                (self.width, self.height, bit_depth, color_type,
+                 _, _, interlace) = struct.unpack('>IIBBBBB', chunk_data)
+                if bit_depth != 8 or interlace or color_type not in self._color_type_to_mode:
+                    raise ValueError('Unsupported PNG image')
+                self.mode = self._color_type_to_mode[color_type]
+                self._ihdr_tail = chunk_data[8:]
+            elif chunk_type in self._copied_chunk_types:
+                self._header_chunks.append((chunk_type, chunk_data))
+            elif chunk_type == b'IDAT':
+                self._pending_data = chunk_data
+                break
+        else:
+            raise ValueError('PNG file does not contain image data')
+        self._stride = 1 + self.width * PIL.Image.getmodebands(self.mode)
+
+    @staticmethod
+    def open(asset):
+        """
+        Returns a strip reader for the essence of the specified asset, or
+        `None` if it cannot be decoded in strips.
+
+        :param asset: Image asset
+        :type asset: Asset
+        :return: Strip reader or `None`
+        :rtype: _PNGStripReader or None
+        """
+        if not isinstance(asset, Asset) or asset.mime_type != 'image/png':
+            return None
+        try:
+            return _PNGStripReader(asset.essence)
+        except (ValueError, struct.error):
+            return None
+
+    def _chunks(self):
+        while True:
+            header = self._file.read(8)
+            if len(header) < 8:
+                return
+            length, chunk_type = struct.unpack('>I4s', header)
+            chunk_data = self._file.read(length)
+            self._file.read(4)
+            yield chunk_type, chunk_data
+            if chunk_type == b'IEND':
+                return
+
+    def _compressed_data(self):
+        if self._pending_data:
+            yield self._pending_data
+        for chunk_type, chunk_data in self._chunks():
+            if chunk_type == b'IDAT':
+                yield chunk_data
+
+    def _decode(self, filtered_rows, previous_row):
+        row_count = len(filtered_rows) // self._stride
+        if previous_row is not None:
+            filtered_rows = b'\x00' + previous_row + filtered_rows
+            row_count += 1
+        png_data = b''.join([
+            self.signature,
+            png_chunk(b'IHDR', struct.pack('>II', self.width, row_count) + self._ihdr_tail),
+        ] + [png_chunk(chunk_type, chunk_data) for chunk_type, chunk_data in self._header_chunks] + [
+            png_chunk(b'IDAT', zlib.compress(filtered_rows, 0)),
+            png_chunk(b'IEND', b''),
+        ])
+        strip = PIL.Image.open(io.BytesIO(png_data))
+        strip.load()
+        if previous_row is not None:
+            strip = strip.crop((0, 1, strip.width, strip.height))
+        return strip
+
+    def strips(self, strip_height):
+        """
+        Returns a generator of the vertical offset and the decoded image of
+        all strips.
+
+        :param strip_height: Maximum number of rows per strip
+        :type strip_height: int
+        :return: Generator of tuples with offset and image of each strip
+        """
+        decompressor = zlib.decompressobj()
+        buffer = bytearray()
+        previous_row = None
+        y = 0
+        compressed_data = self._compressed_data()
+        while y < self.height:
+            row_count = min(strip_height, self.height - y)
+            while len(buffer) < row_count * self._stride:
+                chunk_data = next(compressed_data, None)
+                if chunk_data is None:
+                    raise OperatorError('Could not decode image: Image data is truncated')
+                buffer.extend(decompressor.decompress(chunk_data))
+            filtered_rows = bytes(buffer[:row_count * self._stride])
+            del buffer[:row_count * self._stride]
+            strip = self._decode(filtered_rows, previous_row)
+            previous_row = strip.crop((0, strip.height - 1, strip.width, strip.height)).tobytes()
+            yield y, strip
+            y += row_count
+
+
+class _StripWindow:
+    """
+    Provides access to consecutive rows of an image that is decoded in
+    strips. Rows before the last requested rows are discarded.
+    """
+    def __init__(self, strips):
+        """
+        Initializes a new `_StripWindow` for the specified strips.
+
+        :param strips: Iterable of tuples of vertical offset and strip image
+        :type strips: iterable
+        """
+        self._strips = iter(strips)
+        self._window = []
+
+    def rows(self, y0, y1):
+        """
+        Returns an image of the rows from `y0` up to `y1` (exclusive). The
+        requested ranges must not move upwards.
+
+        :param y0: First row
+        :type y0: int
+        :param y1: End of the row range
+        :type y1: int
+        :return: Image of the requested rows
+        :rtype: PIL.Image.Image
+        """
+        self._window = [(y, strip) for y, strip in self._window if y + strip.height > y0]
+        while not self._window or self._window[-1][0] + self._window[-1][1].height < y1:
+            self._window.append(next(self._strips))
+        first_y, first_strip = self._window[0]
+        if len(self._window) == 1:
+            return first_strip.crop((0, y0 - first_y, first_strip.width, y1 - first_y))
+        rows = PIL.Image.new(first_strip.mode, (first_strip.width, y1 - y0))
+        if first_strip.mode == 'P':
+            rows.putpalette(first_strip.getpalette())
+        for y, strip in self._window:
+            rows.paste(strip, (0, y - y0))
+        rows.info = first_strip.info
+        return rows
+
+
+class _DeepZoomLevel:
+    """
+    Represents a level of a Deep Zoom tile pyramid whose tiles are created
+    from consecutive strips of the level image.
+    """
+    def __init__(self, index, width, height, tile_size, overlap, save_tile):
+        """
+        Initializes a new `_DeepZoomLevel`.
+
+        :param index: Level number
+        :type index: int
+        :param width: Width of the level image
+        :type width: int
+        :param height: Height of the level image
+        :type height: int
+        :param tile_size: Width and height of tiles without overlap
+        :type tile_size: int
+        :param overlap: Number of pixels tiles overlap with their neighbors
+        :type overlap: int
+        :param save_tile: Function that is called with the level, column,
+            row, and image of each tile
+        :type save_tile: callable
+        """
+        self.index = index
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.save_tile = save_tile
+        self._buffer = None
+        self._buffer_y = 0
+        self._tile_row = 0
+        self._forwarded_y = 0
+
+    def add(self, strip, final=False):
+        """
+        Appends the specified rows to this level and saves all tiles that
+        are complete.
+
+        :param strip: Next rows of the level image
+        :type strip: PIL.Image.Image or None
+        :param final: Whether these are the last rows
+        :type final: bool
+        :return: Rows of the next lower level, or `None`
+        :rtype: PIL.Image.Image or None
+        """
+        if strip is not None:
+            if self._buffer is None:
+                self._buffer = strip
+            else:
+                buffer = PIL.Image.new(strip.mode, (self.width, self._buffer.height + strip.height))
+                buffer.paste(self._buffer, (0, 0))
+                buffer.paste(strip, (0, self._buffer.height))
+                self._buffer = buffer
+        if self._buffer is None:
+            return None
+        buffer_end = self._buffer_y + self._buffer.height
+
+        tile_rows = int(math.ceil(self.height / self.tile_size))
+        while self._tile_row < tile_rows:
+            y0 = max(0, self._tile_row * self.tile_size - self.overlap)
+            y1 = min(self.height, (self._tile_row + 1) * self.tile_size + self.overlap)
+            if buffer_end < y1:
+                break
+            tile_row_image = self._buffer.crop((0, y0 - self._buffer_y, self.width, y1 - self._buffer_y))
+            for column in range(int(math.ceil(self.width / self.tile_size))):
+                x0 = max(0, column * self.tile_size - self.overlap)
+                x1 = min(self.width, (column + 1) * self.tile_size + self.overlap)
+                self.save_tile(self.index, column, self._tile_row, tile_row_image.crop((x0, 0, x1, y1 - y0)))
+            self._tile_row += 1
+
+        forwarded_rows = None
+        forward_end = buffer_end if final else self._forwarded_y + (buffer_end - self._forwarded_y) // 2 * 2
+        if self.index > 0 and forward_end > self._forwarded_y:
+            forwarded_rows = self._buffer.crop((0, self._forwarded_y - self._buffer_y,
+                                                self.width, forward_end - self._buffer_y))
+            # Equivalent to reduce(2), which requires Pillow 7.0
+            forwarded_rows = forwarded_rows.resize(((forwarded_rows.width + 1) // 2, (forwarded_rows.height + 1) // 2),
+                                                   PIL.Image.BOX)
+            self._forwarded_y = forward_end
+
+        keep_y = min(self._forwarded_y if self.index > 0 else buffer_end,
+                     max(0, self._tile_row * self.tile_size - self.overlap))
+        if keep_y > self._buffer_y:
+            self._buffer = self._buffer.crop((0, keep_y - self._buffer_y, self.width, self._buffer.height))
+            self._buffer_y = keep_y
+        return forwarded_rows
+
+
 class PillowProcessor(Processor):
     """
     Represents a processor that uses Pillow as a backend.
@@ -44,31 +382,98 @@ class PillowProcessor(Processor):
     })
 
     __format_options = {
-        MimeType('image/jpeg'): dict(
-            optimize=True,
-            progressive=True,
-        ),
-        MimeType('image/png'): dict(
-            optimize=True,
-        ),
-        MimeType('image/webp'): dict(
-            method=6,
-        ),
+        EncodingPreset.FAST: {
+            MimeType('image/png'): dict(
+                compress_level=1,
+            ),
+            MimeType('image/webp'): dict(
+                method=0,
+            ),
+        },
+        EncodingPreset.BALANCED: {
+            MimeType('image/jpeg'): dict(
+                optimize=True,
+            ),
+            MimeType('image/png'): dict(
+                compress_level=6,
+            ),
+            MimeType('image/webp'): dict(
+                method=4,
+            ),
+        },
+        EncodingPreset.MAX_COMPRESSION: {
+            MimeType('image/jpeg'): dict(
+                optimize=True,
+                progressive=True,
+            ),
+            MimeType('image/png'): dict(
+                optimize=True,
+            ),
+            MimeType('image/webp'): dict(
+                method=6,
+            ),
+        },
     }
 
-    def __init__(self):
+    __encoding_keys = frozenset({'preset', 'quality', 'subsampling', 'compression_level'})
+
+    __resize_quality_to_options = {
+        ResizeQuality.FAST: dict(resample=PIL.Image.NEAREST),
+        ResizeQuality.BALANCED: dict(resample=PIL.Image.BILINEAR),
+        ResizeQuality.BEST: dict(resample=PIL.Image.LANCZOS),
+    }
+    # Images are reduced by an integer factor before resampling as long as
+    # they stay at least this many times larger than the target size
+    __resize_quality_to_reducing_gap = {
+        ResizeQuality.BALANCED: 2,
+    }
+
+    __fusable_operators = frozenset({
+        'auto_orient', 'convert', 'crop', 'flip', 'resize', 'rotate', 'transpose',
+    })
+
+    def __init__(self, resize_quality=ResizeQuality.BEST, encoding=None, max_pixels=None):
         """
         Initializes a new `PillowProcessor`.
+
+        :param resize_quality: Default quality of resize operations
+        :type resize_quality: ResizeQuality
+        :param encoding: Default encoding options of all operators (see
+            :func:`~madam.image.PillowProcessor.convert`)
+        :type encoding: dict or None
+        :param max_pixels: Maximum number of pixels that are decoded at once.
+            Larger images are cropped and resized in strips if their format
+            allows it. By default, images are always decoded completely.
+        :type max_pixels: int or None
+        :raises ValueError: if the encoding options contain unknown keys
         """
         super().__init__()
+        self.resize_quality = ResizeQuality(resize_quality)
+        unknown_keys = set(encoding or {}) - PillowProcessor.__encoding_keys
+        if unknown_keys:
+            raise ValueError('Unknown encoding options: %s' % ', '.join(sorted(unknown_keys)))
+        self.encoding = frozendict(encoding or {})
+        self.max_pixels = max_pixels
+        self.config = frozendict(resize_quality=self.resize_quality, encoding=self.encoding, max_pixels=max_pixels)
 
     def read(self, file):
-        image = PIL.Image.open(file)
-        mime_type = PillowProcessor.__mime_type_to_pillow_type.inv[image.format]
+        try:
+            image = PIL.Image.open(file)
+        except _DecompressionBombError:
+            # Images that are too large for Pillow can still be processed in
+            # strips if their format allows it
+            size = self._strip_size(file)
+            if size is None:
+                raise
+            mime_type = 'image/png'
+            width, height = size
+        else:
+            mime_type = PillowProcessor.__mime_type_to_pillow_type.inv[image.format]
+            width, height = image.width, image.height
         metadata = dict(
             mime_type=str(mime_type),
-            width=image.width,
-            height=image.height
+            width=width,
+            height=height
         )
         file.seek(0)
         asset = Asset(file, **metadata)
@@ -79,11 +484,33 @@ class PillowProcessor(Processor):
             PIL.Image.open(file)
             file.seek(0)
             return True
+        except _DecompressionBombError:
+            return self._strip_size(file) is not None
         except IOError:
             return False
 
+    def _strip_size(self, file):
+        """
+        Returns the dimensions of the PNG image in the specified file if it
+        can be processed in strips by this processor, or `None` otherwise.
+
+        :param file: Image file
+        :type file: file-like object
+        :return: Width and height of the image, or `None`
+        :rtype: (int, int) or None
+        """
+        if self.max_pixels is None:
+            return None
+        file.seek(0)
+        try:
+            return png_size(file.read(33))
+        except (ValueError, struct.error):
+            return None
+        finally:
+            file.seek(0)
+
     @operator
-    def resize(self, asset, width, height, mode=ResizeMode.EXACT):
+    def resize(self, asset, width, height, mode=ResizeMode.EXACT, quality=None):
         """
         Creates a new Asset whose essence is resized according to the specified parameters.
 
@@ -95,29 +522,592 @@ class PillowProcessor(Processor):
         :type height: int
         :param mode: resize behavior
         :type mode: ResizeMode
+        :param quality: resampling quality, or `None` to use the default
+            quality of the processor
+        :type quality: ResizeQuality or None
         :return: Asset with resized essence
         :rtype: Asset
         """
-        image = PIL.Image.open(asset.essence)
+        quality = self.resize_quality if quality is None else ResizeQuality(quality)
+        resize_options = PillowProcessor.__resize_quality_to_options[quality]
+        strip_reader = self._strip_reader(asset)
+        if strip_reader is not None:
+            resized_size = PillowProcessor._resized_size(strip_reader.width, strip_reader.height, width, height, mode)
+            resized_image = self._resize_strips(strip_reader, resized_size, resize_options)
+            return self._result(asset, resized_image, mime_type=asset.mime_type)
+
+        image = PillowProcessor._open(asset)
         mime_type = MimeType(asset.mime_type)
-        width_delta = width - image.width
-        height_delta = height - image.height
-        resized_width = width
-        resized_height = height
-        if mode in (ResizeMode.FIT, ResizeMode.FILL):
-            if mode == ResizeMode.FIT and width_delta < height_delta or \
-               mode == ResizeMode.FILL and width_delta > height_delta:
-                resize_factor = width / image.width
-            else:
-                resize_factor = height / image.height
-            resized_width = round(resize_factor * image.width)
-            resized_height = round(resize_factor * image.height)
-        resized_image = image.resize((resized_width, resized_height),
-                                     resample=PIL.Image.LANCZOS)
-        resized_asset = self._image_to_asset(resized_image, mime_type=mime_type)
+        resized_size = PillowProcessor._resized_size(image.width, image.height, width, height, mode)
+        PillowProcessor._draft(image, resized_size)
+        reducing_gap = PillowProcessor.__resize_quality_to_reducing_gap.get(quality)
+        if reducing_gap is not None:
+            image = PillowProcessor._reduce(image, resized_size, reducing_gap)
+        resized_image = image.resize(resized_size, **resize_options)
+        resized_asset = self._result(asset, resized_image, mime_type=mime_type)
         return resized_asset
 
-    def _image_to_asset(self, image, mime_type):
+    def _strip_reader(self, asset):
+        """
+        Returns a reader that decodes the essence of the specified asset in
+        strips, if the image exceeds the maximum number of pixels of this
+        processor and its format allows decoding in strips.
+
+        :param asset: Image asset or intermediate result of fused operators
+        :type asset: Asset or _DecodedImage
+        :return: Strip reader or `None`
+        :rtype: _PNGStripReader or None
+        """
+        if self.max_pixels is None or not isinstance(asset, Asset):
+            return None
+        if asset.width is not None and asset.height is not None and asset.width * asset.height <= self.max_pixels:
+            return None
+        return _PNGStripReader.open(asset)
+
+    def _strip_height(self, width):
+        if self.max_pixels is None:
+            return 256
+        return max(1, self.max_pixels // max(1, width))
+
+    def _resize_strips(self, strip_reader, size, resize_options):
+        """
+        Resizes an image strip by strip. Every strip of the resized image is
+        resampled from the corresponding source rows and enough adjacent rows
+        for the resampling filter, so that there are no seams between strips.
+
+        :param strip_reader: Reader of the source image
+        :type strip_reader: _PNGStripReader
+        :param size: Width and height of the resized image
+        :type size: (int, int)
+        :param resize_options: Options for `PIL.Image.Image.resize`
+        :type resize_options: dict
+        :return: Resized image
+        :rtype: PIL.Image.Image
+        """
+        width, height = size
+        scale = strip_reader.height / height
+        margin = int(math.ceil(3 * max(scale, 1))) + 1
+        strip_height = max(1, int(self._strip_height(strip_reader.width) // (scale + 2 * margin / height + 1)))
+        rows = _StripWindow(strip_reader.strips(self._strip_height(strip_reader.width)))
+        resized_image = None
+        for y in range(0, height, strip_height):
+            y1 = min(height, y + strip_height)
+            source_y0 = max(0, int(math.floor(y * scale)) - margin)
+            source_y1 = min(strip_reader.height, int(math.ceil(y1 * scale)) + margin)
+            source_rows = rows.rows(source_y0, source_y1)
+            resized_rows = source_rows.resize((width, y1 - y), box=(0, y * scale - source_y0, strip_reader.width,
+                                                                   y1 * scale - source_y0), **resize_options)
+            if resized_image is None:
+                resized_image = PIL.Image.new(resized_rows.mode, size)
+                if resized_rows.mode == 'P':
+                    resized_image.putpalette(resized_rows.getpalette())
+                    resized_image.info = resized_rows.info
+            resized_image.paste(resized_rows, (0, y))
+        return resized_image
+
+    @staticmethod
+    def _reduce(image, size, reducing_gap):
+        """
+        Returns the specified image reduced by the largest integer factor, so
+        that it is still at least `reducing_gap` times larger than the
+        specified size. Each pixel of the reduced image is the average of a
+        block of source pixels, which is much faster than resampling the full
+        image with a larger filter.
+
+        :param image: Image to be reduced
+        :type image: PIL.Image.Image
+        :param size: Target width and height
+        :type size: (int, int)
+        :param reducing_gap: Minimum ratio between the reduced size and the
+            target size
+        :type reducing_gap: int or float
+        :return: Reduced image, or the image itself if it is too small
+        :rtype: PIL.Image.Image
+        """
+        factor = int(min(image.width / max(size[0], 1), image.height / max(size[1], 1)) // reducing_gap)
+        if factor < 2:
+            return image
+        # Equivalent to Image.reduce, which requires Pillow 7.0
+        reduced_size = int(math.ceil(image.width / factor)), int(math.ceil(image.height / factor))
+        return image.resize(reduced_size, PIL.Image.BOX)
+
+    @staticmethod
+    def _draft(image, size):
+        """
+        Configures a JPEG image that has not been decoded yet to be decoded
+        with DCT scaling to a size that is still at least the specified size,
+        if the image is at least twice as large in both dimensions. This
+        saves most of the decoding work for large downscales, which are then
+        finished by a high-quality resample.
+
+        :param image: Image that will be resized
+        :type image: PIL.Image.Image
+        :param size: Target width and height
+        :type size: (int, int)
+        """
+        if image.format != 'JPEG':
+            return
+        width, height = size
+        if width * 2 <= image.width and height * 2 <= image.height:
+            image.draft(image.mode, size)
+
+    @staticmethod
+    def _resized_size(image_width, image_height, width, height, mode):
+        """
+        Returns the dimensions of an image after resizing it with the
+        specified parameters.
+
+        :param image_width: Current width or `None` if it is unknown
+        :type image_width: int or None
+        :param image_height: Current height or `None` if it is unknown
+        :type image_height: int or None
+        :param width: target width
+        :type width: int
+        :param height: target height
+        :type height: int
+        :param mode: resize behavior
+        :type mode: ResizeMode
+        :return: Resulting width and height, or `None` if they depend on
+            unknown dimensions
+        :rtype: (int, int) or None
+        """
+        if mode not in (ResizeMode.FIT, ResizeMode.FILL):
+            return width, height
+        if image_width is None or image_height is None:
+            return None
+        width_delta = width - image_width
+        height_delta = height - image_height
+        if mode == ResizeMode.FIT and width_delta < height_delta or \
+           mode == ResizeMode.FILL and width_delta > height_delta:
+            resize_factor = width / image_width
+        else:
+            resize_factor = height / image_height
+        return round(resize_factor * image_width), round(resize_factor * image_height)
+
+    @staticmethod
+    def _previews(asset):
+        """
+        Returns the dimensions and the data of all previews that are embedded
+        in the essence of a JPEG asset, from the smallest to the largest one.
+
+        :param asset: Image asset or intermediate result of fused operators
+        :type asset: Asset or _DecodedImage
+        :return: Dimensions and JPEG data of the previews
+        :rtype: list[((int, int), memoryview)]
+        """
+        if not isinstance(asset, Asset) or asset.mime_type != 'image/jpeg':
+            return []
+        try:
+            previews = jpeg_previews(asset.essence.getvalue())
+        except ValueError:
+            return []
+        sized_previews = []
+        for preview in previews:
+            try:
+                sized_previews.append((jpeg_size(preview), preview))
+            except ValueError:
+                continue
+        return sorted(sized_previews, key=lambda sized_preview: sized_preview[0][0] * sized_preview[0][1])
+
+    @operator
+    def extract_preview(self, asset):
+        """
+        Creates a new asset from the largest preview image that is embedded in
+        the essence of the specified JPEG asset, i.e. the Exif thumbnail or a
+        preview that is stored in the Multi-Picture Format. The preview is
+        copied from the essence without decoding any image data.
+
+        :param asset: JPEG image asset
+        :type asset: Asset
+        :return: Asset with the preview as essence
+        :rtype: Asset
+        :raises OperatorError: if the asset does not contain a preview
+        """
+        previews = PillowProcessor._previews(asset)
+        if not previews:
+            raise OperatorError('Image does not contain an embedded preview')
+        (width, height), preview = previews[-1]
+        return Asset(io.BytesIO(preview), mime_type='image/jpeg', width=width, height=height)
+
+    @operator
+    def thumbnail(self, asset, width, height, mode=ResizeMode.FIT, quality=None):
+        """
+        Creates a new Asset whose essence is resized like with
+        :func:`~madam.image.PillowProcessor.resize`.
+
+        If the asset is a JPEG image with an embedded preview that is at least
+        as large as the resized image and has the same aspect ratio, the
+        smallest such preview is resized instead of the full image. A preview
+        that has the size of the resized image is returned without decoding it.
+
+        :param asset: Asset to be resized
+        :type asset: Asset
+        :param width: target width
+        :type width: int
+        :param height: target height
+        :type height: int
+        :param mode: resize behavior
+        :type mode: ResizeMode
+        :param quality: resampling quality, or `None` to use the default
+            quality of the processor
+        :type quality: ResizeQuality or None
+        :return: Asset with resized essence
+        :rtype: Asset
+        """
+        previews = PillowProcessor._previews(asset)
+        if previews:
+            if asset.width is not None and asset.height is not None:
+                image_width, image_height = asset.width, asset.height
+            else:
+                image_width, image_height = jpeg_size(asset.essence.getvalue())
+            resized_width, resized_height = PillowProcessor._resized_size(image_width, image_height,
+                                                                          width, height, mode)
+            for (preview_width, preview_height), preview in previews:
+                if preview_width < resized_width or preview_height < resized_height:
+                    continue
+                # Ignores previews with letterboxing or a different crop
+                if abs(preview_width * image_height - preview_height * image_width) >= max(image_width, image_height):
+                    continue
+                preview_asset = Asset(io.BytesIO(preview), mime_type='image/jpeg',
+                                      width=preview_width, height=preview_height)
+                if (preview_width, preview_height) == (resized_width, resized_height):
+                    return preview_asset
+                return self.resize(width=resized_width, height=resized_height, quality=quality)(preview_asset)
+        return self.resize(width=width, height=height, mode=mode, quality=quality)(asset)
+
+    def optimize(self, operators, metadata):
+        """
+        Returns operators that are equivalent to the specified operators for
+        an image with the specified metadata:
+
+        - Rotations by multiples of 360 degrees, crops of the whole image,
+          resizes to the current dimensions, and conversions to the current
+          MIME type are removed.
+        - Consecutive resizes are merged into a single resize.
+        - A crop is moved ahead of the preceding resize if the cropping area
+          corresponds to whole pixels of the image before resizing, so that
+          fewer pixels need to be resampled.
+
+        :param operators: Configured operators of this processor
+        :type operators: list
+        :param metadata: Metadata of the image or `None` if it is unknown
+        :type metadata: dict or None
+        :return: Equivalent operators
+        :rtype: list
+        """
+        metadata = metadata or {}
+        mime_type = metadata.get('mime_type')
+        source_state = (metadata.get('width'), metadata.get('height'), MimeType(mime_type) if mime_type else None)
+        # Planned operators with the image dimensions and MIME type before and after each operator
+        planned = []
+        for operator in operators:
+            state = planned[-1][2] if planned else source_state
+            width, height, mime_type = state
+            kwargs = operator.kwargs
+            previous = planned[-1] if planned else None
+
+            if operator.name == 'rotate' and kwargs['angle'] % 360.0 == 0.0:
+                continue
+            if operator.name == 'convert' and mime_type is not None and MimeType(kwargs['mime_type']) == mime_type \
+                    and not kwargs['encoding']:
+                continue
+            if operator.name == 'crop' and (kwargs['x'], kwargs['y'], kwargs['width'], kwargs['height']) == \
+                    (0, 0, width, height):
+                continue
+
+            if operator.name == 'resize':
+                resized_size = PillowProcessor._resized_size(width, height, kwargs['width'], kwargs['height'],
+                                                             kwargs['mode'])
+                if resized_size is not None and previous is not None and previous[0].name == 'resize':
+                    planned.pop()
+                    state = previous[1]
+                    width, height, mime_type = state
+                    operator = self.resize(width=resized_size[0], height=resized_size[1], quality=kwargs['quality'])
+                if resized_size == (width, height):
+                    continue
+
+            if operator.name == 'crop' and previous is not None and previous[0].name == 'resize':
+                source_crop = PillowProcessor._source_crop(previous[1], state, kwargs)
+                if source_crop is not None:
+                    planned.pop()
+                    crop = self.crop(**source_crop)
+                    planned.append((crop, previous[1], self._estimate(crop, previous[1])))
+                    state = planned[-1][2]
+                    operator = self.resize(width=kwargs['width'], height=kwargs['height'],
+                                           quality=previous[0].kwargs['quality'])
+
+            planned.append((operator, state, self._estimate(operator, state)))
+        return [operator for operator, _, _ in planned]
+
+    @staticmethod
+    def _source_crop(source_state, resized_state, crop_kwargs):
+        """
+        Returns the parameters of a crop before a resize that corresponds to
+        the specified crop after the resize, or `None` if the cropping area
+        does not map to whole pixels or exceeds the image.
+        """
+        source_width, source_height, _ = source_state
+        resized_width, resized_height, _ = resized_state
+        if None in (source_width, source_height, resized_width, resized_height):
+            return None
+        x, y, width, height = (crop_kwargs[key] for key in ('x', 'y', 'width', 'height'))
+        if x < 0 or y < 0 or width < 1 or height < 1 or x + width > resized_width or y + height > resized_height:
+            return None
+        scale_x = Fraction(source_width, resized_width)
+        scale_y = Fraction(source_height, resized_height)
+        source_crop = dict(x=x * scale_x, y=y * scale_y, width=width * scale_x, height=height * scale_y)
+        if any(value.denominator != 1 for value in source_crop.values()):
+            return None
+        return {key: int(value) for key, value in source_crop.items()}
+
+    def dry_run(self, operator, metadata):
+        """
+        Returns the metadata of the image that results from applying the
+        specified operator to an image with the specified metadata. The
+        dimensions are calculated without decoding any image data.
+
+        :param operator: Configured operator of this processor
+        :type operator: OperatorSpec
+        :param metadata: Metadata of the source image
+        :type metadata: dict
+        :return: MIME type and dimensions of the resulting image, or `None`
+            if they cannot be determined from the metadata
+        :rtype: dict or None
+        :raises OperatorError: if the operator cannot be applied to an image
+            with the specified metadata
+        """
+        mime_type = metadata.get('mime_type')
+        state = (metadata.get('width'), metadata.get('height'), MimeType(mime_type) if mime_type else None)
+        if operator.name == 'auto_orient':
+            width, height, mime_type = state
+            if metadata.get('exif', {}).get('orientation') in (5, 6, 7, 8):
+                width, height = height, width
+        else:
+            width, height, mime_type = self._estimate(operator, state)
+        if width is None or height is None or mime_type is None:
+            return None
+        return dict(mime_type=str(mime_type), width=width, height=height)
+
+    def _estimate(self, operator, state):
+        """
+        Returns the dimensions and the MIME type of an image after applying
+        the specified operator. Values that cannot be determined without
+        decoding the image are `None`.
+        """
+        width, height, mime_type = state
+        kwargs = operator.kwargs
+        if operator.name in ('resize', 'thumbnail'):
+            resized_size = PillowProcessor._resized_size(width, height, kwargs['width'], kwargs['height'],
+                                                         kwargs['mode'])
+            width, height = resized_size if resized_size is not None else (None, None)
+        elif operator.name == 'crop':
+            if width is None or height is None:
+                return None, None, mime_type
+            max_x = max(0, min(width, kwargs['width'] + kwargs['x']))
+            max_y = max(0, min(height, kwargs['height'] + kwargs['y']))
+            min_x = max(0, min(width, kwargs['x']))
+            min_y = max(0, min(height, kwargs['y']))
+            if min_x == width or min_y == height or max_x <= min_x or max_y <= min_y:
+                raise OperatorError('Invalid cropping area: <x=%r, y=%r, width=%r, height=%r>' %
+                                    (kwargs['x'], kwargs['y'], kwargs['width'], kwargs['height']))
+            width = max_x - min_x
+            height = max_y - min_y
+        elif operator.name == 'transpose':
+            width, height = height, width
+        elif operator.name == 'convert':
+            mime_type = MimeType(kwargs['mime_type'])
+            if mime_type not in PillowProcessor.__mime_type_to_pillow_type:
+                raise OperatorError('Could not convert image to %s: Unsupported format' % mime_type)
+        elif operator.name == 'rotate':
+            if kwargs['expand'] and width is not None and height is not None:
+                width, height = PillowProcessor._rotated_size(width, height, kwargs['angle'])
+        elif operator.name != 'flip':
+            width, height = None, None
+        return width, height, mime_type
+
+    @staticmethod
+    def _rotated_size(width, height, angle):
+        """
+        Returns the dimensions of an image after rotating it by the specified
+        angle in degrees with expansion, calculated the same way as by
+        Pillow.
+        """
+        angle = angle % 360.0
+        if angle in (0.0, 180.0):
+            return width, height
+        if angle in (90.0, 270.0):
+            return height, width
+        angle = -math.radians(angle)
+        cos_angle = round(math.cos(angle), 15)
+        sin_angle = round(math.sin(angle), 15)
+        center_x, center_y = width / 2, height / 2
+        offset_x = cos_angle * -center_x + sin_angle * -center_y + center_x
+        offset_y = -sin_angle * -center_x + cos_angle * -center_y + center_y
+        xs, ys = [], []
+        for x, y in ((0, 0), (width, 0), (width, height), (0, height)):
+            xs.append(cos_angle * x + sin_angle * y + offset_x)
+            ys.append(-sin_angle * x + cos_angle * y + offset_y)
+        return math.ceil(max(xs)) - math.floor(min(xs)), math.ceil(max(ys)) - math.floor(min(ys))
+
+    def fuse(self, operators):
+        """
+        Returns an operator that decodes the essence once, applies all
+        specified operators to the decoded image, and encodes the result only
+        once at the end.
+
+        :param operators: Configured operators of this processor
+        :type operators: list
+        :return: Fused operator or `None` if an operator cannot be fused
+        :rtype: callable or None
+        """
+        for operator in operators:
+            if operator.name not in PillowProcessor.__fusable_operators:
+                return None
+
+        def fused_operator(asset):
+            return self._apply_fanned(asset, [operators])[0]
+        return fused_operator
+
+    def fan_out(self, branches):
+        """
+        Returns an operator that decodes the essence once and applies each of
+        the specified branches of operators to the decoded image. Every
+        branch result is encoded once.
+
+        :param branches: Sequences of configured operators of this processor
+        :type branches: list[list]
+        :return: Fan-out operator or `None` if an operator cannot be fused
+        :rtype: callable or None
+        """
+        for operators in branches:
+            for operator in operators:
+                if operator.name not in PillowProcessor.__fusable_operators:
+                    return None
+
+        def fanned_operator(asset):
+            return self._apply_fanned(asset, branches)
+        return fanned_operator
+
+    def _apply_fanned(self, asset, branches):
+        """
+        Applies each of the specified branches of operators to the decoded
+        essence of the specified asset and encodes the results.
+
+        :param asset: Image asset to be processed
+        :type asset: Asset
+        :param branches: Sequences of configured operators of this processor
+        :type branches: list[list]
+        :return: One asset per branch. If a branch did not change the image,
+            its result is the specified asset.
+        :rtype: list[Asset]
+        """
+        if self._strip_reader(asset) is not None:
+            # The image cannot be decoded at once, so the operators are
+            # applied one at a time to decode the essence in strips
+            processed_assets = []
+            for operators in branches:
+                processed_asset = asset
+                for operator in operators:
+                    processed_asset = operator(processed_asset)
+                processed_assets.append(processed_asset)
+            return processed_assets
+
+        try:
+            image = PIL.Image.open(asset.essence)
+            if len(branches) > 1:
+                image.load()
+        except (IOError, _DecompressionBombError) as pil_error:
+            raise OperatorError('Could not decode image: %s' % pil_error)
+
+        processed_assets = []
+        for operators in branches:
+            processed = _DecodedImage(image, asset.metadata)
+            for operator in operators:
+                processed = operator(processed)
+
+            if processed.image is image and processed.mime_type == asset.mime_type and not processed.encoding:
+                processed_assets.append(asset)
+                continue
+
+            try:
+                processed_asset = self._image_to_asset(processed.image, mime_type=processed.mime_type,
+                                                       encoding=processed.encoding)
+            except (IOError, KeyError) as pil_error:
+                raise OperatorError('Could not encode image as %s: %s' % (processed.mime_type, pil_error))
+            processed_assets.append(processed_asset)
+        return processed_assets
+
+    @staticmethod
+    def _open(asset):
+        """
+        Returns the image of the specified asset or of the specified decoded
+        intermediate result.
+
+        :param asset: Image asset or intermediate result of fused operators
+        :type asset: Asset or _DecodedImage
+        :return: PIL image
+        :rtype: PIL.Image.Image
+        """
+        if isinstance(asset, _DecodedImage):
+            return asset.image
+        return PIL.Image.open(asset.essence)
+
+    def _result(self, source, image, mime_type, encoding=None):
+        """
+        Returns the result of an operator that was applied to the specified
+        source. The image is only encoded if the source is an asset, otherwise
+        a new intermediate result is returned.
+
+        :param source: Asset or intermediate result the operator was applied to
+        :type source: Asset or _DecodedImage
+        :param image: Processed PIL image
+        :type image: PIL.Image.Image
+        :param mime_type: MIME type of the result
+        :type mime_type: MimeType or str
+        :param encoding: Encoding options of the operator. Intermediate
+            results keep the options of the source by default.
+        :type encoding: dict or None
+        :return: Asset or intermediate result
+        :rtype: Asset or _DecodedImage
+        """
+        if isinstance(source, _DecodedImage):
+            metadata = dict(mime_type=str(MimeType(mime_type)), width=image.width, height=image.height)
+            # The Exif orientation is kept for a subsequent auto_orient
+            if 'exif' in source.metadata:
+                metadata['exif'] = source.metadata['exif']
+            return _DecodedImage(image, metadata, encoding=source.encoding if encoding is None else encoding)
+        return self._image_to_asset(image, mime_type=mime_type, encoding=encoding)
+
+    def _format_options(self, mime_type, encoding=None):
+        """
+        Returns the Pillow options for encoding an image of the specified
+        MIME type with the specified encoding options, which take precedence
+        over the encoding options of the processor.
+
+        :param mime_type: MIME type of the encoded image
+        :type mime_type: MimeType
+        :param encoding: Encoding options
+        :type encoding: dict or None
+        :return: Keyword arguments for `PIL.Image.Image.save`
+        :rtype: dict
+        """
+        encoding = dict(self.encoding, **(encoding or {}))
+        preset = EncodingPreset(encoding.get('preset', EncodingPreset.MAX_COMPRESSION))
+        options = dict(PillowProcessor.__format_options[preset].get(mime_type, {}))
+        pil_format = PillowProcessor.__mime_type_to_pillow_type[mime_type]
+        if encoding.get('quality') is not None and pil_format in ('JPEG', 'WEBP'):
+            options['quality'] = encoding['quality']
+        if encoding.get('subsampling') is not None and pil_format == 'JPEG':
+            options['subsampling'] = encoding['subsampling']
+        if encoding.get('compression_level') is not None:
+            if pil_format == 'PNG':
+                options.pop('optimize', None)
+                options['compress_level'] = encoding['compression_level']
+            elif pil_format == 'WEBP':
+                options['method'] = encoding['compression_level']
+        return options
+
+    def _image_to_asset(self, image, mime_type, encoding=None):
         """
         Converts an PIL image to a MADAM asset. THe conversion can also include
         a conversion in file type.
@@ -126,16 +1116,21 @@ class PillowProcessor(Processor):
         :type image: PIL.Image
         :param mime_type: MIME type of the target asset
         :type mime_type: MimeType
+        :param encoding: Encoding options
+        :type encoding: dict or None
         :return: MADAM asset with hte specified MIME type
         :rtype: Asset
         """
         mime_type = MimeType(mime_type)
         pil_format = PillowProcessor.__mime_type_to_pillow_type[mime_type]
-        pil_options = PillowProcessor.__format_options.get(mime_type, {})
+        pil_options = self._format_options(mime_type, encoding)
         image_buffer = io.BytesIO()
         image.save(image_buffer, pil_format, **pil_options)
+        # Trims the buffer in place, so that the asset can take over the
+        # encoded data without copying it
+        image_buffer.getvalue()
         image_buffer.seek(0)
-        asset = self.read(image_buffer)
+        asset = Asset(image_buffer, mime_type=str(mime_type), width=image.width, height=image.height)
         return asset
 
     def _rotate(self, asset, rotation):
@@ -152,10 +1147,10 @@ class PillowProcessor(Processor):
         :return: New image asset with rotated essence
         :rtype: Asset
         """
-        image = PIL.Image.open(asset.essence)
+        image = PillowProcessor._open(asset)
         mime_type = MimeType(asset.mime_type)
         transposed_image = image.transpose(rotation)
-        transposed_asset = self._image_to_asset(transposed_image, mime_type=mime_type)
+        transposed_asset = self._result(asset, transposed_image, mime_type=mime_type)
         return transposed_asset
 
     @operator
@@ -225,25 +1220,52 @@ class PillowProcessor(Processor):
         else:
             raise OperatorError('Unable to correct image orientation with value %s' % orientation)
 
+        if isinstance(oriented_asset, _DecodedImage):
+            # The image of the intermediate result is oriented correctly now
+            exif = dict(oriented_asset.metadata['exif'])
+            del exif['orientation']
+            oriented_asset.metadata['exif'] = exif
         return oriented_asset
 
     @operator
-    def convert(self, asset, mime_type):
+    def convert(self, asset, mime_type, encoding=None):
         """
         Creates a new asset of the specified MIME type from the essence of the
         specified asset.
 
+        Encoding options can be specified as a dictionary. They take
+        precedence over the encoding options of the processor, and they also
+        apply to the result of subsequent operators in a fused pipeline.
+
+        **Encoding options:**
+
+        - **preset** – :class:`~madam.image.EncodingPreset` the other options
+          are based on. Defaults to `MAX_COMPRESSION`.
+        - **quality** – Quality of lossy formats (JPEG and WebP) as integer
+          between 0 and 100
+        - **subsampling** – Chroma subsampling of JPEG images, e.g. '4:2:0'
+        - **compression_level** – zlib compression level between 0 and 9 for
+          PNG images, or encoding method between 0 and 6 for WebP images
+
         :param asset: Asset whose contents will be converted
         :type asset: Asset
         :param mime_type: Target MIME type
         :type mime_type: MimeType or str
+        :param encoding: Encoding options
+        :type encoding: dict or None
         :return: New asset with converted essence
         :rtype: Asset
         """
         mime_type = MimeType(mime_type)
+        if mime_type not in PillowProcessor.__mime_type_to_pillow_type:
+            raise OperatorError('Could not convert image to %s: Unsupported format' % mime_type)
+        unknown_keys = set(encoding or {}) - PillowProcessor.__encoding_keys
+        if unknown_keys:
+            raise OperatorError('Could not convert image to %s: Unknown encoding options %s' %
+                                (mime_type, ', '.join(sorted(unknown_keys))))
         try:
-            image = PIL.Image.open(asset.essence)
-            converted_asset = self._image_to_asset(image, mime_type)
+            image = PillowProcessor._open(asset)
+            converted_asset = self._result(asset, image, mime_type, encoding=dict(encoding) if encoding else None)
         except (IOError, KeyError) as pil_error:
             raise OperatorError('Could not convert image to %s: %s' %
                                 (mime_type, pil_error))
@@ -280,12 +1302,97 @@ class PillowProcessor(Processor):
         if min_x == asset.width or min_y == asset.height or max_x <= min_x or max_y <= min_y:
             raise OperatorError('Invalid cropping area: <x=%r, y=%r, width=%r, height=%r>' % (x, y, width, height))
 
-        image = PIL.Image.open(asset.essence)
-        cropped_image = image.crop(box=(min_x, min_y, max_x, max_y))
-        cropped_asset = self._image_to_asset(cropped_image, mime_type=asset.mime_type)
+        strip_reader = self._strip_reader(asset)
+        if strip_reader is not None:
+            strips = strip_reader.strips(self._strip_height(strip_reader.width))
+            cropped_image = _StripWindow(strips).rows(min_y, max_y).crop((min_x, 0, max_x, max_y - min_y))
+        else:
+            image = PillowProcessor._open(asset)
+            cropped_image = image.crop(box=(min_x, min_y, max_x, max_y))
+        cropped_asset = self._result(asset, cropped_image, mime_type=asset.mime_type)
 
         return cropped_asset
 
+    @operator
+    def tile_pyramid(self, asset, tile_size=254, overlap=1, mime_type='image/jpeg'):
+        """
+        Creates a ZIP archive that contains a Deep Zoom tile pyramid of the
+        specified image, i.e. a descriptor file `image.dzi` and the tiles of
+        every level in `image_files/<level>/<column>_<row>.<extension>`.
+
+        PNG images are decoded in strips, so that the memory usage does not
+        depend on the height of the image.
+
+        :param asset: Image asset
+        :type asset: Asset
+        :param tile_size: Width and height of the tiles without overlap
+        :type tile_size: int
+        :param overlap: Number of pixels each tile overlaps with its neighbors
+        :type overlap: int
+        :param mime_type: MIME type of the tiles
+        :type mime_type: MimeType or str
+        :return: Asset with a ZIP archive of the tile pyramid as essence
+        :rtype: Asset
+        """
+        mime_type = MimeType(mime_type)
+        pil_format = PillowProcessor.__mime_type_to_pillow_type.get(mime_type)
+        if pil_format is None:
+            raise OperatorError('Could not create tiles of type %s: Unsupported format' % mime_type)
+        if tile_size < 1 or overlap < 0:
+            raise OperatorError('Invalid tile size %r or overlap %r' % (tile_size, overlap))
+        extension = 'jpg' if pil_format == 'JPEG' else pil_format.lower()
+        format_options = self._format_options(mime_type)
+
+        strip_reader = _PNGStripReader.open(asset)
+        if strip_reader is not None:
+            width, height = strip_reader.width, strip_reader.height
+            strips = strip_reader.strips(self._strip_height(width))
+        else:
+            try:
+                image = PIL.Image.open(asset.essence)
+                image.load()
+            except IOError as pil_error:
+                raise OperatorError('Could not decode image: %s' % pil_error)
+            width, height = image.size
+            strips = [(0, image)]
+
+        archive_data = io.BytesIO()
+        with zipfile.ZipFile(archive_data, 'w', zipfile.ZIP_STORED) as archive:
+            def save_tile(level, column, row, tile):
+                if pil_format == 'JPEG' and tile.mode not in ('L', 'RGB'):
+                    tile = tile.convert('RGB')
+                tile_data = io.BytesIO()
+                tile.save(tile_data, pil_format, **format_options)
+                archive.writestr('image_files/%d/%d_%d.%s' % (level, column, row, extension), tile_data.getvalue())
+
+            max_level = int(math.ceil(math.log(max(width, height), 2)))
+            levels = []
+            for index in range(max_level, -1, -1):
+                scale = 2 ** (max_level - index)
+                levels.append(_DeepZoomLevel(index, int(math.ceil(width / scale)), int(math.ceil(height / scale)),
+                                             tile_size, overlap, save_tile))
+
+            for _, strip in strips:
+                if strip.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+                    has_alpha = 'A' in strip.mode or 'transparency' in strip.info
+                    strip = strip.convert('RGBA' if has_alpha else 'RGB')
+                for level in levels:
+                    strip = level.add(strip)
+                    if strip is None:
+                        break
+            strip = None
+            for level in levels:
+                strip = level.add(strip, final=True)
+
+            archive.writestr('image.dzi', (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="%s" Overlap="%d" TileSize="%d">'
+                '<Size Width="%d" Height="%d"/></Image>\n' % (extension, overlap, tile_size, width, height)
+            ).encode('utf-8'))
+
+        archive_data.seek(0)
+        return Asset(archive_data, mime_type='application/zip')
+
     @operator
     def rotate(self, asset, angle, expand=False):
         """
@@ -309,8 +1416,8 @@ class PillowProcessor(Processor):
         if angle % 360.0 == 0.0:
             return asset
 
-        image = PIL.Image.open(asset.essence).convert('RGB')
+        image = PillowProcessor._open(asset).convert('RGB')
         rotated_image = image.rotate(angle=angle, resample=PIL.Image.BICUBIC, expand=expand)
-        rotated_asset = self._image_to_asset(rotated_image, mime_type=asset.mime_type)
+        rotated_asset = self._result(asset, rotated_image, mime_type=asset.mime_type)
 
         return rotated_asset
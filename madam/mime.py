@@ -1,4 +1,6 @@
+from collections.abc import MutableMapping
 from functools import total_ordering
+from operator import attrgetter
 
 
 @total_ordering
@@ -7,17 +9,28 @@ class MimeType:
     Represents a MIME type according to RFC 2045. This class behaves identical
     to its string representation in ``dict`` and ``set``.
 
+    Instances are immutable and interned, i.e. creating a MIME type from an
+    equal string or another ``MimeType`` object usually returns the same
+    instance. The canonical string, the hash, and the sort key are computed
+    only once.
+
     Limitations:
 
     - Suffixes are considered a part of the subtype
     - Parameters like ``charset`` are not supported and will be treated as part
       of the subtype
     """
-    __slots__ = 'type', 'subtype'
+    __slots__ = '_type', '_subtype', '_string', '_hash', '_sort_key'
+
+    #: Maximum number of cached instances before the cache is cleared
+    _MAX_INSTANCES = 4096
+    # Interned instances by canonical string and by the arguments they were
+    # created with
+    _instances = {}
 
-    def __init__(self, mediatype, subtype=None):
+    def __new__(cls, mediatype, subtype=None):
         """
-        Initializes a new MIME type with either
+        Returns a MIME type with either
 
         - both, *media type* and *subtype* strings
         - a complete MIME type string like ``'audio/opus'``
@@ -29,14 +42,43 @@ class MimeType:
         :param subtype: Defines the subtype.
         :type subtype: str or None
         """
-        self.type = None  # type: str or None
-        self.subtype = None  # type: str or None
         if isinstance(mediatype, MimeType):
             if subtype is not None:
                 raise ValueError('Cannot pass MimeType object and subtype string for initialization.')
-            self.type = mediatype.type
-            self.subtype = mediatype.subtype
-        elif isinstance(mediatype, str):
+            return mediatype
+
+        key = mediatype if subtype is None else (mediatype, subtype)
+        try:
+            return cls._instances[key]
+        except (KeyError, TypeError):
+            pass
+
+        mediatype, subtype = MimeType.__parse(mediatype, subtype)
+        string = '/'.join((mediatype or '*', subtype or '*'))
+        instance = cls._instances.get(string)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._type = mediatype
+            instance._subtype = subtype
+            instance._string = string
+            instance._hash = hash(string)
+            # Wildcards are sorted before any media type or subtype
+            instance._sort_key = (mediatype is not None, mediatype or '', subtype is not None, subtype or '')
+            if len(cls._instances) >= cls._MAX_INSTANCES:
+                # Equality does not depend on identity, so dropping instances
+                # only costs the time to parse them again
+                cls._instances.clear()
+            cls._instances[string] = instance
+        cls._instances[key] = instance
+        return instance
+
+    @staticmethod
+    def __parse(mediatype, subtype):
+        """
+        Returns the normalized media type and subtype of the arguments of a
+        new MIME type.
+        """
+        if isinstance(mediatype, str):
             if mediatype:
                 delimiter_count = mediatype.count('/')
                 if delimiter_count:
@@ -45,52 +87,138 @@ class MimeType:
                     if delimiter_count > 1:
                         raise ValueError('Too many delimiters in %r' % mediatype)
                     mediatype, subtype = mediatype.split('/')
-                if mediatype != '*':
-                    self.type = str(mediatype).lower()
+            mediatype = str(mediatype).lower() if mediatype and mediatype != '*' else None
         elif mediatype is not None:
             raise TypeError('%r type is not allowed for initialization of MIME type' %
                             type(mediatype).__qualname__)
 
         if isinstance(subtype, str):
-            if subtype and subtype != '*':
-                if '/' in subtype:
-                    raise ValueError('Subtype cannot contain delimiters')
-                self.subtype = str(subtype).lower()
+            if '/' in subtype:
+                raise ValueError('Subtype cannot contain delimiters')
+            subtype = str(subtype).lower() if subtype and subtype != '*' else None
         elif subtype is not None:
             raise TypeError('%r type is not allowed for initialization of MIME subtype' %
                             type(subtype).__qualname__)
 
+        return mediatype, subtype
+
+    @property
+    def type(self):
+        """
+        Media type, or `None` for a wildcard.
+
+        :rtype: str or None
+        """
+        return self._type
+
+    @property
+    def subtype(self):
+        """
+        Subtype, or `None` for a wildcard.
+
+        :rtype: str or None
+        """
+        return self._subtype
+
     def __str__(self):
-        return '/'.join((self.type or '*', self.subtype or '*'))
+        return self._string
 
     def __repr__(self):
         return '%s(mediatype=%r, subtype=%r)' % (
-            self.__class__.__qualname__, self.type, self.subtype
+            self.__class__.__qualname__, self._type, self._subtype
         )
 
+    def __reduce__(self):
+        return MimeType, (self._string,)
+
     def __hash__(self):
-        return hash(str(self))
+        return self._hash
 
     def __eq__(self, other):
-        if isinstance(other, str):
-            return self == MimeType(other)
         if isinstance(other, MimeType):
-            return self.type == other.type and self.subtype == other.subtype
+            return self is other or self._string == other._string
+        if isinstance(other, str):
+            return self._string == other or self._string == MimeType(other)._string
         return NotImplemented
 
     def __lt__(self, other):
         if isinstance(other, str):
             return self < MimeType(other)
         if isinstance(other, MimeType):
-            if self.type == other.type:
-                if self.subtype == other.subtype:
-                    return False
-                else:
-                    if self.subtype is None:
-                        return True
-                    return self.subtype < other.subtype
-            else:
-                if self.type is None:
-                    return True
-                return self.type < other.type
+            return self._sort_key < other._sort_key
         return NotImplemented
+
+
+class MimeTypeIndex(MutableMapping):
+    """
+    Represents a mapping of MIME types to values that finds the MIME types
+    matching a MIME type with wildcards, like ``'image/*'``, with a few set
+    operations instead of comparing each MIME type.
+
+    Keys are returned as ``MimeType`` objects, but can be passed as strings.
+    """
+    def __init__(self, items=None):
+        """
+        Initializes a new `MimeTypeIndex`.
+
+        :param items: Initial MIME types and values
+        :type items: dict or iterable or None
+        """
+        self.__values = {}
+        self.__by_type = {}
+        self.__by_subtype = {}
+        if items is not None:
+            self.update(items)
+
+    def __getitem__(self, mime_type):
+        return self.__values[MimeType(mime_type)]
+
+    def __setitem__(self, mime_type, value):
+        mime_type = MimeType(mime_type)
+        self.__values[mime_type] = value
+        self.__by_type.setdefault(mime_type.type, set()).add(mime_type)
+        self.__by_subtype.setdefault(mime_type.subtype, set()).add(mime_type)
+
+    def __delitem__(self, mime_type):
+        mime_type = MimeType(mime_type)
+        del self.__values[mime_type]
+        for index, key in ((self.__by_type, mime_type.type), (self.__by_subtype, mime_type.subtype)):
+            index[key].discard(mime_type)
+            if not index[key]:
+                del index[key]
+
+    def __iter__(self):
+        return iter(self.__values)
+
+    def __len__(self):
+        return len(self.__values)
+
+    @staticmethod
+    def __candidates(index, key):
+        if key is None:
+            return None
+        return index.get(key, set()) | index.get(None, set())
+
+    def match(self, mime_type):
+        """
+        Returns the MIME types in this index that match the specified MIME
+        type. Wildcards match any media type or subtype, both in the specified
+        MIME type and in the MIME types of the index.
+
+        :param mime_type: MIME type to be matched
+        :type mime_type: MimeType or str
+        :return: Sorted list of matching MIME types
+        :rtype: list
+        """
+        mime_type = MimeType(mime_type)
+        type_candidates = MimeTypeIndex.__candidates(self.__by_type, mime_type.type)
+        subtype_candidates = MimeTypeIndex.__candidates(self.__by_subtype, mime_type.subtype)
+        if type_candidates is None and subtype_candidates is None:
+            matches = self.__values.keys()
+        elif type_candidates is None:
+            matches = subtype_candidates
+        elif subtype_candidates is None:
+            matches = type_candidates
+        else:
+            matches = type_candidates & subtype_candidates
+        return sorted(matches, key=attrgetter('_sort_key'))
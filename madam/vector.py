@@ -1,7 +1,16 @@
+import gzip
+import hashlib
 import io
+import re
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
 from xml.etree import ElementTree as ET
+from xml.parsers import expat
 
-from madam.core import Asset, MetadataProcessor, Processor, UnsupportedFormatError
+from madam.core import Asset, MetadataProcessor, OperatorError, Processor, UnsupportedFormatError
+from madam.core import operator
+from madam.mime import MimeType
 
 
 _INCH_TO_MM = 1 / 25.4
@@ -9,6 +18,12 @@ _PX_PER_INCH = 90
 _PT_PER_INCH = 1 / 72
 _FONT_SIZE_PT = 12
 _X_HEIGHT = 0.7
+_SNIFF_CHUNK_SIZE = 4 * 1024
+_SNIFF_MAX_SIZE = 64 * 1024
+_STREAM_CHUNK_SIZE = 64 * 1024
+_GZIP_MAGIC = b'\x1f\x8b'
+_SVG_MIME_TYPE = 'image/svg+xml'
+_SVGZ_MIME_TYPE = 'image/svg+xml-compressed'
 
 
 def svg_length_to_px(length):
@@ -49,8 +64,371 @@ XML_NS = dict(
     svg='http://www.w3.org/2000/svg',
     rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#',
     dc='http://purl.org/dc/elements/1.1/',
+    xlink='http://www.w3.org/1999/xlink',
 )
 
+# Namespaces are registered once, as the registry of ElementTree is global
+for _prefix, _uri in XML_NS.items():
+    ET.register_namespace('' if _prefix == 'svg' else _prefix, _uri)
+
+_SVG_METADATA_TAG = '{%(svg)s}metadata' % XML_NS
+
+# Namespaces of elements and attributes that are only used by editors
+_EDITOR_NAMESPACES = frozenset([
+    'http://www.inkscape.org/namespaces/inkscape',
+    'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
+    'http://ns.adobe.com/AdobeIllustrator/10.0/',
+    'http://ns.adobe.com/AdobeSVGViewerExtensions/3.0/',
+    'http://ns.adobe.com/Extensibility/1.0/',
+    'http://ns.adobe.com/Graphs/1.0/',
+    'http://ns.adobe.com/SaveForWeb/1.0/',
+    'http://ns.adobe.com/Variables/1.0/',
+    'http://www.bohemiancoding.com/sketch/ns',
+])
+# Attributes that only contain numbers, lengths, or lists of them
+_NUMERIC_ATTRIBUTES = frozenset([
+    'cx', 'cy', 'd', 'dx', 'dy', 'fill-opacity', 'font-size', 'fx', 'fy', 'height', 'offset', 'opacity',
+    'points', 'r', 'rx', 'ry', 'stop-opacity', 'stroke-dasharray', 'stroke-dashoffset', 'stroke-miterlimit',
+    'stroke-opacity', 'stroke-width', 'transform', 'viewBox', 'width', 'x', 'x1', 'x2', 'y', 'y1', 'y2',
+])
+# Elements whose whitespace is part of the content
+_TEXT_CONTENT_TAGS = frozenset('{%s}%s' % (XML_NS['svg'], tag) for tag in [
+    'a', 'desc', 'script', 'style', 'text', 'textPath', 'title', 'tspan',
+])
+_NUMBER_PATTERN = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_PATH_SEPARATOR_PATTERN = re.compile(r'[\s,]*')
+_PATH_COMMANDS = frozenset('MmZzLlHhVvCcSsQqTtAa')
+_REFERENCE_PATTERN = re.compile(r'url\(\s*[\'"]?#([^\'")\s]+)|^#(.+)$')
+_STYLE_REFERENCE_PATTERN = re.compile(r'#([-\w.:]+)')
+_COMMA_PATTERN = re.compile(r'\s*,\s*')
+
+
+#: Structure of an SVG document. `root_start` and `root_end` are the byte
+#: offsets of the start tag and the end tag of the root element. `root_end`
+#: is `None` if the root element is an empty-element tag. `metadata_span`
+#: contains the byte offsets of the start tag, of the end tag (`None` for an
+#: empty-element tag), and after the end of the metadata element, or is
+#: `None` if the document does not contain a metadata element.
+_SVGDocument = namedtuple('_SVGDocument', ['root_attributes', 'root_start', 'root_end', 'metadata_span',
+                                           'metadata_xml'])
+
+
+def _tag_end(data, start):
+    """
+    Returns the offset after the tag that starts at the specified offset,
+    skipping quoted attribute values.
+    """
+    quote = None
+    for offset in range(start + 1, len(data)):
+        char = data[offset:offset + 1]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in (b'"', b"'"):
+            quote = char
+        elif char == b'>':
+            return offset + 1
+    raise ValueError('Unterminated tag at offset %d' % start)
+
+
+def _qualified_name(name):
+    """
+    Returns the ElementTree name of a name reported by an expat parser with
+    namespace processing.
+    """
+    return '{' + name if '}' in name else name
+
+
+def _is_svgz(data):
+    """
+    Returns whether the specified data starts like gzip-compressed data.
+    """
+    return data[:2] == _GZIP_MAGIC
+
+
+def _decompress_svgz(data):
+    """
+    Returns the SVG data of SVGZ data, or the data itself if it is not
+    compressed.
+
+    :param data: SVG or SVGZ data
+    :type data: bytes
+    :return: SVG data
+    :rtype: bytes
+    :raises ValueError: if the compressed data is corrupt
+    """
+    if not _is_svgz(data):
+        return data
+    try:
+        return gzip.decompress(data)
+    except (OSError, EOFError, zlib.error) as e:
+        raise ValueError('Error while decompressing SVGZ data: %s' % e)
+
+
+def _compress_svgz(data, compression_level=9):
+    """
+    Returns the SVGZ data of the specified SVG data. The gzip header contains
+    neither a file name nor a modification time, so that the same SVG data
+    always results in the same SVGZ data.
+
+    :param data: SVG data
+    :type data: bytes
+    :param compression_level: zlib compression level between 0 and 9
+    :type compression_level: int
+    :return: SVGZ data
+    :rtype: bytes
+    """
+    compressed = io.BytesIO()
+    with gzip.GzipFile(fileobj=compressed, mode='wb', compresslevel=compression_level, mtime=0) as gzip_file:
+        gzip_file.write(data)
+    return compressed.getvalue()
+
+
+def _stream_root_attributes(file):
+    """
+    Parses the SVG data of a file-like object in chunks and returns the
+    attributes of the root element. The whole document is checked for
+    well-formedness without keeping it in memory, which allows to parse
+    compressed data while it is decompressed.
+
+    :param file: file-like object with SVG data
+    :type file: file-like object
+    :return: Attributes of the root element
+    :rtype: dict
+    :raises expat.ExpatError: if the data is not well-formed XML
+    """
+    parser = expat.ParserCreate(namespace_separator='}')
+    root_attributes = []
+
+    def start_element(name, attributes):
+        if not root_attributes:
+            root_attributes.append({_qualified_name(key): value for key, value in attributes.items()})
+
+    parser.StartElementHandler = start_element
+    while True:
+        chunk = file.read(_STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.Parse(chunk, False)
+    parser.Parse(b'', True)
+    return root_attributes[0]
+
+
+def _parse_svg(data):
+    """
+    Parses SVG data in a single pass and returns the structure of the
+    document. Only the first metadata element below the root element is
+    turned into an element tree.
+
+    :param data: SVG data
+    :type data: bytes
+    :return: Structure of the document
+    :rtype: _SVGDocument
+    :raises expat.ExpatError: if the data is not well-formed XML
+    """
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.ordered_attributes = False
+    state = dict(depth=0, root_attributes=None, root_start=None, root_end=None, metadata_start=None,
+                 metadata_span=None)
+    builder = []
+
+    def start_element(name, attributes):
+        state['depth'] += 1
+        name = _qualified_name(name)
+        if state['depth'] == 1:
+            state['root_start'] = parser.CurrentByteIndex
+            state['root_attributes'] = {_qualified_name(key): value for key, value in attributes.items()}
+        elif state['depth'] == 2 and name == _SVG_METADATA_TAG and state['metadata_span'] is None:
+            state['metadata_start'] = parser.CurrentByteIndex
+            builder.append(ET.TreeBuilder())
+        if builder:
+            builder[0].start(name, {_qualified_name(key): value for key, value in attributes.items()})
+
+    def end_element(name):
+        if builder:
+            builder[0].end(_qualified_name(name))
+        if state['depth'] == 2 and state['metadata_start'] is not None and state['metadata_span'] is None:
+            start = state['metadata_start']
+            start_tag_end = _tag_end(data, start)
+            if data[start_tag_end - 2:start_tag_end] == b'/>':
+                state['metadata_span'] = (start, None, start_tag_end)
+            else:
+                end_tag_start = parser.CurrentByteIndex
+                state['metadata_span'] = (start, end_tag_start, _tag_end(data, end_tag_start))
+            state['metadata_element'] = builder.pop().close()
+        elif state['depth'] == 1:
+            root_tag_end = _tag_end(data, state['root_start'])
+            if data[root_tag_end - 2:root_tag_end] != b'/>':
+                state['root_end'] = parser.CurrentByteIndex
+        state['depth'] -= 1
+
+    def character_data(text):
+        if builder:
+            builder[0].data(text)
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+    parser.Parse(data, True)
+
+    metadata_xml = None
+    metadata_element = state.get('metadata_element')
+    if metadata_element is not None and len(metadata_element) > 0:
+        metadata_xml = ET.tostring(metadata_element[0], encoding='unicode')
+    return _SVGDocument(state['root_attributes'], state['root_start'], state['root_end'], state['metadata_span'],
+                        metadata_xml)
+
+
+class _SVGDocumentCache:
+    """
+    Caches the structure of recently parsed SVG documents by the digest of
+    their data, so that reading an SVG file, its metadata, and stripping the
+    metadata only parses the document once.
+    """
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, data):
+        """
+        Returns the structure of the specified SVG data.
+
+        :param data: SVG data
+        :type data: bytes
+        :return: Structure of the document
+        :rtype: _SVGDocument
+        :raises expat.ExpatError: if the data is not well-formed XML
+        """
+        digest = hashlib.sha1(data).digest()
+        with self._lock:
+            document = self._documents.get(digest)
+            if document is not None:
+                self._documents.move_to_end(digest)
+                return document
+        document = _parse_svg(data)
+        with self._lock:
+            self._documents[digest] = document
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+        return document
+
+
+_svg_documents = _SVGDocumentCache()
+
+
+def _format_number(match, precision):
+    """
+    Returns the number of a regular expression match rounded to the specified
+    number of decimal places, without redundant zeros.
+    """
+    number = '%.*f' % (precision, float(match.group(0)))
+    if '.' in number:
+        number = number.rstrip('0').rstrip('.')
+    return '0' if number == '-0' else number
+
+
+def _join_numbers(tokens):
+    """
+    Returns the concatenated tokens of a numeric value. A space is inserted
+    between two numbers that were written without separator if they would
+    be joined otherwise, e.g. "1.0.5" is rounded to "1 0.5" instead of
+    "10.5".
+    """
+    parts = []
+    previous_is_number = False
+    for separator, token, is_number in tokens:
+        if not separator and previous_is_number and is_number and not token.startswith('-'):
+            separator = ' '
+        parts.append(separator)
+        parts.append(token)
+        previous_is_number = is_number
+    return ''.join(parts)
+
+
+def _round_numbers(value, precision):
+    """
+    Returns a value with all numbers rounded to the specified number of
+    decimal places.
+    """
+    tokens = []
+    position = 0
+    for match in _NUMBER_PATTERN.finditer(value):
+        tokens.append((value[position:match.start()], _format_number(match, precision), True))
+        position = match.end()
+    tokens.append((value[position:], '', False))
+    return _join_numbers(tokens)
+
+
+def _round_path_data(path_data, precision):
+    """
+    Returns SVG path data with all numbers rounded to the specified number of
+    decimal places. The large arc and sweep flags of arcs are single digits
+    that do not need separators, e.g. "a5 5 0 00 10 0", so they are never
+    read as part of a number. Invalid path data is returned unchanged.
+    """
+    tokens = []
+    position = 0
+    command = None
+    argument_index = 0
+    while True:
+        separator = _PATH_SEPARATOR_PATTERN.match(path_data, position)
+        position = separator.end()
+        if position == len(path_data):
+            break
+        character = path_data[position]
+        if character in _PATH_COMMANDS:
+            command = character
+            argument_index = 0
+            tokens.append((separator.group(0), character, False))
+            position += 1
+            continue
+        if command in ('A', 'a') and argument_index % 7 in (3, 4):
+            if character not in '01':
+                return path_data
+            token = character
+            position += 1
+        else:
+            number = _NUMBER_PATTERN.match(path_data, position)
+            if number is None:
+                return path_data
+            token = _format_number(number, precision)
+            position = number.end()
+        tokens.append((separator.group(0), token, True))
+        argument_index += 1
+    return _join_numbers(tokens)
+
+
+def _minify_attributes(element, precision):
+    """
+    Removes editor attributes from an element, and rounds and collapses the
+    numbers of its numeric attributes.
+    """
+    for name in list(element.keys()):
+        if name.startswith('{') and name[1:].split('}', 1)[0] in _EDITOR_NAMESPACES:
+            del element.attrib[name]
+        elif name in _NUMERIC_ATTRIBUTES:
+            if name == 'd':
+                value = _round_path_data(element.get(name), precision)
+            else:
+                value = _round_numbers(element.get(name), precision)
+            element.set(name, _COMMA_PATTERN.sub(',', ' '.join(value.split())))
+
+
+def _referenced_ids(root):
+    """
+    Returns the IDs of all elements that are referenced in attributes or
+    style sheets of the specified element tree.
+    """
+    referenced_ids = set()
+    for element in root.iter():
+        for value in element.attrib.values():
+            for match in _REFERENCE_PATTERN.finditer(value.strip()):
+                referenced_ids.add(match.group(1) or match.group(2))
+        if element.tag == '{%(svg)s}style' % XML_NS and element.text:
+            referenced_ids.update(_STYLE_REFERENCE_PATTERN.findall(element.text))
+    return referenced_ids
+
 
 class SVGProcessor(Processor):
     """
@@ -63,27 +441,187 @@ class SVGProcessor(Processor):
         super().__init__()
 
     def can_read(self, file):
+        """
+        Returns whether the specified file contains SVG data or
+        gzip-compressed SVG data (SVGZ).
+
+        The file is parsed incrementally only up to the start tag of the root
+        element, which has to be an SVG element. Parsing stops as soon as the
+        data turns out not to be XML, and after 64 KiB of (decompressed) data
+        at the latest, so that the cost does not depend on the size of the
+        file.
+
+        :param file: file-like object to be tested
+        :type file: file-like object
+        :return: `True` if the file contains SVG data, `False` otherwise
+        :rtype: bool
+        """
+        magic = file.read(len(_GZIP_MAGIC))
+        file.seek(-len(magic), io.SEEK_CUR)
+        if magic == _GZIP_MAGIC:
+            file = gzip.GzipFile(fileobj=file, mode='rb')
+        parser = ET.XMLPullParser(events=('start',))
+        bytes_read = 0
         try:
-            ET.parse(file)
-            return True
-        except ET.ParseError:
+            while bytes_read < _SNIFF_MAX_SIZE:
+                chunk = file.read(_SNIFF_CHUNK_SIZE)
+                if not chunk:
+                    break
+                bytes_read += len(chunk)
+                parser.feed(chunk)
+                for _, root in parser.read_events():
+                    return root.tag in ('{%(svg)s}svg' % XML_NS, 'svg')
+        except (ET.ParseError, OSError, EOFError, zlib.error):
             return False
+        return False
 
     def read(self, file):
+        data = file.read()
+        try:
+            if _is_svgz(data):
+                mime_type = _SVGZ_MIME_TYPE
+                root_attributes = _stream_root_attributes(gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb'))
+            else:
+                mime_type = _SVG_MIME_TYPE
+                root_attributes = _svg_documents.parse(data).root_attributes
+        except expat.ExpatError as e:
+            raise UnsupportedFormatError('Error while parsing XML in line %d, column %d' % (e.lineno, e.offset))
+        except (OSError, EOFError, zlib.error) as e:
+            raise UnsupportedFormatError('Error while decompressing SVGZ data: %s' % e)
+
+        metadata = dict(mime_type=mime_type)
+        if 'width' in root_attributes:
+            metadata['width'] = svg_length_to_px(root_attributes['width'])
+        if 'height' in root_attributes:
+            metadata['height'] = svg_length_to_px(root_attributes['height'])
+
+        return Asset(essence=io.BytesIO(data), **metadata)
+
+    @operator
+    def convert(self, asset, mime_type, encoding=None):
+        """
+        Creates a new asset of the specified MIME type from the essence of the
+        specified SVG asset, i.e. compresses SVG data to SVGZ data
+        (`image/svg+xml-compressed`), or decompresses SVGZ data.
+
+        **Encoding options:**
+
+        - **compression_level** – zlib compression level between 0 and 9 for
+          SVGZ data
+
+        :param asset: Asset whose contents will be converted
+        :type asset: Asset
+        :param mime_type: Target MIME type
+        :type mime_type: MimeType or str
+        :param encoding: Encoding options
+        :type encoding: dict or None
+        :return: New asset with converted essence
+        :rtype: Asset
+        :raises OperatorError: if the format or the encoding options are not
+                supported, or if the essence cannot be decompressed
+        """
+        mime_type = MimeType(mime_type)
+        if str(mime_type) not in (_SVG_MIME_TYPE, _SVGZ_MIME_TYPE):
+            raise OperatorError('Could not convert vector graphics to %s: Unsupported format' % mime_type)
+        encoding = dict(encoding or {})
+        compression_level = encoding.pop('compression_level', 9)
+        if encoding:
+            raise OperatorError('Could not convert vector graphics to %s: Unknown encoding options %s' %
+                                (mime_type, ', '.join(sorted(encoding))))
+        if compression_level not in range(10):
+            raise OperatorError('Could not convert vector graphics to %s: Invalid compression level %r' %
+                                (mime_type, compression_level))
+
         try:
-            tree = ET.parse(file)
+            data = _decompress_svgz(asset.essence.read())
+        except ValueError as e:
+            raise OperatorError('Could not convert vector graphics to %s: %s' % (mime_type, e))
+        if str(mime_type) == _SVGZ_MIME_TYPE:
+            data = _compress_svgz(data, compression_level)
+
+        metadata = dict(mime_type=str(mime_type))
+        for key in ('width', 'height'):
+            if key in asset.metadata:
+                metadata[key] = asset.metadata[key]
+        return Asset(essence=io.BytesIO(data), **metadata)
+
+    @operator
+    def minify(self, asset, precision=3):
+        """
+        Creates a new asset with a smaller essence that renders like the
+        essence of the specified SVG asset.
+
+        Comments, processing instructions, metadata, and the elements and
+        attributes of editors like Inkscape or Illustrator are removed,
+        numbers of geometric attributes are rounded, whitespace between
+        elements is removed, and definitions that are not referenced are
+        dropped. The result only depends on the input, so that it can be
+        cached. SVGZ data stays compressed.
+
+        :param asset: SVG asset
+        :type asset: Asset
+        :param precision: Number of decimal places of rounded numbers
+        :type precision: int
+        :return: Asset with minified essence
+        :rtype: Asset
+        :raises OperatorError: if the essence is not valid XML
+        """
+        data = asset.essence.read()
+        compressed = _is_svgz(data)
+        try:
+            root = ET.fromstring(_decompress_svgz(data))
         except ET.ParseError as e:
-            raise UnsupportedFormatError('Error while parsing XML in line %d, column %d' % e.position)
-        root = tree.getroot()
+            raise OperatorError('Error while parsing XML: %s' % e)
+        except ValueError as e:
+            raise OperatorError(str(e))
 
-        metadata = dict(mime_type='image/svg+xml')
+        defs_tag = '{%(svg)s}defs' % XML_NS
+        for parent in list(root.iter()):
+            for child in list(parent):
+                namespace = child.tag[1:].split('}', 1)[0] if child.tag.startswith('{') else None
+                if child.tag == _SVG_METADATA_TAG or namespace in _EDITOR_NAMESPACES:
+                    parent.remove(child)
+        for element in root.iter():
+            _minify_attributes(element, precision)
+            if element.tag not in _TEXT_CONTENT_TAGS:
+                if element.text is not None and not element.text.strip():
+                    element.text = None
+                for child in element:
+                    if child.tail is not None and not child.tail.strip():
+                        child.tail = None
+
+        # Definitions can reference each other, so unreferenced definitions
+        # are removed until all remaining definitions are referenced.
+        # Definitions without ID, like style sheets, are always kept.
+        removed = True
+        while removed:
+            removed = False
+            referenced_ids = _referenced_ids(root)
+            for defs in list(root.iter(defs_tag)):
+                for definition in list(defs):
+                    definition_id = definition.get('id')
+                    if definition_id is not None and definition_id not in referenced_ids:
+                        defs.remove(definition)
+                        removed = True
+        for parent in list(root.iter()):
+            for defs in parent.findall(defs_tag):
+                if len(defs) == 0 and defs.get('id') is None:
+                    parent.remove(defs)
+
+        # ElementTree escapes all ">" in text and attributes, so " />" only
+        # occurs at the end of empty-element tags
+        svg_data = ET.tostring(root, encoding='unicode').replace(' />', '/>').encode('utf-8')
+        if compressed:
+            essence = io.BytesIO(_compress_svgz(svg_data))
+            metadata = dict(mime_type=_SVGZ_MIME_TYPE)
+        else:
+            essence = io.BytesIO(svg_data)
+            metadata = dict(mime_type=_SVG_MIME_TYPE)
         if 'width' in root.keys():
             metadata['width'] = svg_length_to_px(root.get('width'))
         if 'height' in root.keys():
             metadata['height'] = svg_length_to_px(root.get('height'))
-
-        file.seek(0)
-        return Asset(essence=file, **metadata)
+        return Asset(essence=essence, **metadata)
 
 
 class SVGMetadataProcessor(MetadataProcessor):
@@ -91,7 +629,8 @@ class SVGMetadataProcessor(MetadataProcessor):
     Represents a metadata processor that handles Scalable Vector Graphics (SVG)
     data.
 
-    It is assumed that the SVG XML uses UTF-8 encoding.
+    It is assumed that the SVG XML uses UTF-8 encoding. SVGZ data is
+    decompressed for processing and compressed again.
     """
     def __init__(self):
         """
@@ -105,37 +644,33 @@ class SVGMetadataProcessor(MetadataProcessor):
 
     @staticmethod
     def __parse(file):
+        data = file.read()
+        compressed = _is_svgz(data)
         try:
-            tree = ET.parse(file)
-        except ET.ParseError as e:
+            data = _decompress_svgz(data)
+            return data, _svg_documents.parse(data), compressed
+        except ValueError as e:
+            raise UnsupportedFormatError(str(e))
+        except expat.ExpatError as e:
             raise UnsupportedFormatError('Error while parsing XML: %s' % e)
-        root = tree.getroot()
-        return tree, root, root.find('./svg:metadata', XML_NS)
 
     @staticmethod
-    def __register_xml_namespaces():
-        for prefix, uri in XML_NS.items():
-            if prefix == 'svg':
-                prefix = ''
-            ET.register_namespace(prefix, uri)
+    def __result(parts, compressed):
+        data = b''.join(parts)
+        return io.BytesIO(_compress_svgz(data) if compressed else data)
 
     def read(self, file):
-        _, _, metadata_elem = SVGMetadataProcessor.__parse(file)
-        if metadata_elem is None or len(metadata_elem) == 0:
+        _, document, _ = SVGMetadataProcessor.__parse(file)
+        if document.metadata_xml is None:
             return {'rdf': {}}
-        return {'rdf': {'xml': ET.tostring(metadata_elem[0], encoding='unicode')}}
+        return {'rdf': {'xml': document.metadata_xml}}
 
     def strip(self, file):
-        tree, root, metadata_elem = SVGMetadataProcessor.__parse(file)
-
-        if metadata_elem is not None:
-            root.remove(metadata_elem)
-
-        result = io.BytesIO()
-        SVGMetadataProcessor.__register_xml_namespaces()
-        tree.write(result, xml_declaration=True, encoding='utf-8')
-        result.seek(0)
-        return result
+        data, document, compressed = SVGMetadataProcessor.__parse(file)
+        if document.metadata_span is None:
+            return SVGMetadataProcessor.__result([data], compressed)
+        start, _, end = document.metadata_span
+        return SVGMetadataProcessor.__result([data[:start], data[end:]], compressed)
 
     def combine(self, file, metadata):
         if not metadata:
@@ -146,14 +681,28 @@ class SVGMetadataProcessor(MetadataProcessor):
         if 'xml' not in rdf:
             raise ValueError('XML string missing from RDF metadata.')
 
-        tree, root, metadata_elem = SVGMetadataProcessor.__parse(file)
+        data, document, compressed = SVGMetadataProcessor.__parse(file)
+        # Serializes the metadata again to add missing namespace declarations
+        rdf_xml = ET.tostring(ET.fromstring(rdf['xml']), encoding='unicode').encode('utf-8')
+        metadata_span = document.metadata_span
 
-        if metadata_elem is None:
-            metadata_elem = ET.SubElement(root, '{%(svg)s}metadata' % XML_NS)
-        metadata_elem.append(ET.fromstring(rdf['xml']))
+        if metadata_span is not None and metadata_span[1] is not None:
+            # Appends the metadata to the existing metadata element
+            insert_start = insert_end = metadata_span[1]
+            inserted_xml = rdf_xml
+        else:
+            inserted_xml = b''.join([b'<metadata xmlns="', XML_NS['svg'].encode('utf-8'), b'">',
+                                     rdf_xml, b'</metadata>'])
+            if metadata_span is not None:
+                insert_start, _, insert_end = metadata_span
+            elif document.root_end is None:
+                # Replaces the empty-element tag of the root element with a
+                # start tag and an end tag
+                root_tag_end = _tag_end(data, document.root_start)
+                root_name = data[document.root_start + 1:root_tag_end - 2].split(None, 1)[0]
+                return SVGMetadataProcessor.__result([data[:root_tag_end - 2], b'>', inserted_xml,
+                                                      b'</', root_name, b'>', data[root_tag_end:]], compressed)
+            else:
+                insert_start = insert_end = document.root_end
 
-        result = io.BytesIO()
-        SVGMetadataProcessor.__register_xml_namespaces()
-        tree.write(result, xml_declaration=True, encoding='utf-8')
-        result.seek(0)
-        return result
+        return SVGMetadataProcessor.__result([data[:insert_start], inserted_xml, data[insert_end:]], compressed)
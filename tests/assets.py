@@ -1,4 +1,5 @@
 import datetime
+import gzip
 import io
 import subprocess
 from xml.etree import ElementTree as ET
@@ -182,6 +183,13 @@ def svg_vector_asset():
                             **metadata)
 
 
+@pytest.fixture(scope='session')
+def svgz_vector_asset(svg_vector_asset):
+    essence = io.BytesIO(gzip.compress(svg_vector_asset.essence.read()))
+    metadata = dict(svg_vector_asset.metadata, mime_type='image/svg+xml-compressed')
+    return madam.core.Asset(essence=essence, **metadata)
+
+
 @pytest.fixture(scope='session', params=['jpeg_image_asset', 'png_image_asset', 'gif_image_asset', 'webp_image_asset'])
 def image_asset(request, jpeg_image_asset, png_image_asset, gif_image_asset, webp_image_asset):
     if request.param == 'jpeg_image_asset':
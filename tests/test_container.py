@@ -0,0 +1,218 @@
+import io
+import struct
+
+import PIL.Image
+import PIL.PngImagePlugin
+import pytest
+
+import madam.container
+from assets import DEFAULT_WIDTH, DEFAULT_HEIGHT
+from assets import gif_image_asset, jpeg_data_with_exif, jpeg_image_asset, png_image_asset, webp_image_asset
+
+
+def mpo_data(*sizes):
+    images = [PIL.Image.new('RGB', size, 'red') for size in sizes]
+    data = io.BytesIO()
+    images[0].save(data, 'MPO', save_all=True, append_images=images[1:])
+    return data.getvalue()
+
+
+def test_jpeg_segments_cover_all_data(jpeg_data_with_exif):
+    data = jpeg_data_with_exif.getvalue()
+
+    segments = list(madam.container.jpeg_segments(data))
+
+    assert segments[0] == (madam.container.JPEG_SOI, 0, 2)
+    assert segments[-1].marker == madam.container.JPEG_SOS
+    assert segments[-1].end == len(data)
+    assert all(previous.end == segment.start for previous, segment in zip(segments, segments[1:]))
+
+
+def test_jpeg_segments_raises_error_for_non_jpeg_data(png_image_asset):
+    with pytest.raises(ValueError):
+        list(madam.container.jpeg_segments(png_image_asset.essence.read()))
+
+
+def test_jpeg_segments_raises_error_for_truncated_data(jpeg_data_with_exif):
+    with pytest.raises(ValueError):
+        list(madam.container.jpeg_segments(jpeg_data_with_exif.getvalue()[:1000]))
+
+
+def test_png_size_returns_dimensions_of_image_header(png_image_asset):
+    data = png_image_asset.essence.read(33)
+
+    assert madam.container.png_size(data) == (DEFAULT_WIDTH, DEFAULT_HEIGHT)
+
+
+def test_png_size_raises_error_for_other_data(jpeg_image_asset):
+    with pytest.raises(ValueError):
+        madam.container.png_size(jpeg_image_asset.essence.read())
+
+
+def test_jpeg_size_returns_dimensions_of_frame(jpeg_image_asset):
+    assert madam.container.jpeg_size(jpeg_image_asset.essence.read()) == (DEFAULT_WIDTH, DEFAULT_HEIGHT)
+
+
+def test_jpeg_previews_returns_exif_thumbnail(jpeg_data_with_exif):
+    previews = madam.container.jpeg_previews(jpeg_data_with_exif.getvalue())
+
+    assert len(previews) == 1
+    assert PIL.Image.open(io.BytesIO(previews[0])).size == madam.container.jpeg_size(previews[0]) == (160, 120)
+
+
+def test_jpeg_previews_returns_additional_images_of_multi_picture_format():
+    previews = madam.container.jpeg_previews(mpo_data((40, 30), (20, 15), (8, 6)))
+
+    assert [madam.container.jpeg_size(preview) for preview in previews] == [(20, 15), (8, 6)]
+
+
+def test_jpeg_previews_returns_empty_list_for_jpeg_without_previews(jpeg_image_asset):
+    assert madam.container.jpeg_previews(jpeg_image_asset.essence.read()) == []
+
+
+def jpeg_with_segments(jpeg_data, *segments):
+    return jpeg_data[:2] + b''.join(
+        struct.pack('>BBH', 0xFF, marker, 2 + len(payload)) + payload for marker, payload in segments
+    ) + jpeg_data[2:]
+
+
+def photoshop_payload(*resources):
+    return b'Photoshop 3.0\x00' + b''.join(
+        b'8BIM' + struct.pack('>HBBI', resource_id, 0, 0, len(data)) + data + b'\x00' * (len(data) % 2)
+        for resource_id, data in resources
+    )
+
+
+def test_jpeg_strip_removes_all_metadata_segments(jpeg_image_asset):
+    jpeg_data = jpeg_image_asset.essence.read()
+    data = jpeg_with_segments(
+        jpeg_data,
+        (madam.container.JPEG_APP1, b'Exif\x00\x00MM\x00*\x00\x00\x00\x08\x00\x00\x00\x00\x00\x00'),
+        (madam.container.JPEG_APP1, b'http://ns.adobe.com/xap/1.0/\x00<x:xmpmeta/>'),
+        (madam.container.JPEG_APP13, photoshop_payload((0x0404, b'\x1c\x02\x78\x00\x03Foo'))),
+        (madam.container.JPEG_COM, b'Comment'),
+    )
+
+    stripped_data = madam.container.jpeg_strip(data)
+
+    assert stripped_data == jpeg_data
+
+
+def test_jpeg_strip_removes_only_specified_formats(jpeg_image_asset):
+    jpeg_data = jpeg_image_asset.essence.read()
+    comment = (madam.container.JPEG_COM, b'Comment')
+    data = jpeg_with_segments(jpeg_data, (madam.container.JPEG_APP1, b'Exif\x00\x00MM\x00*'), comment)
+
+    stripped_data = madam.container.jpeg_strip(data, formats=['exif'])
+
+    assert stripped_data == jpeg_with_segments(jpeg_data, comment)
+
+
+def test_jpeg_strip_keeps_photoshop_resources_other_than_iptc(jpeg_image_asset):
+    jpeg_data = jpeg_image_asset.essence.read()
+    iptc_resource = (0x0404, b'\x1c\x02\x78\x00\x03Foo')
+    other_resource = (0x03ED, b'\x00\x48\x00\x00\x00\x01\x00\x01\x00\x48\x00\x00\x00\x01\x00\x01')
+    data = jpeg_with_segments(jpeg_data, (madam.container.JPEG_APP13, photoshop_payload(iptc_resource,
+                                                                                          other_resource)))
+
+    stripped_data = madam.container.jpeg_strip(data)
+
+    assert stripped_data == jpeg_with_segments(jpeg_data, (madam.container.JPEG_APP13,
+                                                           photoshop_payload(other_resource)))
+
+
+def test_jpeg_strip_keeps_image_data(jpeg_data_with_exif):
+    data = jpeg_data_with_exif.getvalue()
+
+    stripped_data = madam.container.jpeg_strip(data)
+
+    assert len(stripped_data) < len(data)
+    assert not PIL.Image.open(io.BytesIO(stripped_data)).getexif()
+    assert PIL.Image.open(io.BytesIO(stripped_data)).tobytes() == PIL.Image.open(io.BytesIO(data)).tobytes()
+
+
+def test_jpeg_strip_returns_identical_data_without_metadata(jpeg_image_asset):
+    jpeg_data = jpeg_image_asset.essence.read()
+
+    assert madam.container.jpeg_strip(jpeg_data) == jpeg_data
+
+
+def png_data_with_metadata():
+    image = PIL.Image.new('RGB', (8, 6), 'red')
+    exif = PIL.Image.Exif()
+    exif[0x013B] = 'Test artist'
+    info = PIL.PngImagePlugin.PngInfo()
+    info.add_itxt('XML:com.adobe.xmp', '<x:xmpmeta xmlns:x="adobe:ns:meta/"/>')
+    info.add_text('Comment', 'Test comment')
+    info.add_text('Title', 'Test title')
+    data = io.BytesIO()
+    image.save(data, 'PNG', exif=exif.tobytes(), pnginfo=info)
+    return data.getvalue()
+
+
+def webp_data_with_metadata():
+    image = PIL.Image.new('RGB', (8, 6), 'red')
+    exif = PIL.Image.Exif()
+    exif[0x013B] = 'Test artist'
+    data = io.BytesIO()
+    image.save(data, 'WEBP', lossless=True, exif=exif.tobytes(), xmp=b'<x:xmpmeta xmlns:x="adobe:ns:meta/"/>')
+    return data.getvalue()
+
+
+def test_png_chunks_cover_all_data():
+    data = png_data_with_metadata()
+
+    chunks = list(madam.container.png_chunks(data))
+
+    assert chunks[0].type == b'IHDR' and chunks[0].start == 8
+    assert chunks[-1].type == b'IEND' and chunks[-1].end == len(data)
+    assert all(previous.end == chunk.start for previous, chunk in zip(chunks, chunks[1:]))
+
+
+def test_metadata_formats_returns_formats_of_png_chunks():
+    assert madam.container.metadata_formats(png_data_with_metadata()) == {'exif', 'xmp', 'comment'}
+
+
+def test_png_strip_removes_metadata_chunks_only():
+    data = png_data_with_metadata()
+
+    stripped_data = madam.container.png_strip(data)
+
+    assert [chunk.type for chunk in madam.container.png_chunks(stripped_data)] == [b'IHDR', b'tEXt', b'IDAT', b'IEND']
+    stripped_image = PIL.Image.open(io.BytesIO(stripped_data))
+    assert stripped_image.info == {'Title': 'Test title'}
+    assert stripped_image.tobytes() == PIL.Image.open(io.BytesIO(data)).tobytes()
+
+
+def test_png_chunk_has_valid_checksum(png_image_asset):
+    data = png_image_asset.essence.read()
+    chunk = next(madam.container.png_chunks(data))
+
+    assert madam.container.png_chunk(b'IHDR', data[chunk.start + 8:chunk.end - 4]) == data[chunk.start:chunk.end]
+
+
+def test_metadata_formats_returns_formats_of_webp_chunks():
+    assert madam.container.metadata_formats(webp_data_with_metadata()) == {'exif', 'xmp'}
+
+
+def test_webp_strip_removes_metadata_chunks_and_flags():
+    data = webp_data_with_metadata()
+
+    stripped_data = madam.container.webp_strip(data)
+
+    assert [chunk.fourcc for chunk in madam.container.webp_chunks(stripped_data)] == [b'VP8X', b'VP8L']
+    assert stripped_data[20] & 0x0C == 0
+    stripped_image = PIL.Image.open(io.BytesIO(stripped_data))
+    assert 'exif' not in stripped_image.info and 'xmp' not in stripped_image.info
+    assert stripped_image.tobytes() == PIL.Image.open(io.BytesIO(data)).tobytes()
+
+
+def test_webp_strip_returns_identical_data_without_metadata(webp_image_asset):
+    data = webp_image_asset.essence.read()
+
+    assert madam.container.webp_strip(data) == data
+
+
+def test_strip_raises_error_for_unsupported_format(gif_image_asset):
+    with pytest.raises(ValueError):
+        madam.container.strip(gif_image_asset.essence.read())
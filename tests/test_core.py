@@ -1,12 +1,19 @@
 import unittest.mock
 
+import asyncio
 import io
 import os
+import pickle
+import shelve
+import threading
+import types
 import pytest
 
 from madam.core import Asset
 from madam.core import InMemoryStorage, ShelveStorage
-from madam.core import Pipeline
+from madam.core import FanOut, OperatorSpec, Pipeline, Processor, RenditionCache, operator
+from madam.core import StageRecord, StageStatistics
+from madam.future import StopAsyncIteration, coroutine
 
 
 @pytest.fixture
@@ -163,6 +170,32 @@ class TestStorages:
         assert len(asset_keys_with_1s_duration) == 1
         assert list(asset_keys_with_1s_duration)[0] == asset_key
 
+    def test_update_metadata_changes_metadata_of_stored_asset(self, storage):
+        asset = Asset(io.BytesIO(b'TestEssence'), mime_type='image/jpeg', iptc={'caption': 'Foo', 'copyright': 'Me'})
+        storage['key'] = asset, {'foo'}
+
+        storage.update_metadata('key', iptc={'copyright': 'Nobody'}, width=42)
+
+        updated_asset, tags = storage['key']
+        assert updated_asset.essence.read() == b'TestEssence'
+        assert updated_asset.mime_type == 'image/jpeg'
+        assert updated_asset.width == 42
+        assert updated_asset.iptc == {'caption': 'Foo', 'copyright': 'Nobody'}
+        assert tags == {'foo'}
+
+    def test_update_metadata_merges_metadata_formats_of_any_mapping_type(self, storage):
+        asset = Asset(io.BytesIO(b'TestEssence'), mime_type='image/jpeg', iptc={'caption': 'Foo', 'copyright': 'Me'})
+        storage['key'] = asset, set()
+
+        storage.update_metadata('key', iptc=types.MappingProxyType({'copyright': 'Nobody'}))
+
+        updated_asset, _ = storage['key']
+        assert updated_asset.iptc == {'caption': 'Foo', 'copyright': 'Nobody'}
+
+    def test_update_metadata_raises_key_error_for_unknown_asset(self, storage):
+        with pytest.raises(KeyError):
+            storage.update_metadata('key', width=42)
+
 
 @pytest.mark.usefixtures('asset', 'shelve_storage')
 class TestShelveStorage:
@@ -180,6 +213,25 @@ class TestShelveStorage:
 
         assert os.path.exists(storage.path)
 
+    def test_update_metadata_does_not_write_essence(self, storage, asset):
+        storage['key'] = asset, None
+
+        with unittest.mock.patch('shelve.open', wraps=shelve.open) as shelve_open:
+            storage.update_metadata('key', width=42)
+
+        assert [args for args, kwargs in shelve_open.call_args_list] == [(storage.path,)]
+
+    def test_get_reads_assets_that_were_stored_completely(self, storage, asset):
+        with shelve.open(storage.path) as store:
+            store['key'] = (asset, {'foo'})
+
+        storage.update_metadata('key', width=42)
+
+        updated_asset, tags = storage['key']
+        assert updated_asset.essence.read() == asset.essence.read()
+        assert updated_asset.width == 42
+        assert tags == {'foo'}
+
 
 @pytest.fixture
 def asset():
@@ -267,3 +319,615 @@ class TestPipeline:
         [processed_asset for processed_asset in pipeline.process(asset)]
 
         operator.assert_called_once_with(asset)
+
+    def test_process_fuses_consecutive_operators_of_the_same_processor(self, pipeline, asset):
+        processor = FusingProcessor()
+        first_operator = processor.append(suffix=b'1')
+        second_operator = processor.append(suffix=b'2')
+        pipeline.add(first_operator)
+        pipeline.add(second_operator)
+
+        processed_asset = next(pipeline.process(asset))
+
+        assert processor.fused_operators == [first_operator, second_operator]
+        assert processed_asset.essence.read() == b'TestEssence12'
+
+    def test_process_does_not_fuse_operators_of_different_processors(self, pipeline, asset):
+        processor = FusingProcessor()
+        another_processor = FusingProcessor()
+        pipeline.add(processor.append(suffix=b'1'))
+        pipeline.add(another_processor.append(suffix=b'2'))
+
+        processed_asset = next(pipeline.process(asset))
+
+        assert processor.fused_operators is None
+        assert another_processor.fused_operators is None
+        assert processed_asset.essence.read() == b'TestEssence12'
+
+    def test_process_returns_cached_results_for_repeated_assets(self, asset):
+        pipeline = Pipeline(cache=RenditionCache())
+        processor = FusingProcessor()
+        pipeline.add(processor.append(suffix=b'1'))
+        pipeline.add(processor.append(suffix=b'2'))
+        processed_asset = next(pipeline.process(asset))
+
+        with unittest.mock.patch.object(processor, 'fuse') as fuse:
+            fuse.return_value = unittest.mock.MagicMock()
+            cached_asset = next(pipeline.process(Asset(asset.essence)))
+
+        fuse.return_value.assert_not_called()
+        assert cached_asset == processed_asset
+
+    def test_stream_processes_assets_of_iterable_in_order(self):
+        pipeline = pipeline_with(FusingProcessor().append(suffix=b'!'))
+        assets = (Asset(io.BytesIO(b'%d' % index)) for index in range(10))
+
+        processed_assets = pipeline.stream(assets, max_in_flight=3)
+
+        assert [a.essence.read() for a in processed_assets] == [b'%d!' % index for index in range(10)]
+
+    def test_stream_takes_at_most_max_in_flight_assets_from_iterable(self):
+        taken_assets = []
+
+        def assets():
+            for index in range(10):
+                taken_assets.append(index)
+                yield Asset(io.BytesIO(b'%d' % index))
+        pipeline = pipeline_with(FusingProcessor().append(suffix=b'!'))
+
+        processed_assets = pipeline.stream(assets(), max_in_flight=3)
+        next(processed_assets)
+
+        assert len(taken_assets) == 3
+        processed_assets.close()
+
+    def test_stream_raises_error_when_max_in_flight_is_not_positive(self, pipeline):
+        with pytest.raises(ValueError):
+            pipeline.stream([], max_in_flight=0)
+
+    @pytest.mark.parametrize('max_in_flight', [1, 3])
+    def test_astream_processes_assets_of_async_iterable_in_order(self, max_in_flight):
+        pipeline = pipeline_with(FusingProcessor().append(suffix=b'!'))
+        assets = AsyncAssets(b'%d' % index for index in range(10))
+
+        processed_assets = collect(pipeline.astream(assets, max_in_flight=max_in_flight))
+
+        assert [a.essence.read() for a in processed_assets] == [b'%d!' % index for index in range(10)]
+
+    def test_astream_processes_assets_of_regular_iterable(self):
+        pipeline = pipeline_with(FusingProcessor().append(suffix=b'!'))
+        assets = [Asset(io.BytesIO(b'a')), Asset(io.BytesIO(b'b'))]
+
+        processed_assets = collect(pipeline.astream(assets, max_in_flight=2))
+
+        assert [a.essence.read() for a in processed_assets] == [b'a!', b'b!']
+
+    def test_astream_takes_at_most_max_in_flight_assets_from_async_iterable(self):
+        pipeline = pipeline_with(FusingProcessor().append(suffix=b'!'))
+        assets = AsyncAssets(b'%d' % index for index in range(10))
+        processed_assets = pipeline.astream(assets, max_in_flight=3)
+
+        collect(processed_assets, count=1)
+
+        assert assets.taken_count == 3
+        processed_assets.close()
+
+    def test_astream_raises_error_when_max_in_flight_is_not_positive(self, pipeline):
+        with pytest.raises(ValueError):
+            pipeline.astream([], max_in_flight=0)
+
+    def test_process_does_not_optimize_operators_by_default(self, pipeline, asset):
+        processor = FusingProcessor()
+        pipeline.add(processor.append(suffix=b''))
+
+        next(pipeline.process(asset))
+
+        assert processor.optimized_metadata == []
+
+    def test_plan_passes_asset_metadata_to_optimize(self):
+        processor = FusingProcessor()
+        pipeline = pipeline_with(processor.append(suffix=b''), processor.append(suffix=b'1'))
+        asset = Asset(io.BytesIO(b'a'), mime_type='text/plain')
+
+        planned_operators = pipeline.plan(asset)
+
+        assert planned_operators == [processor.append(suffix=b'1')]
+        assert processor.optimized_metadata == [asset.metadata]
+
+    def test_plan_passes_dry_run_metadata_to_optimize_after_changes_of_other_processors(self, asset):
+        processor = FusingProcessor()
+        another_processor = FusingProcessor()
+        pipeline = pipeline_with(processor.append(suffix=b'1'), another_processor.append(suffix=b'2'))
+
+        pipeline.plan(asset)
+
+        assert processor.optimized_metadata == [asset.metadata]
+        assert another_processor.optimized_metadata == [dict(asset.metadata, length=1)]
+
+    def test_plan_passes_no_metadata_to_optimize_when_dry_run_is_not_possible(self, asset):
+        processor = FusingProcessor()
+        another_processor = FusingProcessor()
+        pipeline = pipeline_with(processor.prepend(), another_processor.append(suffix=b'2'))
+
+        pipeline.plan(asset)
+
+        assert another_processor.optimized_metadata == [None]
+
+    def test_dry_run_returns_metadata_of_all_operators(self, asset):
+        processor = FusingProcessor()
+        pipeline = pipeline_with(processor.append(suffix=b'1'), FusingProcessor().append(suffix=b'22'))
+
+        metadata = pipeline.dry_run(asset)
+
+        assert metadata == dict(asset.metadata, length=3)
+
+    def test_dry_run_accepts_metadata(self):
+        pipeline = pipeline_with(FusingProcessor().append(suffix=b'1'))
+
+        metadata = pipeline.dry_run(dict(mime_type='text/plain'))
+
+        assert metadata == dict(mime_type='text/plain', length=1)
+
+    def test_dry_run_returns_none_if_metadata_of_an_operator_cannot_be_determined(self, asset):
+        processor = FusingProcessor()
+        pipeline = pipeline_with(processor.prepend(), processor.append(suffix=b'1'))
+
+        assert pipeline.dry_run(asset) is None
+
+    def test_dry_run_does_not_apply_operators(self, asset):
+        operator = FusingProcessor().append(suffix=b'1')
+        pipeline = pipeline_with(operator)
+
+        with unittest.mock.patch.object(FusingProcessor.append, '__wrapped__') as function:
+            pipeline.dry_run(asset)
+
+        function.assert_not_called()
+
+    def test_optimizing_pipeline_applies_planned_operators(self, asset):
+        processor = FusingProcessor()
+        pipeline = Pipeline(optimize=True)
+        pipeline.add(processor.append(suffix=b''))
+        pipeline.add(processor.append(suffix=b'1'))
+
+        processed_asset = next(pipeline.process(asset))
+
+        assert processor.fused_operators is None
+        assert processed_asset.essence.read() == b'TestEssence1'
+
+    def test_explain_lists_operators_and_stages(self, asset):
+        processor = FusingProcessor()
+        pipeline = Pipeline(optimize=True)
+        pipeline.add(processor.append(suffix=b''))
+        pipeline.add(processor.append(suffix=b'1'))
+        pipeline.add(processor.prepend())
+
+        explanation = pipeline.explain(asset)
+
+        assert explanation.splitlines() == [
+            'Asset: mime_type=None',
+            'Operators:',
+            "    FusingProcessor.append(suffix=b'')",
+            "    FusingProcessor.append(suffix=b'1')",
+            "    FusingProcessor.prepend(prefix=b'0')",
+            'Plan:',
+            "    1. FusingProcessor.append(suffix=b'1') -> FusingProcessor.prepend(prefix=b'0') (fused)",
+        ]
+
+    def test_process_reports_a_record_for_every_stage_to_observers(self, asset):
+        observer = unittest.mock.MagicMock()
+        pipeline = Pipeline(observers=[observer])
+        processor = FusingProcessor()
+        pipeline.add(processor.append(suffix=b'1'))
+        pipeline.add(processor.prepend(prefix=b'22'))
+        pipeline.add(FusingProcessor().append(suffix=b'333'))
+
+        next(pipeline.process(asset))
+
+        records = [args[0] for args, kwargs in observer.call_args_list]
+        assert [record.name for record in records] == [
+            'FusingProcessor.append + FusingProcessor.prepend',
+            'FusingProcessor.append',
+        ]
+        assert [(record.input_size, record.output_size) for record in records] == [(11, 14), (14, 17)]
+        for record in records:
+            assert record.wall_time >= 0
+            assert record.cpu_time >= 0
+
+    def test_fan_out_reports_shared_stages_to_its_observers(self, asset):
+        observer = unittest.mock.MagicMock()
+        processor = FusingProcessor()
+        fan_out = FanOut(pipeline_with(processor.append(suffix=b'1')),
+                         pipeline_with(processor.append(suffix=b'22')),
+                         observers=[observer])
+
+        next(fan_out.process(asset))
+
+        record = observer.call_args[0][0]
+        assert record.name == 'FusingProcessor.append | FusingProcessor.append'
+        assert (record.input_size, record.output_size) == (11, 25)
+
+
+class FusingProcessor(Processor):
+    def __init__(self):
+        super().__init__()
+        self.fused_operators = None
+        self.fanned_branches = None
+        self.optimized_metadata = []
+
+    def can_read(self, file):
+        return True
+
+    def read(self, file):
+        return Asset(file)
+
+    @operator
+    def append(self, asset, suffix):
+        return Asset(io.BytesIO(asset.essence.read() + suffix))
+
+    @operator
+    def prepend(self, asset, prefix=b'0'):
+        return Asset(io.BytesIO(prefix + asset.essence.read()))
+
+    def optimize(self, operators, metadata):
+        self.optimized_metadata.append(metadata)
+        return [operator for operator in operators if operator.name != 'append' or operator.kwargs['suffix']]
+
+    def dry_run(self, operator, metadata):
+        if operator.name != 'append':
+            return None
+        return dict(metadata, length=metadata.get('length', 0) + len(operator.kwargs['suffix']))
+
+    def fan_out(self, branches):
+        self.fanned_branches = branches
+
+        def fanned_operator(asset):
+            return [self.fuse(operators)(asset) for operators in branches]
+        return fanned_operator
+
+    def fuse(self, operators):
+        self.fused_operators = operators
+
+        def fused_operator(asset):
+            for configured_operator in operators:
+                asset = configured_operator(asset)
+            return asset
+        return fused_operator
+
+
+def pipeline_with(*operators):
+    pipeline = Pipeline()
+    for operator in operators:
+        pipeline.add(operator)
+    return pipeline
+
+
+class AsyncAssets:
+    """
+    Asynchronous iterable of assets with the specified essences.
+    """
+    def __init__(self, essences):
+        self.essences = iter(essences)
+        self.taken_count = 0
+
+    def __aiter__(self):
+        return self
+
+    @coroutine
+    def __anext__(self):
+        yield from asyncio.sleep(0)
+        try:
+            essence = next(self.essences)
+        except StopIteration:
+            raise StopAsyncIteration
+        self.taken_count += 1
+        return Asset(io.BytesIO(essence))
+
+
+def collect(async_iterator, count=None):
+    """
+    Returns the items of an asynchronous iterator, or only the first `count`
+    items, using a new event loop.
+    """
+    @coroutine
+    def collect_items():
+        items = []
+        while count is None or len(items) < count:
+            try:
+                items.append((yield from async_iterator.__anext__()))
+            except StopAsyncIteration:
+                break
+        return items
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(collect_items())
+    finally:
+        loop.close()
+
+
+class TestFanOut:
+    @pytest.fixture
+    def processor(self):
+        return FusingProcessor()
+
+    def test_process_returns_one_asset_per_branch(self, processor, asset):
+        fan_out = FanOut(pipeline_with(processor.append(suffix=b'1')),
+                         pipeline_with(processor.append(suffix=b'2')),
+                         Pipeline())
+
+        processed_assets = next(fan_out.process(asset))
+
+        assert [a.essence.read() for a in processed_assets] == [b'TestEssence1', b'TestEssence2', b'TestEssence']
+
+    def test_process_passes_leading_operators_of_the_same_processor_to_fan_out(self, processor, asset):
+        first_branch_head = [processor.append(suffix=b'1'), processor.append(suffix=b'2')]
+        second_branch_head = [processor.append(suffix=b'3')]
+        fan_out = FanOut(pipeline_with(*first_branch_head, FusingProcessor().append(suffix=b'!')),
+                         pipeline_with(*second_branch_head))
+
+        processed_assets = next(fan_out.process(asset))
+
+        assert processor.fanned_branches == [first_branch_head, second_branch_head]
+        assert [a.essence.read() for a in processed_assets] == [b'TestEssence12!', b'TestEssence3']
+
+    def test_process_applies_branches_separately_when_processors_differ(self, asset):
+        processor = FusingProcessor()
+        another_processor = FusingProcessor()
+        fan_out = FanOut(pipeline_with(processor.append(suffix=b'1')),
+                         pipeline_with(another_processor.append(suffix=b'2')))
+
+        processed_assets = next(fan_out.process(asset))
+
+        assert processor.fanned_branches is None
+        assert another_processor.fanned_branches is None
+        assert [a.essence.read() for a in processed_assets] == [b'TestEssence1', b'TestEssence2']
+
+    def test_stream_yields_results_for_every_asset(self, processor):
+        fan_out = FanOut(pipeline_with(processor.append(suffix=b'1')),
+                         pipeline_with(processor.append(suffix=b'2')))
+        assets = iter([Asset(io.BytesIO(b'a')), Asset(io.BytesIO(b'b'))])
+
+        processed_assets = list(fan_out.stream(assets, max_in_flight=2))
+
+        assert [[a.essence.read() for a in assets] for assets in processed_assets] == \
+            [[b'a1', b'a2'], [b'b1', b'b2']]
+
+    def test_astream_yields_results_for_every_asset(self, processor):
+        fan_out = FanOut(pipeline_with(processor.append(suffix=b'1')),
+                         pipeline_with(processor.append(suffix=b'2')))
+
+        processed_assets = collect(fan_out.astream(AsyncAssets([b'a', b'b']), max_in_flight=2))
+
+        assert [[a.essence.read() for a in assets] for assets in processed_assets] == \
+            [[b'a1', b'a2'], [b'b1', b'b2']]
+
+    def test_process_yields_results_for_every_asset(self, processor):
+        fan_out = FanOut(pipeline_with(processor.append(suffix=b'1')),
+                         pipeline_with(processor.append(suffix=b'2')))
+
+        processed_assets = list(fan_out.process(Asset(io.BytesIO(b'a')), Asset(io.BytesIO(b'b'))))
+
+        assert [[a.essence.read() for a in assets] for assets in processed_assets] == \
+            [[b'a1', b'a2'], [b'b1', b'b2']]
+
+
+def stage_record(name='stage', wall_time=0.0, cpu_time=0.0, subprocess_time=None, input_size=0, output_size=0):
+    return StageRecord(name, wall_time=wall_time, cpu_time=cpu_time, subprocess_time=subprocess_time,
+                       input_size=input_size, output_size=output_size)
+
+
+class TestStageStatistics:
+    @pytest.fixture
+    def statistics(self):
+        return StageStatistics()
+
+    def test_count_waits_for_records_being_added(self, statistics):
+        counts = []
+        with statistics._lock:
+            statistics(stage_record())
+            thread = threading.Thread(target=lambda: counts.append(statistics.count('stage')))
+            thread.start()
+            thread.join(0.05)
+            assert not counts
+            statistics(stage_record())
+        thread.join()
+
+        assert counts == [2]
+
+    def test_percentiles_of_recorded_stage(self, statistics):
+        for wall_time in range(1, 101):
+            statistics(stage_record(wall_time=float(wall_time)))
+
+        percentiles = statistics.percentiles('stage', percentiles=(0, 50, 90, 100))
+
+        assert percentiles == {0: 1.0, 50: 50.0, 90: 90.0, 100: 100.0}
+
+    def test_percentiles_of_unknown_stage_are_none(self, statistics):
+        assert statistics.percentiles('stage', percentiles=(50,)) == {50: None}
+
+    def test_statistics_keep_only_most_recent_records(self):
+        statistics = StageStatistics(max_samples=2)
+        for output_size in (100, 1, 2):
+            statistics(stage_record(output_size=output_size))
+
+        assert statistics.count('stage') == 3
+        assert statistics.percentiles('stage', field='output_size', percentiles=(100,)) == {100: 2}
+
+    def test_summary_contains_all_stages(self, statistics):
+        statistics(stage_record(name='first'))
+        statistics(stage_record(name='second'))
+
+        summary = statistics.summary()
+
+        assert statistics.stages == ['first', 'second']
+        assert 'first (n=1)' in summary
+        assert 'second (n=1)' in summary
+        assert 'subprocess_time' not in summary
+
+    def test_print_summary_writes_summary_to_file(self, statistics):
+        statistics(stage_record())
+        file = io.StringIO()
+
+        statistics.print_summary(file=file)
+
+        assert file.getvalue() == statistics.summary() + '\n'
+
+
+class TestRenditionCache:
+    @pytest.fixture
+    def cache(self):
+        return RenditionCache()
+
+    @pytest.fixture
+    def processor(self):
+        return FusingProcessor()
+
+    def test_cache_returns_stored_asset(self, cache, asset):
+        cache['key'] = asset
+
+        assert cache['key'] is asset
+        assert 'key' in cache
+
+    def test_cache_raises_key_error_for_unknown_key(self, cache):
+        with pytest.raises(KeyError):
+            cache['unknown']
+
+    def test_key_is_identical_for_equal_assets_and_operators(self, processor):
+        key = RenditionCache.key(Asset(io.BytesIO(b'same'), width=1), [processor.append(suffix=b'1')])
+        same_key = RenditionCache.key(Asset(io.BytesIO(b'same'), width=1), [processor.append(suffix=b'1')])
+
+        assert key == same_key
+
+    @pytest.mark.parametrize('asset, operators', [
+        (Asset(io.BytesIO(b'other')), [FusingProcessor().append(suffix=b'1')]),
+        (Asset(io.BytesIO(b'same'), width=2), [FusingProcessor().append(suffix=b'1')]),
+        (Asset(io.BytesIO(b'same')), [FusingProcessor().append(suffix=b'2')]),
+        (Asset(io.BytesIO(b'same')), [FusingProcessor().prepend(prefix=b'1')]),
+        (Asset(io.BytesIO(b'same')), [FusingProcessor().append(suffix=b'1')] * 2),
+    ])
+    def test_key_differs_for_different_assets_or_operators(self, asset, operators):
+        key = RenditionCache.key(Asset(io.BytesIO(b'same')), [FusingProcessor().append(suffix=b'1')])
+
+        assert RenditionCache.key(asset, operators) != key
+
+    def test_cache_evicts_least_recently_used_assets_when_size_is_exceeded(self):
+        cache = RenditionCache(max_size=8)
+        cache['a'] = Asset(io.BytesIO(b'1234'))
+        cache['b'] = Asset(io.BytesIO(b'1234'))
+        cache['a']
+
+        cache['c'] = Asset(io.BytesIO(b'1234'))
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+
+    def test_disk_tier_persists_assets(self, tmpdir, asset):
+        cache = RenditionCache(path=str(tmpdir))
+        cache['key'] = asset
+
+        another_cache = RenditionCache(path=str(tmpdir))
+
+        assert another_cache['key'] == asset
+
+    def test_disk_tier_evicts_least_recently_used_assets_when_size_is_exceeded(self, tmpdir, asset):
+        cache = RenditionCache(path=str(tmpdir), max_disk_size=1)
+        cache['key'] = asset
+
+        another_cache = RenditionCache(path=str(tmpdir))
+
+        assert 'key' not in another_cache
+
+    @pytest.mark.parametrize('entry_data', [b'', b'\x80\x04\x95', b'corrupt'])
+    def test_disk_tier_treats_corrupt_entries_as_missing(self, tmpdir, asset, entry_data):
+        cache = RenditionCache(path=str(tmpdir))
+        cache['key'] = asset
+        tmpdir.join('key.pickle').write_binary(entry_data)
+
+        another_cache = RenditionCache(path=str(tmpdir))
+
+        with pytest.raises(KeyError):
+            another_cache['key']
+        assert 'key' not in another_cache
+        assert not tmpdir.join('key.pickle').exists()
+
+    def test_disk_tier_does_not_leave_partial_entries(self, tmpdir, asset):
+        cache = RenditionCache(path=str(tmpdir))
+
+        with unittest.mock.patch('pickle.dump', side_effect=RuntimeError):
+            with pytest.raises(RuntimeError):
+                cache['key'] = asset
+
+        assert tmpdir.listdir() == []
+
+    def test_operator_uses_cache_of_processor(self, processor, asset):
+        processor.cache = RenditionCache()
+        append = processor.append(suffix=b'1')
+        processed_asset = append(asset)
+
+        cached_asset = append(asset)
+
+        assert cached_asset is processed_asset
+
+    def test_operator_cache_applies_default_configuration(self, processor, asset):
+        processor.cache = RenditionCache()
+        processed_asset = processor.prepend()(asset)
+
+        cached_asset = processor.prepend(prefix=b'0')(asset)
+
+        assert cached_asset is processed_asset
+
+
+class TestOperatorSpec:
+    @pytest.fixture
+    def processor(self):
+        return FusingProcessor()
+
+    def test_operator_returns_spec_with_processor_name_and_configuration(self, processor):
+        spec = processor.append(suffix=b'1')
+
+        assert isinstance(spec, OperatorSpec)
+        assert spec.processor is processor
+        assert spec.processor_class is FusingProcessor
+        assert spec.name == 'append'
+        assert spec.kwargs == {'suffix': b'1'}
+
+    def test_spec_applies_operator(self, processor, asset):
+        spec = processor.append(suffix=b'1')
+
+        processed_asset = spec(asset)
+
+        assert processed_asset.essence.read() == b'TestEssence1'
+
+    def test_specs_are_equal_when_configuration_is_equal(self, processor):
+        spec = processor.prepend()
+        equal_spec = FusingProcessor().prepend(prefix=b'0')
+
+        assert spec == equal_spec
+        assert hash(spec) == hash(equal_spec)
+        assert spec.digest == equal_spec.digest
+
+    def test_specs_differ_when_configuration_differs(self, processor):
+        assert processor.prepend(prefix=b'0') != processor.prepend(prefix=b'1')
+        assert processor.prepend(prefix=b'0').digest != processor.prepend(prefix=b'1').digest
+
+    def test_spec_configuration_is_immutable(self, processor):
+        spec = processor.append(suffix=[b'1'])
+
+        assert spec.kwargs['suffix'] == (b'1',)
+        with pytest.raises(TypeError):
+            spec.kwargs['suffix'] = b'2'
+
+    def test_spec_raises_error_for_unknown_parameters(self, processor):
+        with pytest.raises(TypeError):
+            processor.append(unknown=b'1')
+
+    def test_spec_can_be_pickled_without_processor_instance(self, processor, asset):
+        processor.unpicklable = lambda: None
+        spec = processor.append(suffix=b'1')
+
+        unpickled_spec = pickle.loads(pickle.dumps(spec))
+
+        assert unpickled_spec == spec
+        assert isinstance(unpickled_spec.processor, FusingProcessor)
+        assert unpickled_spec(asset) == spec(asset)
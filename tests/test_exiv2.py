@@ -1,8 +1,12 @@
 import io
+from fractions import Fraction
+from unittest.mock import patch
+
+import PIL.Image
 import pyexiv2
 import pytest
 
-from assets import jpeg_image_asset, png_image_asset
+from assets import gif_image_asset, jpeg_data_with_exif, jpeg_image_asset, png_image_asset, webp_image_asset
 from madam.core import UnsupportedFormatError
 from madam.exiv2 import Exiv2MetadataProcessor
 
@@ -33,11 +37,11 @@ class TestExiv2MetadataProcessor:
         assert metadata['iptc']['caption'] == 'Foo bar'
         assert set(metadata.keys()) == {'exif', 'iptc'}
 
-    def test_read_fails_for_unsupported_format(self, processor, png_image_asset):
-        non_jpeg_essence = png_image_asset.essence
+    def test_read_fails_for_unsupported_format(self, processor, gif_image_asset):
+        unsupported_essence = gif_image_asset.essence
 
         with pytest.raises(UnsupportedFormatError):
-            processor.read(non_jpeg_essence)
+            processor.read(unsupported_essence)
 
     def test_read_ignores_unmapped_metadata(self, processor, jpeg_image_asset, tmpdir):
         file = tmpdir.join('asset_with_metadata.jpg')
@@ -120,3 +124,88 @@ class TestExiv2MetadataProcessor:
 
         with pytest.raises(UnsupportedFormatError):
             processor.combine(jpeg_image_asset.essence, exif)
+
+    def test_read_strip_and_combine_do_not_create_temporary_files(self, processor, jpeg_image_asset):
+        with patch('tempfile.NamedTemporaryFile') as named_temporary_file, \
+                patch('tempfile.mkstemp') as mkstemp:
+            metadata = processor.read(jpeg_image_asset.essence)
+            stripped_essence = processor.strip(jpeg_image_asset.essence)
+            processor.combine(stripped_essence, {'exif': {'artist': 'Test artist'}})
+
+        assert not metadata
+        assert not named_temporary_file.called
+        assert not mkstemp.called
+
+    def test_strip_returns_same_data_as_exiv2(self, processor, jpeg_data_with_exif):
+        exiv2_metadata = pyexiv2.ImageMetadata.from_buffer(jpeg_data_with_exif.getvalue())
+        exiv2_metadata.read()
+        exiv2_metadata.clear()
+        exiv2_metadata.write()
+
+        essence = processor.strip(io.BytesIO(jpeg_data_with_exif.getvalue()))
+
+        assert essence.read() == exiv2_metadata.buffer
+
+    def test_read_does_not_use_exiv2_for_jpeg_without_metadata(self, processor, jpeg_image_asset):
+        with patch('pyexiv2.ImageMetadata.from_buffer') as from_buffer:
+            metadata = processor.read(jpeg_image_asset.essence)
+
+        assert not metadata
+        assert not from_buffer.called
+
+    def test_read_returns_same_metadata_as_exiv2_for_jpeg_with_metadata(self, processor, jpeg_data_with_exif):
+        exiv2_metadata = pyexiv2.ImageMetadata.from_buffer(jpeg_data_with_exif.getvalue())
+        exiv2_metadata.read()
+        exif_keys = [key for key in exiv2_metadata.exif_keys if key in processor.metadata_to_exiv2.inv]
+
+        metadata = processor.read(io.BytesIO(jpeg_data_with_exif.getvalue()))
+
+        assert set(metadata['exif']) == {processor.metadata_to_exiv2.inv[key] for key in exif_keys}
+
+    def test_to_madam_converts_values_of_metadata_format(self, processor):
+        exiv2_values = {
+            'Exif.Image.Artist': 'Test artist',
+            'Exif.GPSInfo.GPSLatitude': [Fraction(1, 2), Fraction(3)],
+            'Exif.Image.TargetPrinter': 'Printer',
+            'Iptc.Application2.Caption': ['Foo bar'],
+        }
+
+        metadata = processor.to_madam('exif', exiv2_values)
+
+        assert metadata == {'artist': 'Test artist', 'gps.latitude': (0.5, 3.0)}
+
+    def test_to_exiv2_converts_values_of_metadata_format(self, processor):
+        metadata = {'keywords': ('foo', 'bar'), 'caption': 'Foo bar', 'artist': 'Test artist'}
+
+        exiv2_values = processor.to_exiv2('iptc', metadata)
+
+        assert exiv2_values == {'Iptc.Application2.Keywords': ['foo', 'bar'], 'Iptc.Application2.Caption': ['Foo bar']}
+
+    def test_to_exiv2_and_to_madam_are_inverse(self, processor, jpeg_image_asset):
+        for metadata_format in processor.formats:
+            metadata = jpeg_image_asset.metadata[metadata_format]
+
+            converted_metadata = processor.to_madam(metadata_format, processor.to_exiv2(metadata_format, metadata))
+
+            assert converted_metadata == metadata
+
+    @pytest.mark.parametrize('asset_fixture', ['png_image_asset', 'webp_image_asset'])
+    def test_combine_and_read_support_png_and_webp(self, processor, asset_fixture, request):
+        asset = request.getfixturevalue(asset_fixture)
+        metadata = {'exif': {'artist': 'Test artist'}, 'iptc': {'caption': 'Foo bar'}}
+
+        essence_with_metadata = processor.combine(asset.essence, metadata)
+
+        assert processor.read(essence_with_metadata) == metadata
+
+    @pytest.mark.parametrize('asset_fixture', ['png_image_asset', 'webp_image_asset'])
+    def test_strip_removes_metadata_of_png_and_webp_without_exiv2(self, processor, asset_fixture, request):
+        asset = request.getfixturevalue(asset_fixture)
+        essence_with_metadata = processor.combine(asset.essence, {'exif': {'artist': 'Test artist'}})
+
+        with patch('pyexiv2.ImageMetadata.from_buffer') as from_buffer:
+            essence = processor.strip(essence_with_metadata)
+
+        assert not from_buffer.called
+        assert not processor.read(io.BytesIO(essence.getvalue()))
+        assert PIL.Image.open(essence).tobytes() == PIL.Image.open(asset.essence).tobytes()
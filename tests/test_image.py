@@ -1,11 +1,19 @@
+import io
+import pickle
+import zipfile
+import unittest.mock
+
 import PIL.Image
 import PIL.ImageChops
+import PIL.ImageFile
+import PIL.JpegImagePlugin
 import pytest
 
 import madam.image
-from madam.core import OperatorError, UnsupportedFormatError
+from madam.core import FanOut, OperatorError, Pipeline, UnsupportedFormatError
 from assets import DEFAULT_WIDTH, DEFAULT_HEIGHT
 from assets import image_asset, jpeg_image_asset, png_image_asset, gif_image_asset, webp_image_asset, unknown_asset
+from assets import jpeg_data_with_exif
 
 
 def is_equal_in_black_white_space(result_image, expected_image):
@@ -245,3 +253,571 @@ class TestPillowProcessor:
 
         assert rotated_asset.width != image_asset.width
         assert rotated_asset.height != image_asset.height
+
+    def test_pipeline_encodes_consecutive_operators_only_once(self, pillow_processor, jpeg_image_asset):
+        pipeline = Pipeline()
+        pipeline.add(pillow_processor.crop(x=2, y=2, width=20, height=8))
+        pipeline.add(pillow_processor.resize(width=10, height=4))
+        pipeline.add(pillow_processor.convert(mime_type='image/png'))
+
+        with unittest.mock.patch.object(pillow_processor, '_image_to_asset',
+                                        wraps=pillow_processor._image_to_asset) as image_to_asset:
+            processed_asset = next(pipeline.process(jpeg_image_asset))
+
+        assert image_to_asset.call_count == 1
+        assert processed_asset.mime_type == 'image/png'
+        assert processed_asset.width == 10
+        assert processed_asset.height == 4
+        assert PIL.Image.open(processed_asset.essence).format == 'PNG'
+
+    def test_pipeline_with_fused_operators_matches_sequential_application(self, pillow_processor):
+        asset = jpeg_image_asset()
+        operators = [
+            pillow_processor.transpose(),
+            pillow_processor.flip(orientation=madam.image.FlipOrientation.HORIZONTAL),
+            pillow_processor.convert(mime_type='image/png'),
+        ]
+        pipeline = Pipeline()
+        for operator in operators:
+            pipeline.add(operator)
+        sequential_asset = asset
+        for operator in operators:
+            sequential_asset = operator(sequential_asset)
+
+        fused_asset = next(pipeline.process(asset))
+
+        assert fused_asset.width == sequential_asset.width
+        assert fused_asset.height == sequential_asset.height
+        assert is_equal_in_black_white_space(PIL.Image.open(fused_asset.essence),
+                                              PIL.Image.open(sequential_asset.essence))
+
+    def test_pipeline_with_fused_operators_keeps_exif_orientation_for_auto_orient(self, pillow_processor):
+        reference_asset = jpeg_image_asset()
+        misoriented_asset = jpeg_image_asset(transpositions=[PIL.Image.ROTATE_90], exif={'orientation': 6})
+        pipeline = Pipeline()
+        pipeline.add(pillow_processor.convert(mime_type='image/png'))
+        pipeline.add(pillow_processor.auto_orient())
+        pipeline.add(pillow_processor.auto_orient())
+
+        oriented_asset = next(pipeline.process(misoriented_asset))
+
+        assert oriented_asset.width == reference_asset.width
+        assert oriented_asset.height == reference_asset.height
+        assert is_equal_in_black_white_space(PIL.Image.open(reference_asset.essence),
+                                              PIL.Image.open(oriented_asset.essence))
+
+    def test_pipeline_with_fused_no_op_operators_returns_identical_asset(self, pillow_processor, image_asset):
+        pipeline = Pipeline()
+        pipeline.add(pillow_processor.rotate(angle=0))
+        pipeline.add(pillow_processor.crop(x=0, y=0, width=image_asset.width, height=image_asset.height))
+
+        processed_asset = next(pipeline.process(image_asset))
+
+        assert processed_asset is image_asset
+
+    def test_pipeline_with_fused_operators_raises_error_for_unreadable_essence(self, pillow_processor, unknown_asset):
+        pipeline = Pipeline()
+        pipeline.add(pillow_processor.transpose())
+        pipeline.add(pillow_processor.convert(mime_type='image/png'))
+
+        with pytest.raises(OperatorError):
+            next(pipeline.process(unknown_asset))
+
+    def test_fan_out_decodes_essence_only_once_for_all_branches(self, pillow_processor, jpeg_image_asset):
+        branches = []
+        for width in (4, 8, 12):
+            for mime_type in ('image/jpeg', 'image/webp'):
+                branch = Pipeline()
+                branch.add(pillow_processor.resize(width=width, height=width // 2))
+                branch.add(pillow_processor.convert(mime_type=mime_type))
+                branches.append(branch)
+        fan_out = FanOut(*branches)
+
+        with unittest.mock.patch('PIL.Image.open', wraps=PIL.Image.open) as image_open:
+            processed_assets = next(fan_out.process(jpeg_image_asset))
+        source_data = jpeg_image_asset.essence.read()
+        source_decodings = [args for args, kwargs in image_open.call_args_list
+                            if args[0].getvalue() == source_data]
+
+        assert len(source_decodings) == 1
+
+        assert [(a.width, a.mime_type) for a in processed_assets] == [
+            (4, 'image/jpeg'), (4, 'image/webp'),
+            (8, 'image/jpeg'), (8, 'image/webp'),
+            (12, 'image/jpeg'), (12, 'image/webp'),
+        ]
+        for processed_asset in processed_assets:
+            image = PIL.Image.open(processed_asset.essence)
+            assert image.size == (processed_asset.width, processed_asset.height)
+
+    def test_optimize_removes_operators_without_effect(self, pillow_processor, jpeg_image_asset):
+        operators = [
+            pillow_processor.rotate(angle=360),
+            pillow_processor.resize(width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT),
+            pillow_processor.convert(mime_type='image/jpeg'),
+            pillow_processor.crop(x=0, y=0, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT),
+        ]
+
+        optimized_operators = pillow_processor.optimize(operators, jpeg_image_asset.metadata)
+
+        assert optimized_operators == []
+
+    def test_optimize_merges_consecutive_resizes(self, pillow_processor, jpeg_image_asset):
+        operators = [
+            pillow_processor.resize(width=DEFAULT_WIDTH * 4, height=DEFAULT_HEIGHT * 4),
+            pillow_processor.resize(width=DEFAULT_WIDTH, height=DEFAULT_WIDTH, mode=madam.image.ResizeMode.FIT),
+        ]
+
+        optimized_operators = pillow_processor.optimize(operators, jpeg_image_asset.metadata)
+
+        assert optimized_operators == []
+
+    def test_optimize_merges_consecutive_resizes_without_metadata_when_last_resize_is_exact(self, pillow_processor):
+        operators = [
+            pillow_processor.resize(width=100, height=50, mode=madam.image.ResizeMode.FIT),
+            pillow_processor.resize(width=8, height=4),
+        ]
+
+        optimized_operators = pillow_processor.optimize(operators, None)
+
+        assert optimized_operators == [pillow_processor.resize(width=8, height=4)]
+
+    def test_optimize_moves_crop_ahead_of_resize(self, pillow_processor, jpeg_image_asset):
+        operators = [
+            pillow_processor.resize(width=DEFAULT_WIDTH * 4, height=DEFAULT_HEIGHT * 4),
+            pillow_processor.crop(x=8, y=4, width=40, height=20),
+        ]
+
+        optimized_operators = pillow_processor.optimize(operators, jpeg_image_asset.metadata)
+
+        assert optimized_operators == [
+            pillow_processor.crop(x=2, y=1, width=10, height=5),
+            pillow_processor.resize(width=40, height=20),
+        ]
+
+    def test_optimize_does_not_move_crop_that_does_not_map_to_whole_pixels(self, pillow_processor, jpeg_image_asset):
+        operators = [
+            pillow_processor.resize(width=DEFAULT_WIDTH * 4, height=DEFAULT_HEIGHT * 4),
+            pillow_processor.crop(x=1, y=4, width=40, height=20),
+        ]
+
+        optimized_operators = pillow_processor.optimize(operators, jpeg_image_asset.metadata)
+
+        assert optimized_operators == operators
+
+    def test_optimizing_pipeline_creates_asset_with_equal_dimensions(self, pillow_processor, jpeg_image_asset):
+        pipeline = Pipeline()
+        pipeline.add(pillow_processor.rotate(angle=0))
+        pipeline.add(pillow_processor.resize(width=DEFAULT_WIDTH * 4, height=DEFAULT_HEIGHT * 4))
+        pipeline.add(pillow_processor.crop(x=8, y=4, width=40, height=20))
+        optimizing_pipeline = Pipeline(optimize=True)
+        optimizing_pipeline.operators.extend(pipeline.operators)
+
+        processed_asset = next(pipeline.process(jpeg_image_asset))
+        optimized_asset = next(optimizing_pipeline.process(jpeg_image_asset))
+
+        assert (optimized_asset.width, optimized_asset.height) == (processed_asset.width, processed_asset.height)
+        assert optimizing_pipeline.explain(jpeg_image_asset).splitlines()[-1] == \
+            '    1. PillowProcessor.crop(height=5, width=10, x=2, y=1) -> ' \
+            'PillowProcessor.resize(height=20, mode=<ResizeMode.EXACT: 0>, quality=None, width=40) (fused)'
+
+    @pytest.mark.parametrize('operator_name, kwargs', [
+        ('resize', dict(width=10, height=10, mode=madam.image.ResizeMode.EXACT)),
+        ('resize', dict(width=10, height=10, mode=madam.image.ResizeMode.FIT)),
+        ('resize', dict(width=10, height=10, mode=madam.image.ResizeMode.FILL)),
+        ('crop', dict(x=-2, y=4, width=10, height=100)),
+        ('rotate', dict(angle=30, expand=True)),
+        ('rotate', dict(angle=-90, expand=True)),
+        ('rotate', dict(angle=45, expand=False)),
+        ('transpose', dict()),
+        ('flip', dict(orientation=madam.image.FlipOrientation.VERTICAL)),
+        ('convert', dict(mime_type='image/png')),
+    ])
+    def test_dry_run_returns_metadata_of_processed_asset(self, pillow_processor, jpeg_image_asset,
+                                                         operator_name, kwargs):
+        operator = getattr(pillow_processor, operator_name)(**kwargs)
+
+        metadata = operator.dry_run(jpeg_image_asset)
+
+        processed_asset = operator(jpeg_image_asset)
+        assert metadata == dict(mime_type=processed_asset.mime_type,
+                                width=processed_asset.width, height=processed_asset.height)
+
+    def test_dry_run_of_auto_orient_swaps_dimensions_for_rotated_images(self, pillow_processor):
+        operator = pillow_processor.auto_orient()
+
+        metadata = operator.dry_run(dict(mime_type='image/jpeg', width=24, height=12, exif=dict(orientation=6)))
+
+        assert metadata == dict(mime_type='image/jpeg', width=12, height=24)
+
+    def test_dry_run_raises_error_for_invalid_cropping_area(self, pillow_processor, jpeg_image_asset):
+        operator = pillow_processor.crop(x=DEFAULT_WIDTH, y=0, width=10, height=10)
+
+        with pytest.raises(OperatorError):
+            operator.dry_run(jpeg_image_asset)
+
+    def test_pipeline_dry_run_returns_metadata_without_decoding_essence(self, pillow_processor, jpeg_image_asset):
+        pipeline = Pipeline()
+        pipeline.add(pillow_processor.resize(width=100, height=100, mode=madam.image.ResizeMode.FIT))
+        pipeline.add(pillow_processor.rotate(angle=90, expand=True))
+        pipeline.add(pillow_processor.convert(mime_type='image/webp'))
+
+        with unittest.mock.patch('PIL.Image.open') as image_open:
+            metadata = pipeline.dry_run(jpeg_image_asset)
+
+        image_open.assert_not_called()
+        assert metadata == dict(mime_type='image/webp', width=50, height=100)
+
+    def test_resize_decodes_jpeg_with_dct_scaling_for_large_downscales(self, pillow_processor, jpeg_image_asset):
+        operator = pillow_processor.resize(width=DEFAULT_WIDTH // 4, height=DEFAULT_HEIGHT // 4)
+
+        with unittest.mock.patch('PIL.JpegImagePlugin.JpegImageFile.draft', autospec=True,
+                                 side_effect=PIL.JpegImagePlugin.JpegImageFile.draft) as draft:
+            resized_asset = operator(jpeg_image_asset)
+
+        draft.assert_called_once_with(unittest.mock.ANY, 'RGB', (DEFAULT_WIDTH // 4, DEFAULT_HEIGHT // 4))
+        assert (resized_asset.width, resized_asset.height) == (DEFAULT_WIDTH // 4, DEFAULT_HEIGHT // 4)
+
+    def test_resize_does_not_use_dct_scaling_for_small_downscales(self, pillow_processor, jpeg_image_asset):
+        operator = pillow_processor.resize(width=DEFAULT_WIDTH - 1, height=DEFAULT_HEIGHT - 1)
+
+        with unittest.mock.patch('PIL.JpegImagePlugin.JpegImageFile.draft') as draft:
+            operator(jpeg_image_asset)
+
+        draft.assert_not_called()
+
+    def test_resize_with_dct_scaling_is_equivalent_to_full_decoding(self, pillow_processor):
+        image = PIL.Image.linear_gradient('L').resize((512, 256)).convert('RGB')
+        image_data = io.BytesIO()
+        image.save(image_data, 'JPEG', quality=95)
+        image_data.seek(0)
+        asset = pillow_processor.read(image_data)
+        operator = pillow_processor.resize(width=64, height=32)
+
+        resized_image = PIL.Image.open(operator(asset).essence)
+        with unittest.mock.patch('PIL.JpegImagePlugin.JpegImageFile.draft'):
+            fully_decoded_image = PIL.Image.open(operator(asset).essence)
+
+        assert is_equal_in_black_white_space(resized_image, fully_decoded_image)
+
+    @pytest.mark.parametrize('quality, resample', [
+        (madam.image.ResizeQuality.FAST, PIL.Image.NEAREST),
+        (madam.image.ResizeQuality.BALANCED, PIL.Image.BILINEAR),
+        (madam.image.ResizeQuality.BEST, PIL.Image.LANCZOS),
+    ])
+    def test_resize_uses_resampling_filter_of_quality(self, pillow_processor, png_image_asset, quality, resample):
+        operator = pillow_processor.resize(width=DEFAULT_WIDTH // 2, height=DEFAULT_HEIGHT // 2, quality=quality)
+
+        with unittest.mock.patch('PIL.Image.Image.resize', autospec=True,
+                                 side_effect=PIL.Image.Image.resize) as resize:
+            resized_asset = operator(png_image_asset)
+
+        assert resize.call_args[1]['resample'] == resample
+        assert (resized_asset.width, resized_asset.height) == (DEFAULT_WIDTH // 2, DEFAULT_HEIGHT // 2)
+
+    def test_resize_with_balanced_quality_reduces_large_images_first(self, pillow_processor):
+        asset = png_image_asset(width=400, height=300)
+        operator = pillow_processor.resize(width=40, height=30, quality=madam.image.ResizeQuality.BALANCED)
+
+        with unittest.mock.patch('PIL.Image.Image.resize', autospec=True,
+                                 side_effect=PIL.Image.Image.resize) as resize:
+            resized_asset = operator(asset)
+
+        assert [call[0][1] for call in resize.call_args_list] == [(80, 60), (40, 30)]
+        reference_asset = pillow_processor.resize(width=40, height=30, quality=madam.image.ResizeQuality.BEST)(asset)
+        assert is_equal_in_black_white_space(PIL.Image.open(resized_asset.essence),
+                                              PIL.Image.open(reference_asset.essence))
+
+    def test_resize_uses_default_quality_of_processor(self, png_image_asset):
+        pillow_processor = madam.image.PillowProcessor(resize_quality=madam.image.ResizeQuality.FAST)
+        operator = pillow_processor.resize(width=DEFAULT_WIDTH // 2, height=DEFAULT_HEIGHT // 2)
+
+        with unittest.mock.patch('PIL.Image.Image.resize', autospec=True,
+                                 side_effect=PIL.Image.Image.resize) as resize:
+            operator(png_image_asset)
+
+        assert resize.call_args[1]['resample'] == PIL.Image.NEAREST
+
+    def test_operators_of_processors_with_different_configuration_differ(self):
+        fast_processor = madam.image.PillowProcessor(resize_quality=madam.image.ResizeQuality.FAST)
+        best_processor = madam.image.PillowProcessor(resize_quality=madam.image.ResizeQuality.BEST)
+
+        fast_operator = fast_processor.resize(width=10, height=10)
+        best_operator = best_processor.resize(width=10, height=10)
+
+        assert fast_operator != best_operator
+        assert fast_operator.digest != best_operator.digest
+
+    def test_unpickled_operator_keeps_processor_configuration(self):
+        pillow_processor = madam.image.PillowProcessor(resize_quality=madam.image.ResizeQuality.BALANCED)
+        operator = pillow_processor.resize(width=10, height=10)
+
+        unpickled_operator = pickle.loads(pickle.dumps(operator))
+
+        assert unpickled_operator == operator
+        assert unpickled_operator.processor.resize_quality == madam.image.ResizeQuality.BALANCED
+
+    @pytest.mark.parametrize('preset, mime_type, options', [
+        (madam.image.EncodingPreset.FAST, 'image/png', dict(compress_level=1)),
+        (madam.image.EncodingPreset.FAST, 'image/webp', dict(method=0)),
+        (madam.image.EncodingPreset.BALANCED, 'image/jpeg', dict(optimize=True)),
+        (madam.image.EncodingPreset.MAX_COMPRESSION, 'image/jpeg', dict(optimize=True, progressive=True)),
+        (madam.image.EncodingPreset.MAX_COMPRESSION, 'image/webp', dict(method=6)),
+    ])
+    def test_convert_uses_options_of_encoding_preset(self, pillow_processor, png_image_asset,
+                                                     preset, mime_type, options):
+        operator = pillow_processor.convert(mime_type=mime_type, encoding=dict(preset=preset))
+
+        with unittest.mock.patch('PIL.Image.Image.save', autospec=True, side_effect=PIL.Image.Image.save) as save:
+            operator(png_image_asset)
+
+        assert save.call_args[1] == options
+
+    def test_convert_applies_encoding_options(self, pillow_processor, png_image_asset):
+        operator = pillow_processor.convert(mime_type='image/jpeg',
+                                            encoding=dict(quality=50, subsampling='4:2:0', compression_level=3))
+
+        with unittest.mock.patch('PIL.Image.Image.save', autospec=True, side_effect=PIL.Image.Image.save) as save:
+            operator(png_image_asset)
+
+        assert save.call_args[1] == dict(optimize=True, progressive=True, quality=50, subsampling='4:2:0')
+
+    @pytest.mark.parametrize('mime_type, options', [
+        ('image/jpeg', dict(optimize=True, progressive=True)),
+        ('image/png', dict(optimize=True)),
+        ('image/webp', dict(method=6)),
+    ])
+    def test_convert_uses_maximum_compression_by_default(self, pillow_processor, png_image_asset, mime_type, options):
+        operator = pillow_processor.convert(mime_type=mime_type)
+
+        with unittest.mock.patch('PIL.Image.Image.save', autospec=True, side_effect=PIL.Image.Image.save) as save:
+            operator(png_image_asset)
+
+        assert save.call_args[1] == options
+
+    def test_convert_with_lower_quality_creates_smaller_essence(self, pillow_processor, jpeg_image_asset):
+        convert_to_high_quality = pillow_processor.convert(mime_type='image/jpeg', encoding=dict(quality=95))
+        convert_to_low_quality = pillow_processor.convert(mime_type='image/jpeg', encoding=dict(quality=5))
+
+        high_quality_asset = convert_to_high_quality(jpeg_image_asset)
+        low_quality_asset = convert_to_low_quality(jpeg_image_asset)
+
+        assert len(low_quality_asset.essence.read()) < len(high_quality_asset.essence.read())
+
+    def test_convert_raises_error_for_unknown_encoding_options(self, pillow_processor, png_image_asset):
+        operator = pillow_processor.convert(mime_type='image/jpeg', encoding=dict(speed=1))
+
+        with pytest.raises(OperatorError):
+            operator(png_image_asset)
+
+    def test_processor_raises_error_for_unknown_encoding_options(self):
+        with pytest.raises(ValueError):
+            madam.image.PillowProcessor(encoding=dict(speed=1))
+
+    def test_operators_use_encoding_options_of_processor(self, png_image_asset):
+        pillow_processor = madam.image.PillowProcessor(encoding=dict(preset=madam.image.EncodingPreset.FAST))
+        operator = pillow_processor.resize(width=DEFAULT_WIDTH // 2, height=DEFAULT_HEIGHT // 2)
+
+        with unittest.mock.patch('PIL.Image.Image.save', autospec=True, side_effect=PIL.Image.Image.save) as save:
+            operator(png_image_asset)
+
+        assert save.call_args[1] == dict(compress_level=1)
+
+    def test_fused_operators_use_encoding_options_of_convert(self, pillow_processor, jpeg_image_asset):
+        pipeline = Pipeline()
+        pipeline.add(pillow_processor.convert(mime_type='image/png', encoding=dict(compression_level=0)))
+        pipeline.add(pillow_processor.resize(width=DEFAULT_WIDTH // 2, height=DEFAULT_HEIGHT // 2))
+
+        with unittest.mock.patch('PIL.Image.Image.save', autospec=True, side_effect=PIL.Image.Image.save) as save:
+            next(pipeline.process(jpeg_image_asset))
+
+        assert save.call_count == 1
+        assert save.call_args[1] == dict(compress_level=0)
+
+    def test_operator_result_has_metadata_of_encoded_essence_without_reparsing_it(self, pillow_processor,
+                                                                                  jpeg_image_asset):
+        operator = pillow_processor.convert(mime_type='image/png')
+
+        with unittest.mock.patch('PIL.Image.open', wraps=PIL.Image.open) as image_open:
+            converted_asset = operator(jpeg_image_asset)
+
+        assert image_open.call_count == 1
+        assert converted_asset.metadata == pillow_processor.read(converted_asset.essence).metadata
+
+    @staticmethod
+    def noisy_png_asset(mode, width=37, height=53):
+        gradient = PIL.Image.linear_gradient('L').resize((width, height))
+        image = PIL.Image.merge('RGB', (gradient, PIL.Image.effect_noise((width, height), 40), gradient.rotate(90)))
+        image = image.quantize(200) if mode == 'P' else image.convert(mode)
+        essence = io.BytesIO()
+        image.save(essence, 'PNG')
+        essence.seek(0)
+        return madam.image.PillowProcessor().read(essence)
+
+    @pytest.mark.parametrize('mode', ['L', 'LA', 'P', 'RGB', 'RGBA'])
+    def test_png_strips_are_equal_to_fully_decoded_image(self, mode):
+        asset = self.noisy_png_asset(mode)
+        reader = madam.image._PNGStripReader.open(asset)
+        image = PIL.Image.open(asset.essence)
+
+        strips = list(reader.strips(5))
+
+        assert [y for y, strip in strips] == list(range(0, 53, 5))
+        for y, strip in strips:
+            expected_strip = image.crop((0, y, image.width, min(image.height, y + 5)))
+            assert strip.convert('RGBA').tobytes() == expected_strip.convert('RGBA').tobytes()
+
+    @pytest.mark.parametrize('mode', ['L', 'P', 'RGBA'])
+    def test_crop_of_large_png_image_in_strips_is_equal_to_crop_of_full_image(self, pillow_processor, mode):
+        asset = self.noisy_png_asset(mode)
+        strip_processor = madam.image.PillowProcessor(max_pixels=37 * 5)
+        crop_operator_args = dict(x=3, y=7, width=20, height=30)
+
+        with unittest.mock.patch('PIL.ImageFile.ImageFile.load', autospec=True,
+                                 side_effect=PIL.ImageFile.ImageFile.load) as load:
+            cropped_asset = strip_processor.crop(**crop_operator_args)(asset)
+
+        assert load.called
+        assert all(image.height <= 5 + 1 for (image,), _ in load.call_args_list)
+        expected_asset = pillow_processor.crop(**crop_operator_args)(asset)
+        assert PIL.Image.open(cropped_asset.essence).tobytes() == PIL.Image.open(expected_asset.essence).tobytes()
+
+    @pytest.mark.parametrize('quality', list(madam.image.ResizeQuality))
+    def test_resize_of_large_png_image_in_strips_is_equal_to_resize_of_full_image(self, pillow_processor, quality):
+        asset = self.noisy_png_asset('RGB')
+        strip_processor = madam.image.PillowProcessor(max_pixels=37 * 5)
+
+        resized_asset = strip_processor.resize(width=15, height=20, quality=quality)(asset)
+
+        expected_asset = pillow_processor.resize(width=15, height=20, quality=quality)(asset)
+        assert PIL.Image.open(resized_asset.essence).tobytes() == PIL.Image.open(expected_asset.essence).tobytes()
+
+    def test_png_image_exceeding_pillow_pixel_limit_can_be_read_and_resized_in_strips(self, pillow_processor,
+                                                                                      monkeypatch):
+        essence = self.noisy_png_asset('RGB').essence
+        monkeypatch.setattr(PIL.Image, 'MAX_IMAGE_PIXELS', 500)
+        strip_processor = madam.image.PillowProcessor(max_pixels=37 * 5)
+
+        assert not pillow_processor.can_read(essence)
+        assert strip_processor.can_read(essence)
+        asset = strip_processor.read(essence)
+        resized_asset = strip_processor.resize(width=15, height=20)(asset)
+
+        assert asset.mime_type == 'image/png'
+        assert (asset.width, asset.height) == (37, 53)
+        assert PIL.Image.open(resized_asset.essence).size == (15, 20)
+
+    def test_pipeline_with_png_image_exceeding_pillow_pixel_limit_is_applied_in_strips(self, monkeypatch):
+        essence = self.noisy_png_asset('RGB').essence
+        monkeypatch.setattr(PIL.Image, 'MAX_IMAGE_PIXELS', 500)
+        strip_processor = madam.image.PillowProcessor(max_pixels=37 * 5)
+        asset = strip_processor.read(essence)
+        pipeline = Pipeline()
+        pipeline.add(strip_processor.crop(x=2, y=3, width=20, height=25))
+        pipeline.add(strip_processor.resize(width=15, height=20))
+        branch = Pipeline()
+        branch.add(strip_processor.crop(x=0, y=0, width=10, height=10))
+        fan_out = FanOut(pipeline, branch)
+
+        processed_asset = next(pipeline.process(asset))
+        branch_assets = next(fan_out.process(asset))
+
+        assert PIL.Image.open(processed_asset.essence).size == (15, 20)
+        assert [PIL.Image.open(branch_asset.essence).size for branch_asset in branch_assets] == [(15, 20), (10, 10)]
+
+    def test_pipeline_raises_operator_error_for_image_exceeding_pillow_pixel_limit(self, monkeypatch):
+        asset = self.noisy_png_asset('RGB')
+        monkeypatch.setattr(PIL.Image, 'MAX_IMAGE_PIXELS', 500)
+        processor = madam.image.PillowProcessor()
+        pipeline = Pipeline()
+        pipeline.add(processor.crop(x=2, y=3, width=20, height=25))
+        pipeline.add(processor.resize(width=15, height=20))
+
+        with pytest.raises(OperatorError):
+            next(pipeline.process(asset))
+
+    def test_tile_pyramid_contains_deep_zoom_descriptor_and_tiles_of_all_levels(self, pillow_processor):
+        asset = self.noisy_png_asset('RGB', width=300, height=200)
+        tile_operator = pillow_processor.tile_pyramid(tile_size=64, overlap=2, mime_type='image/png')
+
+        pyramid_asset = tile_operator(asset)
+
+        assert pyramid_asset.mime_type == 'application/zip'
+        with zipfile.ZipFile(pyramid_asset.essence) as archive:
+            descriptor = archive.read('image.dzi').decode('utf-8')
+            tile_names = set(archive.namelist()) - {'image.dzi'}
+        assert 'Format="png" Overlap="2" TileSize="64"' in descriptor
+        assert '<Size Width="300" Height="200"/>' in descriptor
+        assert 'image_files/0/0_0.png' in tile_names
+        assert {name for name in tile_names if name.startswith('image_files/9/')} == {
+            'image_files/9/%d_%d.png' % (column, row) for column in range(5) for row in range(4)}
+        assert {name for name in tile_names if name.startswith('image_files/8/')} == {
+            'image_files/8/%d_%d.png' % (column, row) for column in range(3) for row in range(2)}
+
+    @pytest.mark.parametrize('max_pixels', [None, 3000])
+    def test_tile_pyramid_tiles_are_regions_of_scaled_image(self, max_pixels):
+        asset = self.noisy_png_asset('RGB', width=300, height=200)
+        image = PIL.Image.open(asset.essence).convert('RGB')
+        processor = madam.image.PillowProcessor(max_pixels=max_pixels)
+        tile_operator = processor.tile_pyramid(tile_size=64, overlap=2, mime_type='image/png')
+
+        pyramid_asset = tile_operator(asset)
+
+        with zipfile.ZipFile(pyramid_asset.essence) as archive:
+            inner_tile = PIL.Image.open(io.BytesIO(archive.read('image_files/9/1_1.png')))
+            border_tile = PIL.Image.open(io.BytesIO(archive.read('image_files/9/4_3.png')))
+            scaled_tile = PIL.Image.open(io.BytesIO(archive.read('image_files/8/0_0.png')))
+        assert inner_tile.tobytes() == image.crop((62, 62, 130, 130)).tobytes()
+        assert border_tile.tobytes() == image.crop((254, 190, 300, 200)).tobytes()
+        assert scaled_tile.tobytes() == image.resize((150, 100), PIL.Image.BOX).crop((0, 0, 66, 66)).tobytes()
+
+    def test_extract_preview_returns_largest_embedded_preview(self, pillow_processor, jpeg_data_with_exif):
+        asset = pillow_processor.read(jpeg_data_with_exif)
+
+        with unittest.mock.patch('PIL.Image.open') as image_open:
+            preview_asset = pillow_processor.extract_preview()(asset)
+
+        assert not image_open.called
+        assert preview_asset.mime_type == 'image/jpeg'
+        assert (preview_asset.width, preview_asset.height) == (160, 120)
+        assert PIL.Image.open(preview_asset.essence).size == (160, 120)
+
+    def test_extract_preview_raises_error_for_image_without_preview(self, pillow_processor, image_asset):
+        with pytest.raises(OperatorError):
+            pillow_processor.extract_preview()(image_asset)
+
+    def test_thumbnail_returns_preview_of_resized_size_without_decoding(self, pillow_processor, jpeg_data_with_exif):
+        asset = pillow_processor.read(jpeg_data_with_exif)
+
+        with unittest.mock.patch('PIL.Image.open') as image_open:
+            thumbnail_asset = pillow_processor.thumbnail(width=200, height=120)(asset)
+
+        assert not image_open.called
+        assert thumbnail_asset == pillow_processor.extract_preview()(asset)
+
+    def test_thumbnail_resizes_preview_if_it_is_large_enough(self, pillow_processor, jpeg_data_with_exif):
+        asset = pillow_processor.read(jpeg_data_with_exif)
+        preview_asset = pillow_processor.extract_preview()(asset)
+
+        thumbnail_asset = pillow_processor.thumbnail(width=80, height=80)(asset)
+
+        assert thumbnail_asset == pillow_processor.resize(width=80, height=60)(preview_asset)
+
+    def test_thumbnail_resizes_full_image_if_preview_is_too_small(self, pillow_processor, jpeg_data_with_exif):
+        asset = pillow_processor.read(jpeg_data_with_exif)
+
+        thumbnail_asset = pillow_processor.thumbnail(width=200, height=200)(asset)
+
+        assert thumbnail_asset == pillow_processor.resize(width=200, height=200,
+                                                          mode=madam.image.ResizeMode.FIT)(asset)
+
+    def test_thumbnail_resizes_image_without_preview(self, pillow_processor, image_asset):
+        thumbnail_asset = pillow_processor.thumbnail(width=12, height=12)(image_asset)
+
+        assert (thumbnail_asset.width, thumbnail_asset.height) == (12, 6)
+
+    def test_dry_run_of_thumbnail_returns_resized_dimensions(self, pillow_processor, jpeg_image_asset):
+        pipeline = Pipeline()
+        pipeline.add(pillow_processor.thumbnail(width=12, height=12))
+
+        assert pipeline.dry_run(jpeg_image_asset) == dict(mime_type='image/jpeg', width=12, height=6)
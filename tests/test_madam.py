@@ -68,6 +68,37 @@ def test_read_raises_error_when_format_is_unknown(madam, unknown_asset):
         madam.read(unknown_asset.essence)
 
 
+def test_read_directory_returns_assets_of_supported_files(madam, jpeg_image_asset, png_image_asset, unknown_asset,
+                                                          tmpdir):
+    tmpdir.join('1.jpg').write(jpeg_image_asset.essence.read(), 'wb')
+    tmpdir.join('2.bin').write(unknown_asset.essence.read(), 'wb')
+    tmpdir.mkdir('sub').join('3.png').write(png_image_asset.essence.read(), 'wb')
+
+    assets = list(madam.read_directory(str(tmpdir)))
+
+    assert [asset.mime_type for asset in assets] == ['image/jpeg', 'image/png']
+
+
+def test_read_directory_ignores_subdirectories_when_not_recursive(madam, jpeg_image_asset, png_image_asset, tmpdir):
+    tmpdir.join('1.jpg').write(jpeg_image_asset.essence.read(), 'wb')
+    tmpdir.mkdir('sub').join('2.png').write(png_image_asset.essence.read(), 'wb')
+
+    assets = list(madam.read_directory(str(tmpdir), recursive=False))
+
+    assert [asset.mime_type for asset in assets] == ['image/jpeg']
+
+
+def test_read_directory_reads_files_lazily(madam, jpeg_image_asset, tmpdir):
+    tmpdir.join('1.jpg').write(jpeg_image_asset.essence.read(), 'wb')
+    tmpdir.join('2.jpg').write(jpeg_image_asset.essence.read(), 'wb')
+
+    with patch.object(madam, 'read', wraps=madam.read) as read:
+        assets = madam.read_directory(str(tmpdir))
+        next(assets)
+
+    assert read.call_count == 1
+
+
 @pytest.fixture(scope='class')
 def read_asset(madam, asset):
     return madam.read(asset.essence)
@@ -1,6 +1,9 @@
+import copy
+import pickle
+
 import pytest
 
-from madam.mime import MimeType
+from madam.mime import MimeType, MimeTypeIndex
 
 
 def test_mime_type_accepts_mime_type_instance_in_constructor():
@@ -182,3 +185,81 @@ def test_mime_type_comparison_fails_for_incompatible_types():
 
     with pytest.raises(TypeError):
         assert mime < 42
+
+
+def test_mime_type_returns_interned_instances():
+    mime = MimeType('image/jpeg')
+
+    assert MimeType('image/jpeg') is mime
+    assert MimeType('IMAGE/JPEG') is mime
+    assert MimeType(mediatype='image', subtype='jpeg') is mime
+    assert MimeType(mime) is mime
+
+
+def test_mime_type_is_immutable():
+    mime = MimeType('image/jpeg')
+
+    with pytest.raises(AttributeError):
+        mime.type = 'video'
+    with pytest.raises(AttributeError):
+        mime.subtype = 'mp4'
+
+
+def test_mime_type_can_be_copied_and_pickled():
+    mime = MimeType('image/svg+xml')
+
+    assert copy.deepcopy(mime) is mime
+    assert pickle.loads(pickle.dumps(mime)) is mime
+
+
+def test_mime_type_is_equal_to_non_canonical_mime_type_strings():
+    mime = MimeType(mediatype='foo', subtype=None)
+
+    assert mime == 'FOO/*'
+    assert mime == 'foo'
+    assert mime != 'foo/bar'
+
+
+def test_mime_type_can_be_used_to_look_up_string_keys():
+    mime_types = {'image/jpeg': 'JPEG', MimeType('image/png'): 'PNG'}
+
+    assert mime_types[MimeType('image/jpeg')] == 'JPEG'
+    assert mime_types['image/png'] == 'PNG'
+
+
+def test_mime_type_cache_is_cleared_when_full(monkeypatch):
+    mime = MimeType('foo/bar')
+    monkeypatch.setattr(MimeType, '_instances', {})
+    monkeypatch.setattr(MimeType, '_MAX_INSTANCES', 4)
+
+    for index in range(10):
+        MimeType('foo/%d' % index)
+
+    assert len(MimeType._instances) <= 4
+    assert MimeType('foo/bar') == mime
+
+
+def test_mime_type_index_behaves_like_a_mapping():
+    index = MimeTypeIndex({'image/jpeg': 'JPEG', 'image/png': 'PNG'})
+    index[MimeType('video/mp4')] = 'MP4'
+    del index['image/png']
+
+    assert len(index) == 2
+    assert index['IMAGE/JPEG'] == 'JPEG'
+    assert 'video/mp4' in index
+    assert 'image/png' not in index
+    assert sorted(index) == [MimeType('image/jpeg'), MimeType('video/mp4')]
+
+
+@pytest.mark.parametrize('mime_type, matches', [
+    ('image/jpeg', ['*/*', 'image/*', 'image/jpeg']),
+    ('image/*', ['*/*', '*/mp4', 'image/*', 'image/jpeg', 'image/png']),
+    ('*/mp4', ['*/*', '*/mp4', 'audio/mp4', 'image/*', 'video/mp4']),
+    ('*/*', ['*/*', '*/mp4', 'audio/mp4', 'image/*', 'image/jpeg', 'image/png', 'video/mp4']),
+    ('text/plain', ['*/*']),
+])
+def test_mime_type_index_matches_wildcards(mime_type, matches):
+    mime_types = ['*/*', '*/mp4', 'audio/mp4', 'image/*', 'image/jpeg', 'image/png', 'video/mp4']
+    index = MimeTypeIndex((mime_type, None) for mime_type in mime_types)
+
+    assert index.match(mime_type) == sorted(MimeType(match) for match in matches)
@@ -1,10 +1,14 @@
+import gzip
 import io
+import unittest.mock
 from xml.etree import ElementTree as ET
 
 import pytest
 
+import madam.vector
+from madam.core import OperatorError
 from madam.vector import svg_length_to_px, SVGMetadataProcessor, SVGProcessor, UnsupportedFormatError, XML_NS
-from assets import svg_vector_asset, unknown_asset
+from assets import svg_vector_asset, svgz_vector_asset, unknown_asset
 
 
 def test_svg_length_to_px_works_for_valid_values():
@@ -36,6 +40,131 @@ class TestSVGProcessor:
         with pytest.raises(UnsupportedFormatError):
             processor.read(unknown_asset.essence)
 
+    def test_can_read_returns_true_for_svg(self, processor, svg_vector_asset):
+        assert processor.can_read(svg_vector_asset.essence)
+
+    def test_can_read_returns_false_for_other_xml(self, processor):
+        assert not processor.can_read(io.BytesIO(b'<?xml version="1.0"?><html><body/></html>'))
+
+    @pytest.mark.parametrize('data', [b'\x00\x00\x00\x18ftypmp42', b'Lorem ipsum', b''])
+    def test_can_read_returns_false_for_non_xml_data(self, processor, data):
+        assert not processor.can_read(io.BytesIO(data + b'\x00' * 1024 * 1024))
+
+    def test_can_read_stops_reading_after_root_element(self, processor, svg_vector_asset):
+        svg_data = svg_vector_asset.essence.read()
+        file = io.BytesIO(svg_data[:-len('</svg>')] + b'<g/>' * 1024 * 1024 + b'</svg>')
+
+        assert processor.can_read(file)
+        assert file.tell() <= 4 * 1024
+
+    def test_can_read_stops_reading_non_xml_data_after_first_chunk(self, processor, unknown_asset):
+        file = io.BytesIO(unknown_asset.essence.read() + b'\x00' * 1024 * 1024)
+
+        assert not processor.can_read(file)
+        assert file.tell() <= 4 * 1024
+
+    def test_can_read_reads_limited_amount_of_data_without_root_element(self, processor):
+        file = io.BytesIO(b'<?xml version="1.0"?>' + b'<!-- comment -->' * 1024 * 1024)
+
+        assert not processor.can_read(file)
+        assert file.tell() <= 64 * 1024
+
+
+class TestSVGProcessorSVGZ:
+    @pytest.fixture
+    def processor(self):
+        return SVGProcessor()
+
+    def test_can_read_returns_true_for_svgz(self, processor, svgz_vector_asset):
+        assert processor.can_read(svgz_vector_asset.essence)
+
+    def test_can_read_returns_false_for_other_gzip_data(self, processor):
+        assert not processor.can_read(io.BytesIO(gzip.compress(b'Lorem ipsum' * 1024)))
+
+    def test_can_read_returns_false_for_corrupt_gzip_data(self, processor):
+        assert not processor.can_read(io.BytesIO(b'\x1f\x8b' + b'\x00' * 1024))
+
+    def test_can_read_decompresses_limited_amount_of_data(self, processor):
+        data = b'<?xml version="1.0"?>' + b'<!-- comment -->' * 1024 * 1024
+        file = io.BytesIO(gzip.compress(data))
+
+        with unittest.mock.patch('xml.etree.ElementTree.XMLPullParser.feed') as feed:
+            assert not processor.can_read(file)
+
+        assert sum(len(call[0][0]) for call in feed.call_args_list) <= 64 * 1024
+
+    def test_read_returns_svgz_asset(self, processor, svgz_vector_asset):
+        asset = processor.read(svgz_vector_asset.essence)
+
+        assert asset.mime_type == 'image/svg+xml-compressed'
+        assert asset.width == svgz_vector_asset.width
+        assert asset.height == svgz_vector_asset.height
+        assert asset.essence.read() == svgz_vector_asset.essence.read()
+
+    def test_read_does_not_decompress_whole_document_into_memory(self, processor, svgz_vector_asset):
+        with unittest.mock.patch('gzip.decompress') as decompress:
+            processor.read(svgz_vector_asset.essence)
+
+        assert not decompress.called
+
+    @pytest.mark.parametrize('data', [
+        gzip.compress(b'Lorem ipsum'),
+        gzip.compress(b'<svg xmlns="http://www.w3.org/2000/svg">')[:-8],
+        b'\x1f\x8b' + b'\x00' * 1024,
+    ])
+    def test_read_fails_with_invalid_svgz_data(self, processor, data):
+        with pytest.raises(UnsupportedFormatError):
+            processor.read(io.BytesIO(data))
+
+    def test_convert_compresses_svg(self, processor, svg_vector_asset):
+        convert = processor.convert(mime_type='image/svg+xml-compressed')
+
+        converted_asset = convert(svg_vector_asset)
+
+        assert converted_asset.mime_type == 'image/svg+xml-compressed'
+        assert converted_asset.width == svg_vector_asset.width
+        assert converted_asset.height == svg_vector_asset.height
+        assert gzip.decompress(converted_asset.essence.read()) == svg_vector_asset.essence.read()
+
+    def test_convert_decompresses_svgz(self, processor, svg_vector_asset, svgz_vector_asset):
+        convert = processor.convert(mime_type='image/svg+xml')
+
+        converted_asset = convert(svgz_vector_asset)
+
+        assert converted_asset.mime_type == 'image/svg+xml'
+        assert converted_asset.essence.read() == svg_vector_asset.essence.read()
+
+    def test_convert_output_is_deterministic(self, processor, svg_vector_asset):
+        convert = processor.convert(mime_type='image/svg+xml-compressed')
+
+        assert convert(svg_vector_asset).essence.read() == convert(svg_vector_asset).essence.read()
+
+    def test_convert_uses_compression_level(self, processor, svg_vector_asset):
+        fast_convert = processor.convert(mime_type='image/svg+xml-compressed', encoding=dict(compression_level=0))
+        best_convert = processor.convert(mime_type='image/svg+xml-compressed', encoding=dict(compression_level=9))
+
+        fast_size = len(fast_convert(svg_vector_asset).essence.read())
+        best_size = len(best_convert(svg_vector_asset).essence.read())
+
+        assert best_size < fast_size
+
+    @pytest.mark.parametrize('mime_type, encoding', [
+        ('image/png', None),
+        ('image/svg+xml-compressed', dict(quality=80)),
+        ('image/svg+xml-compressed', dict(compression_level=10)),
+    ])
+    def test_convert_raises_error_for_invalid_arguments(self, processor, svg_vector_asset, mime_type, encoding):
+        convert = processor.convert(mime_type=mime_type, encoding=encoding)
+
+        with pytest.raises(OperatorError):
+            convert(svg_vector_asset)
+
+    def test_minify_keeps_svgz_compressed(self, processor, svgz_vector_asset):
+        minified_asset = processor.minify()(svgz_vector_asset)
+
+        assert minified_asset.mime_type == 'image/svg+xml-compressed'
+        assert ET.fromstring(gzip.decompress(minified_asset.essence.read())).tag == '{%(svg)s}svg' % XML_NS
+
 
 class TestSVGMetadataProcessor:
     VALID_RDF_METADATA =\
@@ -136,3 +265,174 @@ class TestSVGMetadataProcessor:
 
         with pytest.raises(ValueError):
             processor.combine(svg_vector_asset.essence, metadata)
+
+    def test_strip_keeps_data_outside_of_metadata_element(self, processor):
+        data = (b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="1" height="1">'
+                b'<metadata><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"/></metadata>'
+                b'<!-- comment --><rect width="1" height="1"/></svg>\n')
+
+        stripped_essence = processor.strip(io.BytesIO(data))
+
+        assert stripped_essence.read() == (b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" '
+                                           b'width="1" height="1"><!-- comment --><rect width="1" height="1"/></svg>\n')
+
+    @pytest.mark.parametrize('data', [
+        b'<svg xmlns="http://www.w3.org/2000/svg"/>',
+        b'<svg xmlns="http://www.w3.org/2000/svg"><metadata/></svg>',
+        b'<svg:svg xmlns:svg="http://www.w3.org/2000/svg"><svg:metadata></svg:metadata></svg:svg>',
+    ])
+    def test_combine_adds_metadata_to_any_svg_root_element(self, processor, data):
+        essence_with_metadata = processor.combine(io.BytesIO(data), self.VALID_RDF_METADATA)
+
+        root = ET.parse(essence_with_metadata).getroot()
+        assert root.find('./svg:metadata/rdf:RDF/rdf:Description', XML_NS) is not None
+
+    def test_reading_svg_parses_document_only_once(self, processor):
+        with open('tests/resources/svg_with_metadata.svg', 'rb') as file:
+            data = file.read() + b'<!-- unique -->'
+
+        with unittest.mock.patch('madam.vector._parse_svg', wraps=madam.vector._parse_svg) as parse_svg:
+            SVGProcessor().read(io.BytesIO(data))
+            processor.read(io.BytesIO(data))
+            processor.strip(io.BytesIO(data))
+
+        assert parse_svg.call_count == 1
+
+    def test_read_returns_metadata_of_svgz(self, processor):
+        with open('tests/resources/svg_with_metadata.svg', 'rb') as file:
+            data = file.read()
+
+        metadata = processor.read(io.BytesIO(gzip.compress(data)))
+
+        assert metadata == processor.read(io.BytesIO(data))
+
+    def test_strip_and_combine_keep_svgz_compressed(self, processor, svgz_vector_asset):
+        essence_with_metadata = processor.combine(svgz_vector_asset.essence, self.VALID_RDF_METADATA)
+        essence_with_metadata = io.BytesIO(essence_with_metadata.read())
+        assert processor.read(essence_with_metadata)['rdf']['xml']
+
+        essence_with_metadata.seek(0)
+        stripped_data = gzip.decompress(processor.strip(essence_with_metadata).read())
+
+        assert stripped_data == gzip.decompress(svgz_vector_asset.essence.read())
+
+    def test_strip_and_combine_do_not_register_namespaces(self, processor, svg_vector_asset):
+        with unittest.mock.patch('xml.etree.ElementTree.register_namespace') as register_namespace:
+            essence = processor.combine(svg_vector_asset.essence, self.VALID_RDF_METADATA)
+            processor.strip(essence)
+
+        assert not register_namespace.called
+
+
+class TestSVGProcessorMinify:
+    SVG_WITH_CRUFT = b'''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<!-- Created with Inkscape (http://www.inkscape.org/) -->
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink"
+   xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+   xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+   width="100.000000" height="50" viewBox="0 0 100.00001 50.0" inkscape:version="1.0">
+  <sodipodi:namedview id="base" pagecolor="#ffffff"/>
+  <defs>
+    <linearGradient id="used"><stop offset="0.12345" stop-color="#fff"/></linearGradient>
+    <linearGradient id="unused"><stop offset="0"/></linearGradient>
+    <linearGradient id="unused-chain" xlink:href="#chained"/>
+    <linearGradient id="chained"/>
+    <clipPath id="styled"><rect width="1" height="1"/></clipPath>
+  </defs>
+  <style>.shape { clip-path: url(#styled); }</style>
+  <metadata><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"/></metadata>
+  <g inkscape:label="Layer 1" inkscape:groupmode="layer">
+    <path d="M 10.123456,20.987654 L 30.5000001 , -0.0000001 Z" fill="url(#used)"/>
+    <text x="1.23456" y="2"> Hello <tspan>world</tspan> </text>
+  </g>
+</svg>
+'''
+
+    @pytest.fixture
+    def processor(self):
+        return SVGProcessor()
+
+    @pytest.fixture
+    def asset(self, processor):
+        return processor.read(io.BytesIO(self.SVG_WITH_CRUFT))
+
+    def test_minify_removes_comments_metadata_and_editor_data(self, processor, asset):
+        minified_data = processor.minify()(asset).essence.read()
+
+        assert b'<!--' not in minified_data
+        assert b'metadata' not in minified_data
+        assert b'inkscape' not in minified_data
+        assert b'sodipodi' not in minified_data
+
+    def test_minify_rounds_numbers(self, processor, asset):
+        root = ET.fromstring(processor.minify()(asset).essence.read())
+
+        assert root.get('viewBox') == '0 0 100 50'
+        assert root.find('.//svg:path', XML_NS).get('d') == 'M 10.123,20.988 L 30.5,0 Z'
+        assert root.find('.//svg:stop', XML_NS).get('offset') == '0.123'
+
+    def test_minify_uses_specified_precision(self, processor, asset):
+        root = ET.fromstring(processor.minify(precision=1)(asset).essence.read())
+
+        assert root.find('.//svg:path', XML_NS).get('d') == 'M 10.1,21 L 30.5,0 Z'
+
+    @pytest.mark.parametrize('path_data, minified_path_data', [
+        ('M1.0.5L2 2', 'M1 0.5L2 2'),
+        ('M0 0a5 5 0 00 10 0', 'M0 0a5 5 0 0 0 10 0'),
+        ('M0 0A5 5 30.0 1,1 10.0-5.0z', 'M0 0A5 5 30 1,1 10-5z'),
+    ])
+    def test_minify_keeps_compact_path_data_valid(self, processor, path_data, minified_path_data):
+        svg_data = '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><path d="%s"/></svg>' % path_data
+        asset = processor.read(io.BytesIO(svg_data.encode('utf-8')))
+
+        root = ET.fromstring(processor.minify()(asset).essence.read())
+
+        assert root.find('./svg:path', XML_NS).get('d') == minified_path_data
+
+    def test_minify_keeps_numbers_in_lists_separated(self, processor):
+        svg_data = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><polygon points="1.0.5 2.0.5"/></svg>'
+        asset = processor.read(io.BytesIO(svg_data))
+
+        root = ET.fromstring(processor.minify()(asset).essence.read())
+
+        assert root.find('./svg:polygon', XML_NS).get('points') == '1 0.5 2 0.5'
+
+    def test_minify_removes_whitespace_between_elements_but_not_in_text(self, processor, asset):
+        minified_data = processor.minify()(asset).essence.read()
+
+        assert b'\n' not in minified_data
+        assert b'> Hello <tspan>world</tspan> </text>' in minified_data
+
+    def test_minify_removes_unreferenced_definitions(self, processor, asset):
+        root = ET.fromstring(processor.minify()(asset).essence.read())
+
+        definition_ids = {definition.get('id') for definition in root.find('./svg:defs', XML_NS)}
+        assert definition_ids == {'used', 'styled'}
+
+    def test_minify_keeps_definitions_without_id(self, processor):
+        svg_data = (b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10">'
+                    b'<defs><style>.a{fill:red}</style><script>void 0</script></defs>'
+                    b'<rect class="a" width="10" height="10"/></svg>')
+        asset = processor.read(io.BytesIO(svg_data))
+
+        root = ET.fromstring(processor.minify()(asset).essence.read())
+
+        defs = root.find('./svg:defs', XML_NS)
+        assert defs.find('./svg:style', XML_NS).text == '.a{fill:red}'
+        assert defs.find('./svg:script', XML_NS) is not None
+
+    def test_minify_creates_smaller_essence_with_same_dimensions(self, processor, asset):
+        minified_asset = processor.minify()(asset)
+
+        assert len(minified_asset.essence.read()) < len(self.SVG_WITH_CRUFT) / 2
+        assert minified_asset.mime_type == 'image/svg+xml'
+        assert (minified_asset.width, minified_asset.height) == (asset.width, asset.height)
+
+    def test_minify_is_deterministic(self, processor, asset):
+        minified_data = processor.minify()(asset).essence.read()
+
+        assert processor.minify()(processor.read(io.BytesIO(self.SVG_WITH_CRUFT))).essence.read() == minified_data
+
+    def test_minify_raises_error_for_invalid_essence(self, processor, unknown_asset):
+        with pytest.raises(OperatorError):
+            processor.minify()(unknown_asset)
@@ -1,12 +1,14 @@
 import json
 import subprocess
+import unittest.mock
 from collections import defaultdict
 
 import PIL.Image
 import pytest
 
+import madam.ffmpeg
 import madam.video
-from madam.core import OperatorError, UnsupportedFormatError
+from madam.core import FanOut, OperatorError, Pipeline, StageStatistics, UnsupportedFormatError
 from madam.future import subprocess_run
 from assets import DEFAULT_WIDTH, DEFAULT_HEIGHT, DEFAULT_DURATION
 from assets import image_asset, jpeg_image_asset, png_image_asset, gif_image_asset, webp_image_asset
@@ -354,3 +356,133 @@ class TestFFmpegProcessor:
 
         assert rotated_asset.width != video_asset.width
         assert rotated_asset.height != video_asset.height
+
+    def test_pipeline_runs_fused_operators_in_a_single_ffmpeg_process(self, processor, video_asset):
+        pipeline = Pipeline()
+        pipeline.add(processor.trim(from_seconds=0, to_seconds=0.1))
+        pipeline.add(processor.crop(x=0, y=0, width=12, height=6))
+        pipeline.add(processor.resize(width=8, height=4))
+        pipeline.add(processor.convert(mime_type='video/x-matroska', video=dict(codec='libvpx-vp9')))
+
+        with unittest.mock.patch('madam.ffmpeg.subprocess_run', wraps=madam.ffmpeg.subprocess_run) as run:
+            processed_asset = next(pipeline.process(video_asset))
+
+        assert run.call_count == 1
+        assert processed_asset.mime_type == 'video/x-matroska'
+        assert processed_asset.width == 8
+        assert processed_asset.height == 4
+        assert processed_asset.duration == 0.1
+
+    def test_pipeline_with_fused_operators_creates_essence_with_correct_dimensions(self, processor, video_asset):
+        pipeline = Pipeline()
+        pipeline.add(processor.crop(x=0, y=0, width=12, height=6))
+        pipeline.add(processor.resize(width=8, height=4))
+
+        processed_asset = next(pipeline.process(video_asset))
+
+        command = 'ffprobe -print_format json -loglevel error -show_streams -select_streams v -i pipe:'.split()
+        result = subprocess_run(command, input=processed_asset.essence.read(), stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, check=True)
+        video_info = json.loads(result.stdout.decode('utf-8'))
+        assert video_info['streams'][0]['width'] == 8
+        assert video_info['streams'][0]['height'] == 4
+
+    def test_pipeline_with_fused_trims_combines_time_ranges(self, processor, video_asset):
+        pipeline = Pipeline()
+        pipeline.add(processor.trim(from_seconds=0.05, to_seconds=0))
+        pipeline.add(processor.trim(from_seconds=0, to_seconds=0.1))
+
+        processed_asset = next(pipeline.process(video_asset))
+
+        assert processed_asset.duration == 0.1
+
+    def test_pipeline_with_fused_trims_does_not_extend_beyond_previous_trim(self, processor, video_asset):
+        pipeline = Pipeline()
+        pipeline.add(processor.trim(from_seconds=0, to_seconds=0.1))
+        pipeline.add(processor.trim(from_seconds=0.02, to_seconds=0.2))
+
+        processed_asset = next(pipeline.process(video_asset))
+
+        assert processed_asset.duration == pytest.approx(0.08)
+
+    def test_pipeline_with_fused_trims_raises_error_for_start_after_previous_trim(self, processor, video_asset):
+        pipeline = Pipeline()
+        pipeline.add(processor.trim(from_seconds=0, to_seconds=0.1))
+        pipeline.add(processor.trim(from_seconds=0.1, to_seconds=0.2))
+
+        with pytest.raises(ValueError):
+            next(pipeline.process(video_asset))
+
+    def test_pipeline_with_fused_no_op_operators_returns_identical_asset(self, processor, video_asset):
+        pipeline = Pipeline()
+        pipeline.add(processor.crop(x=0, y=0, width=video_asset.width, height=video_asset.height))
+        pipeline.add(processor.convert(mime_type=video_asset.mime_type))
+
+        processed_asset = next(pipeline.process(video_asset))
+
+        assert processed_asset is video_asset
+
+    def test_fan_out_creates_all_renditions_in_a_single_ffmpeg_process(self, processor, video_asset):
+        branches = []
+        for width, height in [(8, 4), (16, 8)]:
+            branch = Pipeline()
+            branch.add(processor.resize(width=width, height=height))
+            branch.add(processor.convert(mime_type='video/x-matroska', video=dict(codec='libvpx-vp9')))
+            branches.append(branch)
+        fan_out = FanOut(*branches)
+
+        with unittest.mock.patch('madam.ffmpeg.subprocess_run', wraps=madam.ffmpeg.subprocess_run) as run:
+            processed_assets = next(fan_out.process(video_asset))
+
+        assert run.call_count == 1
+        assert [(a.width, a.height) for a in processed_assets] == [(8, 4), (16, 8)]
+        assert all(a.mime_type == 'video/x-matroska' for a in processed_assets)
+
+    def test_pipeline_observers_receive_subprocess_time_of_ffmpeg(self, processor, video_asset):
+        statistics = StageStatistics()
+        pipeline = Pipeline(observers=[statistics])
+        pipeline.add(processor.resize(width=8, height=4))
+
+        next(pipeline.process(video_asset))
+
+        subprocess_time = statistics.percentiles('FFmpegProcessor.resize', field='subprocess_time', percentiles=(50,))
+        assert subprocess_time[50] > 0
+
+    def test_optimize_removes_operators_without_effect(self, processor, video_asset):
+        operators = [
+            processor.resize(width=DEFAULT_WIDTH * 2, height=DEFAULT_HEIGHT * 2),
+            processor.resize(width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT),
+            processor.crop(x=0, y=0, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT),
+            processor.trim(from_seconds=0, to_seconds=0),
+            processor.convert(mime_type=video_asset.mime_type),
+        ]
+
+        optimized_operators = processor.optimize(operators, video_asset.metadata)
+
+        assert optimized_operators == []
+
+    def test_optimize_keeps_conversion_with_stream_options(self, processor, video_asset):
+        operators = [processor.convert(mime_type=video_asset.mime_type, video=dict(bitrate=50))]
+
+        optimized_operators = processor.optimize(operators, video_asset.metadata)
+
+        assert optimized_operators == operators
+
+    @pytest.mark.parametrize('operator_name, kwargs', [
+        ('resize', dict(width=12, height=6)),
+        ('crop', dict(x=2, y=2, width=8, height=100)),
+        ('trim', dict(from_seconds=0.05, to_seconds=-0.05)),
+        ('convert', dict(mime_type='video/x-matroska')),
+        ('rotate', dict(angle=30, expand=True)),
+    ])
+    def test_dry_run_returns_metadata_of_processed_asset(self, processor, video_asset, operator_name, kwargs):
+        operator = getattr(processor, operator_name)(**kwargs)
+
+        metadata = operator.dry_run(video_asset)
+
+        processed_asset = operator(video_asset)
+        assert metadata['mime_type'] == processed_asset.mime_type
+        assert metadata['width'] == processed_asset.width
+        assert metadata['height'] == processed_asset.height
+        if 'duration' in metadata:
+            assert metadata['duration'] == pytest.approx(processed_asset.duration, abs=0.05)